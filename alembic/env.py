@@ -17,7 +17,7 @@ if config.config_file_name is not None:
 # add your model's MetaData object here
 # for 'autogenerate' support
 from app.db.base import Base
-from app.models import user, user_profile, skin_analysis, otp  # Import all models
+from app.models import user, user_profile, skin_analysis, otp, daily_skin_log, reminder, refresh_token, email_outbox, user_device, scheduler_state, scheduler_lease  # Import all models
 target_metadata = Base.metadata
 
 # other values from the config, defined by the needs of env.py,
@@ -1,10 +1,13 @@
-from fastapi import Depends, HTTPException, status
+from typing import Optional
+from fastapi import Depends, Header, HTTPException, status
 from sqlalchemy.orm import Session
 from jose import JWTError
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from app.db.session import SessionLocal
-from app.core.security import decode_access_token
-from app.crud.user import get_by_email
+from app.core.security import decode_access_token, is_admin_token, is_issued_before, ADMIN_TOKEN
+from app.core.lifecycle import inflight
+from app.crud.user import get_cached_by_email
+from app.schemas.user import Principal
 
 # Use HTTPBearer instead of OAuth2PasswordBearer to avoid OAuth2 UI
 security = HTTPBearer(auto_error=False)
@@ -16,26 +19,61 @@ def get_db():
     finally:
         db.close()
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
-    credentials_exception = HTTPException(
+def track_inflight(kind: str):
+    """Dependency that counts the request as in-flight work, so shutdown waits for it"""
+    def dependency():
+        with inflight.track(kind):
+            yield
+    return dependency
+
+def require_admin(x_admin_token: Optional[str] = Header(default=None)):
+    """Allow only callers presenting ADMIN_TOKEN in the X-Admin-Token header"""
+    if not ADMIN_TOKEN:
+        # Admin endpoints don't exist unless a token is configured
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not is_admin_token(x_admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+def _credentials_exception():
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
+
+def _decode_credentials(credentials: HTTPAuthorizationCredentials) -> dict:
     if not credentials:
-        raise credentials_exception
-        
+        raise _credentials_exception()
     try:
         payload = decode_access_token(credentials.credentials)
-        if payload is None:
-            raise credentials_exception
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
     except JWTError:
-        raise credentials_exception
-    user = get_by_email(db, email=email)
-    if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
+    if payload is None or payload.get("sub") is None:
+        raise _credentials_exception()
+    # Status claims let us reject deactivated accounts before any lookup
+    if payload.get("act") is False:
+        raise _credentials_exception()
+    return payload
+
+def _authenticate(payload: dict, db: Session):
+    """
+    Load the token's user (from the principal cache when possible) and check that
+    the account is still active and the token was not revoked after it was issued.
+    """
+    user = get_cached_by_email(db, email=payload["sub"])
+    if user is None or not user.is_active or is_issued_before(payload, user.tokens_valid_after):
+        raise _credentials_exception()
     return user
+
+def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
+    return _authenticate(_decode_credentials(credentials), db)
+
+def get_current_principal(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)) -> Principal:
+    """
+    Lightweight alternative to get_current_user for routes that only need the caller's id.
+    The user comes from the principal cache, so a hit makes no query. The token's
+    status claims alone are not trusted, because a deactivation or revocation in
+    another worker would not reach them.
+    """
+    user = _authenticate(_decode_credentials(credentials), db)
+    return Principal(id=user.id, email=user.email, is_active=user.is_active, is_verified=user.is_verified)
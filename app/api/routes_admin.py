@@ -0,0 +1,61 @@
+import asyncio
+import os
+import time
+from typing import Literal
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse, Response
+from app.api.deps import require_admin
+from app.core.profiling import (
+    PROFILE_DEFAULT_INTERVAL_MS, PROFILE_MAX_SECONDS, ProfilerBusy, request_profiles, sampling_profiler
+)
+
+router = APIRouter(prefix="/admin", dependencies=[Depends(require_admin)])
+
+
+@router.post("/profile")
+async def sample_profile(
+        seconds: float = Query(10, gt=0, le=PROFILE_MAX_SECONDS),
+        interval_ms: float = Query(PROFILE_DEFAULT_INTERVAL_MS, ge=1, le=1000)
+):
+    """
+    Sample this worker's threads for `seconds` and return collapsed stacks
+    (feed to flamegraph.pl or open in speedscope)
+    """
+    try:
+        result = await asyncio.to_thread(sampling_profiler.run, seconds, interval_ms)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    filename = f"profile-{os.getpid()}-{int(time.time())}.collapsed"
+    return PlainTextResponse(
+        sampling_profiler.collapsed(result["stacks"]),
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "X-Profile-Samples": str(result["samples"]),
+            "X-Profile-Pid": str(os.getpid()),
+        },
+    )
+
+
+@router.get("/profile/requests")
+async def list_request_profiles():
+    """Recent per-request cProfile results (requests sent with X-Profile: 1)"""
+    return {"success": True, "data": request_profiles.list()}
+
+
+@router.get("/profile/requests/{profile_id}")
+async def get_request_profile(
+        profile_id: str,
+        format: Literal["text", "pstats"] = "text",
+        sort: Literal["cumulative", "tottime", "calls"] = "cumulative",
+        limit: int = Query(50, ge=1, le=500)
+):
+    """A request profile as a pstats report, or as a .prof file for snakeviz / pstats"""
+    profile = request_profiles.get(profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "pstats":
+        return Response(
+            profile["pstats"], media_type="application/octet-stream",
+            headers={"Content-Disposition": f'attachment; filename="request-{profile_id}.prof"'},
+        )
+    return PlainTextResponse(request_profiles.text(profile, sort, limit))
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from app.api.deps import get_db, get_current_user
+from app.api.deps import get_db, get_current_principal
 from app.crud import daily_skin_log as crud_daily_skin_log
 from app.schemas.daily_skin_log import (
     DailySkinLogCreate,
@@ -18,7 +18,7 @@ router = APIRouter()
 def create_daily_skin_log(
         daily_skin_log: DailySkinLogCreate,
         db: Session = Depends(get_db),
-        current_user=Depends(get_current_user)
+        current_user=Depends(get_current_principal)
 ):
     """Create a new daily skin log entry for today"""
 
@@ -47,7 +47,7 @@ def create_daily_skin_log(
 def get_daily_skin_log(
         log_id: int,
         db: Session = Depends(get_db),
-        current_user=Depends(get_current_user)
+        current_user=Depends(get_current_principal)
 ):
     """Get a specific daily skin log entry"""
 
@@ -67,7 +67,7 @@ def get_user_daily_skin_logs(
         skip: int = 0,
         limit: int = 100,
         db: Session = Depends(get_db),
-        current_user=Depends(get_current_user)
+        current_user=Depends(get_current_principal)
 ):
     """Get user's daily skin log history"""
 
@@ -87,7 +87,7 @@ def update_daily_skin_log(
         log_id: int,
         daily_skin_log_update: DailySkinLogUpdate,
         db: Session = Depends(get_db),
-        current_user=Depends(get_current_user)
+        current_user=Depends(get_current_principal)
 ):
     """Update a daily skin log entry"""
 
@@ -107,7 +107,7 @@ def update_daily_skin_log(
 def delete_daily_skin_log(
         log_id: int,
         db: Session = Depends(get_db),
-        current_user=Depends(get_current_user)
+        current_user=Depends(get_current_principal)
 ):
     """Delete a daily skin log entry"""
 
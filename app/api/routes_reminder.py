@@ -1,7 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
-from app.api.deps import get_db, get_current_user
+from app.api.deps import get_db, get_current_principal
 from app.crud import reminder as crud_reminder
+from app.core.http_cache import Validator
 from app.schemas.reminder import (
     ReminderCreate, ReminderUpdate, ReminderResponse, ReminderListResponse
 )
@@ -13,7 +14,7 @@ router = APIRouter()
 async def create_reminder(
         reminder: ReminderCreate,
         db: Session = Depends(get_db),
-        current_user=Depends(get_current_user)
+        current_user=Depends(get_current_principal)
 ):
     """Create a new reminder"""
     try:
@@ -29,10 +30,18 @@ async def create_reminder(
 
 @router.get("/reminders", response_model=ReminderListResponse)
 async def get_user_reminders(
+        request: Request,
+        response: Response,
         db: Session = Depends(get_db),
-        current_user=Depends(get_current_user)
+        current_user=Depends(get_current_principal)
 ):
     """Get user's reminders"""
+    # ETag only: a deleted reminder leaves no timestamp behind for Last-Modified
+    validator = Validator("reminders", current_user.id, *crud_reminder.get_user_reminders_state(db, current_user.id))
+    if validator.matches(request):
+        return validator.not_modified()
+    validator.apply(response)
+
     reminders = crud_reminder.get_user_reminders(db, current_user.id)
     return ReminderListResponse(
         success=True,
@@ -44,14 +53,22 @@ async def get_user_reminders(
 @router.get("/reminders/{reminder_id}", response_model=ReminderResponse)
 async def get_reminder(
         reminder_id: int,
+        request: Request,
+        response: Response,
         db: Session = Depends(get_db),
-        current_user=Depends(get_current_user)
+        current_user=Depends(get_current_principal)
 ):
     """Get a specific reminder"""
     reminder = crud_reminder.get_reminder_by_id(db, reminder_id, current_user.id)
     if not reminder:
         raise HTTPException(status_code=404, detail="Reminder not found")
 
+    validator = Validator("reminder", reminder.id, reminder.version,
+                          last_modified=reminder.updated_at or reminder.created_at)
+    if validator.matches(request):
+        return validator.not_modified()
+    validator.apply(response)
+
     return ReminderResponse(
         success=True,
         message="Reminder retrieved successfully",
@@ -64,7 +81,7 @@ async def update_reminder(
         reminder_id: int,
         reminder_update: ReminderUpdate,
         db: Session = Depends(get_db),
-        current_user=Depends(get_current_user)
+        current_user=Depends(get_current_principal)
 ):
     """Update a reminder"""
     db_reminder = crud_reminder.update_reminder(db, reminder_id, current_user.id, reminder_update)
@@ -82,7 +99,7 @@ async def update_reminder(
 async def toggle_reminder(
         reminder_id: int,
         db: Session = Depends(get_db),
-        current_user=Depends(get_current_user)
+        current_user=Depends(get_current_principal)
 ):
     """Toggle reminder active/inactive"""
     db_reminder = crud_reminder.toggle_reminder(db, reminder_id, current_user.id)
@@ -101,7 +118,7 @@ async def toggle_reminder(
 async def delete_reminder(
         reminder_id: int,
         db: Session = Depends(get_db),
-        current_user=Depends(get_current_user)
+        current_user=Depends(get_current_principal)
 ):
     """Delete a reminder"""
     success = crud_reminder.delete_reminder(db, reminder_id, current_user.id)
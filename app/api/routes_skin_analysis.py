@@ -1,25 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Request, Response
 from sqlalchemy.orm import Session
-from app.api.deps import get_db, get_current_user
+from app.api.deps import get_db, get_current_principal, track_inflight
 from app.crud import skin_analysis as crud_skin_analysis
 from app.schemas.skin_analysis import SkinAnalysisResponse
-from app.services.ai_skin_analysis import AISkinAnalysisService
+from app.services.ai_skin_analysis import get_ai_service
+from app.core.timing import span
+from app.core.http_cache import Validator, IMMUTABLE
 import base64
 import os
 from datetime import datetime
 from typing import Optional
 
 router = APIRouter()
-ai_service = AISkinAnalysisService()
 
 
-@router.post("/skin-analysis", response_model=SkinAnalysisResponse)
+@router.post("/skin-analysis", response_model=SkinAnalysisResponse, dependencies=[Depends(track_inflight("skin_analysis"))])
 async def analyze_skin(
         user_id: int = Form(...),
         analysis_date: Optional[str] = Form(None),
         image: UploadFile = File(...),
         db: Session = Depends(get_db),
-        current_user=Depends(get_current_user)
+        current_user=Depends(get_current_principal)
 ):
     """
     Analyze skin image using AI and return comprehensive results with detailed routines
@@ -36,9 +37,15 @@ async def analyze_skin(
     if image.size > 10 * 1024 * 1024:  # 10MB limit
         raise HTTPException(status_code=400, detail="Image file too large (max 10MB)")
 
+    try:
+        ai_service = get_ai_service()
+    except ValueError as e:
+        raise HTTPException(status_code=503, detail=f"AI analysis is not available: {e}")
+
     try:
         # Read and encode image
-        image_content = await image.read()
+        with span("upload"):
+            image_content = await image.read()
         image_base64 = base64.b64encode(image_content).decode('utf-8')
 
         # Save image to disk
@@ -49,7 +56,7 @@ async def analyze_skin(
         filename = f"skin_analysis_{user_id}_{timestamp}.jpg"
         image_path = os.path.join(upload_dir, filename)
 
-        with open(image_path, "wb") as f:
+        with span("disk"), open(image_path, "wb") as f:
             f.write(image_content)
 
         # Generate scan ID
@@ -105,7 +112,8 @@ async def analyze_skin(
         # Create and save to database
         from app.schemas.skin_analysis import SkinAnalysisCreate
         skin_analysis_create = SkinAnalysisCreate(**skin_analysis_data)
-        crud_skin_analysis.create_skin_analysis(db, skin_analysis_create)
+        with span("db-insert"):
+            crud_skin_analysis.create_skin_analysis(db, skin_analysis_create)
 
         # Prepare response with scan_id
         response_data = {
@@ -130,20 +138,30 @@ async def analyze_skin(
 @router.get("/skin-analysis/{scan_id}")
 async def get_skin_analysis(
         scan_id: str,
+        request: Request,
+        response: Response,
         db: Session = Depends(get_db),
-        current_user=Depends(get_current_user)
+        current_user=Depends(get_current_principal)
 ):
     """
     Get skin analysis results by scan ID with detailed routines
     """
-    skin_analysis = crud_skin_analysis.get_skin_analysis_by_scan_id(db, scan_id)
+    owner = crud_skin_analysis.get_skin_analysis_owner(db, scan_id)
 
-    if not skin_analysis:
+    if not owner:
         raise HTTPException(status_code=404, detail="Skin analysis not found")
 
-    if skin_analysis.user_id != current_user.id:
+    if owner.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to access this analysis")
 
+    # Scan results never change once stored, so clients may keep them indefinitely
+    validator = Validator(scan_id, last_modified=owner.created_at, cache_control=IMMUTABLE)
+    if validator.matches(request):
+        return validator.not_modified()
+    validator.apply(response)
+
+    skin_analysis = crud_skin_analysis.get_skin_analysis_by_scan_id(db, scan_id)
+
     response_data = {
         "scanId": skin_analysis.scan_id,
         "skinHealthMatrix": {
@@ -172,10 +190,12 @@ async def get_skin_analysis(
 @router.get("/skin-analysis/user/{user_id}/history")
 async def get_user_skin_analysis_history(
         user_id: int,
+        request: Request,
+        response: Response,
         skip: int = 0,
         limit: int = 10,
         db: Session = Depends(get_db),
-        current_user=Depends(get_current_user)
+        current_user=Depends(get_current_principal)
 ):
     """
     Get user's skin analysis history with routine summaries
@@ -183,6 +203,12 @@ async def get_user_skin_analysis_history(
     if current_user.id != user_id:
         raise HTTPException(status_code=403, detail="Not authorized to access this user's history")
 
+    count, last_id, last_created_at = crud_skin_analysis.get_skin_analyses_state(db, user_id)
+    validator = Validator("history", user_id, skip, limit, count, last_id, last_modified=last_created_at)
+    if validator.matches(request):
+        return validator.not_modified()
+    validator.apply(response)
+
     analyses = crud_skin_analysis.get_skin_analyses_by_user_id(db, user_id, skip, limit)
 
     history_data = []
@@ -1,20 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks, Body
+import logging
+from fastapi import APIRouter, Depends, HTTPException, status, Body, Request, Response
 from sqlalchemy.orm import Session
 from fastapi.security import OAuth2PasswordRequestForm
 from app.schemas.user import UserCreate, UserRead, UserUpdate, UserLogin, Token, PasswordReset, PasswordChange, EmailRequest
 from app.schemas.otp import OTPVerify
 from app.crud import user as crud_user
-from app.crud import otp as crud_otp
-from app.core import security, email_utils
-from app.api.deps import get_db, get_current_user
+from app.services.otp_service import otp_service
+from app.crud import refresh_token as crud_refresh_token
+from app.crud import user_device as crud_user_device
+from app.core import security
+from app.api.deps import get_db, get_current_user, get_current_principal
+from app.core.http_cache import Validator, latest
 from jose import jwt
 from datetime import timedelta
 from app.crud import user_profile as crud_user_profile
 from app.schemas.user_profile import UserProfileCreate , UserProfileRead
-from app.schemas.user import UserWithProfileRead
+from app.schemas.user import UserWithProfileRead, Principal
 from pydantic import BaseModel
+from typing import Literal, Optional
 from app.models.user import User
 
+logger = logging.getLogger(__name__)
+
 
 # Custom login form without OAuth2 extra fields
 class SimpleLoginForm(BaseModel):
@@ -26,7 +33,7 @@ router = APIRouter()
 
 # Registration (send OTP)
 @router.post("/register", response_model=UserWithProfileRead)  # Changed response model
-def register_user(user_in: UserCreate, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+def register_user(user_in: UserCreate, db: Session = Depends(get_db)):
     db_user = crud_user.get_by_email(db, email=user_in.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
@@ -37,22 +44,23 @@ def register_user(user_in: UserCreate, background_tasks: BackgroundTasks, db: Se
     if user_in.profile:
         profile = crud_user_profile.create_profile(db, user.id, user_in.profile)
 
-    otp_obj = crud_otp.create_otp(db, user.email, "activation")
-    background_tasks.add_task(email_utils.send_otp_email, user.email, otp_obj.otp_code, "activation")
+    # The email is written to the outbox with the OTP and delivered by the outbox worker
+    otp_service.issue_and_email(db, user.email, "activation", "activation")
+    db.refresh(user)
 
     # Return user with profile data
     return {**user.__dict__, "profile": profile}
 
 # Resend activation OTP
 @router.post("/resend-activation-otp")
-def resend_activation_otp(email_req: EmailRequest, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+def resend_activation_otp(email_req: EmailRequest, db: Session = Depends(get_db)):
     user = crud_user.get_by_email(db, email=email_req.email)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     if user.is_verified:
         raise HTTPException(status_code=400, detail="User already activated")
-    otp_obj = crud_otp.create_otp(db, user.email, "activation")
-    background_tasks.add_task(email_utils.send_otp_email, user.email, otp_obj.otp_code, "activation")
+    # The email is written to the outbox with the OTP and delivered by the outbox worker
+    otp_service.issue_and_email(db, user.email, "activation", "activation")
     return {"msg": "Activation OTP resent"}
 
 # Verify activation OTP
@@ -61,10 +69,8 @@ def activate_user_otp(verify_in: OTPVerify, db: Session = Depends(get_db)):
     user = crud_user.get_by_email(db, email=verify_in.email)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    otp_obj = crud_otp.verify_otp(db, verify_in.email, verify_in.otp_code, "activation")
-    if not otp_obj:
+    if not otp_service.verify(db, verify_in.email, verify_in.otp_code, "activation"):
         raise HTTPException(status_code=400, detail="Invalid or expired OTP")
-    crud_otp.mark_otp_used(db, otp_obj)
     crud_user.set_verified(db, user, True)
     return {"msg": "User activated"}
 
@@ -72,7 +78,7 @@ def activate_user_otp(verify_in: OTPVerify, db: Session = Depends(get_db)):
 @router.post("/login", response_model=Token)
 def login_user(login_data: SimpleLoginForm, db: Session = Depends(get_db)):
     user = crud_user.get_by_email(db, email=login_data.email)
-    if not user or not crud_user.check_password(user, login_data.password):
+    if not user or not crud_user.check_password(user, login_data.password, db):
         raise HTTPException(status_code=400, detail="Incorrect email or password")
     if not user.is_verified:
         raise HTTPException(status_code=400, detail="User not activated")
@@ -84,23 +90,23 @@ def login_user(login_data: SimpleLoginForm, db: Session = Depends(get_db)):
     if is_first_login:
         crud_user.mark_first_login_completed(db, user)
     
-    access_token = security.create_access_token(
-        data={"sub": user.email}
-    )
+    access_token = security.create_user_access_token(user)
+    refresh_token, _ = crud_refresh_token.issue_refresh_token(db, user.id)
     return {
         "access_token": access_token, 
         "token_type": "bearer",
-        "is_first_login": is_first_login  # Return the original value (True for first time, False for subsequent)
+        "is_first_login": is_first_login,  # Return the original value (True for first time, False for subsequent)
+        "refresh_token": refresh_token,
+        "expires_in": security.ACCESS_TOKEN_EXPIRE_MINUTES * 60
     }
 
 # Forgot password (send OTP)
 @router.post("/forgot-password")
-def forgot_password(email_req: EmailRequest, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+def forgot_password(email_req: EmailRequest, db: Session = Depends(get_db)):
     user = crud_user.get_by_email(db, email=email_req.email)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    otp_obj = crud_otp.create_otp(db, user.email, "reset")
-    background_tasks.add_task(email_utils.send_otp_email, user.email, otp_obj.otp_code, "password reset")
+    otp_service.issue_and_email(db, user.email, "reset", "password reset")
     return {"msg": "Password reset OTP sent"}
 
 # Verify reset OTP and set new password
@@ -109,25 +115,34 @@ def reset_password_otp(verify_in: OTPVerify, reset_in: PasswordReset, db: Sessio
     user = crud_user.get_by_email(db, email=verify_in.email)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    otp_obj = crud_otp.verify_otp(db, verify_in.email, verify_in.otp_code, "reset")
-    if not otp_obj:
+    if not otp_service.verify(db, verify_in.email, verify_in.otp_code, "reset"):
         raise HTTPException(status_code=400, detail="Invalid or expired OTP")
-    crud_otp.mark_otp_used(db, otp_obj)
     crud_user.set_password(db, user, reset_in.password)
     return {"msg": "Password reset successful"}
 
 # Change password
 @router.post("/change-password")
 def change_password(change_in: PasswordChange, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
-    if not crud_user.check_password(current_user, change_in.old_password):
+    if not crud_user.check_password(current_user, change_in.old_password, db):
         raise HTTPException(status_code=400, detail="Old password incorrect")
     crud_user.set_password(db, current_user, change_in.new_password)
     return {"msg": "Password changed"}
 
 # Get user details
 @router.get("/me", response_model=UserWithProfileRead)
-def get_me(db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+def get_me(request: Request, response: Response, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
     profile = crud_user_profile.get_by_user_id(db, current_user.id)
+    # Without a profile there is no timestamp that would reveal its deletion, so rely on the ETag alone
+    last_modified = None
+    if profile is not None:
+        last_modified = latest(current_user.updated_at, current_user.created_at,
+                               profile.updated_at, profile.created_at)
+    validator = Validator("me", current_user.id, current_user.version,
+                          profile.id if profile else None, profile.version if profile else None,
+                          last_modified=last_modified)
+    if validator.matches(request):
+        return validator.not_modified()
+    validator.apply(response)
     return {**current_user.__dict__, "profile": profile}
 
 # Update user details
@@ -159,76 +174,98 @@ def verify_access_token(token: str = Body(...), db: Session = Depends(get_db)):
     return {"valid": True, "user": {"email": user.email, "id": user.id, "is_active": user.is_active, "is_verified": user.is_verified}}
 
 @router.post("/verify-refresh-token")
-def verify_refresh_token(token: str = Body(...)):
-    # Simulate refresh token verification (in real apps, use a separate refresh token secret/logic)
-    payload = security.decode_access_token(token)
-    if not payload:
+def verify_refresh_token(token: str = Body(...), db: Session = Depends(get_db)):
+    # Refresh tokens are single-use: each call rotates it, and replaying an old one revokes the whole family
+    rotated = crud_refresh_token.rotate_refresh_token(db, token)
+    if not rotated:
         raise HTTPException(status_code=401, detail="Invalid or expired refresh token")
-    email = payload.get("sub")
-    # Issue a new access token
-    new_access_token = security.create_access_token({"sub": email})
-    return {"valid": True, "access_token": new_access_token, "token_type": "bearer"}
+    new_refresh_token, db_token = rotated
+    user = db.query(User).filter(User.id == db_token.user_id).first()
+    if not user or not user.is_active:
+        crud_refresh_token.revoke_family(db, db_token.family_id)
+        raise HTTPException(status_code=401, detail="Invalid or expired refresh token")
+    new_access_token = security.create_user_access_token(user)
+    return {
+        "valid": True,
+        "access_token": new_access_token,
+        "refresh_token": new_refresh_token,
+        "token_type": "bearer",
+        "expires_in": security.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    }
+
+@router.post("/logout")
+def logout(token: str = Body(...), db: Session = Depends(get_db)):
+    """Revoke a refresh token (and its rotations) for the current device"""
+    crud_refresh_token.revoke_refresh_token(db, token)
+    return {"msg": "Logged out"}
+
+@router.post("/logout-all")
+def logout_all(db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+    """Revoke every refresh token and access token of the current user"""
+    revoked = crud_refresh_token.revoke_user_tokens(db, current_user.id)
+    crud_user.revoke_access_tokens(db, current_user)
+    return {"msg": "Logged out from all devices", "revoked": revoked}
 
 # Device Token Management for Push Notifications
 class DeviceTokenUpdate(BaseModel):
     device_token: str
+    platform: Optional[Literal["ios", "android", "web"]] = None
 
 @router.post("/device-token")
-async def update_device_token(
+def update_device_token(
     device_token_data: DeviceTokenUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """
-    Update user's device token for push notifications
-    
+    Register a device token for push notifications
+
     This endpoint is called by the mobile app when:
     1. User logs in
     2. App gets a new device token
     3. User wants to enable/disable notifications
+
+    Each of the user's devices keeps its own token; registering a known token
+    again just marks the device as recently seen.
     """
     try:
-        # Update user's device token
-        current_user.device_token = device_token_data.device_token
-        db.commit()
-        db.refresh(current_user)
-        
-        print(f"Device token updated for user {current_user.id}: {device_token_data.device_token[:20]}...")
-        
+        crud_user_device.register_device(db, current_user.id, device_token_data.device_token, device_token_data.platform)
+        logger.debug(f"Device token registered for user {current_user.id}")
+
         return {
             "message": "Device token updated successfully",
             "user_id": current_user.id,
             "device_token_updated": True
         }
     except Exception as e:
-        print(f"Error updating device token: {str(e)}")
+        logger.exception(f"Error updating device token: {str(e)}")
         raise HTTPException(
             status_code=500,
             detail="Failed to update device token"
         )
 
 @router.delete("/device-token")
-async def remove_device_token(
-    current_user: User = Depends(get_current_user),
+def remove_device_token(
+    device_token: Optional[str] = None,
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """
-    Remove user's device token (disable push notifications)
+    Remove a device token (disable push notifications on that device).
+    Without `device_token`, push notifications are disabled on all of the user's devices.
     """
     try:
-        current_user.device_token = None
-        db.commit()
-        db.refresh(current_user)
-        
-        print(f"Device token removed for user {current_user.id}")
-        
+        removed = crud_user_device.remove_devices(db, current_user.id, device_token)
+        logger.debug(f"Removed {removed} device tokens for user {current_user.id}")
+
         return {
             "message": "Device token removed successfully",
             "user_id": current_user.id,
-            "device_token_removed": True
+            "device_token_removed": True,
+            "devices_removed": removed
         }
     except Exception as e:
-        print(f"Error removing device token: {str(e)}")
+        logger.exception(f"Error removing device token: {str(e)}")
         raise HTTPException(
             status_code=500,
             detail="Failed to remove device token"
@@ -1,13 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 from app.schemas.user_profile import UserProfileCreate, UserProfileUpdate, UserProfileRead
 from app.crud import user_profile as crud_user_profile
-from app.api.deps import get_db, get_current_user
+from app.api.deps import get_db, get_current_principal
+from app.core.http_cache import Validator
 
 router = APIRouter()
 
 @router.post("/profile", response_model=UserProfileRead)
-def create_profile(profile_in: UserProfileCreate, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+def create_profile(profile_in: UserProfileCreate, db: Session = Depends(get_db), current_user=Depends(get_current_principal)):
     existing = crud_user_profile.get_by_user_id(db, current_user.id)
     if existing:
         raise HTTPException(status_code=400, detail="Profile already exists")
@@ -15,14 +16,18 @@ def create_profile(profile_in: UserProfileCreate, db: Session = Depends(get_db),
     return profile
 
 @router.get("/profile", response_model=UserProfileRead)
-def get_profile(db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+def get_profile(request: Request, response: Response, db: Session = Depends(get_db), current_user=Depends(get_current_principal)):
     profile = crud_user_profile.get_by_user_id(db, current_user.id)
     if not profile:
         raise HTTPException(status_code=404, detail="Profile not found")
+    validator = Validator("profile", profile.id, profile.version, last_modified=profile.updated_at or profile.created_at)
+    if validator.matches(request):
+        return validator.not_modified()
+    validator.apply(response)
     return profile
 
 @router.put("/profile", response_model=UserProfileRead)
-def update_profile(profile_in: UserProfileUpdate, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+def update_profile(profile_in: UserProfileUpdate, db: Session = Depends(get_db), current_user=Depends(get_current_principal)):
     profile = crud_user_profile.get_by_user_id(db, current_user.id)
     if not profile:
         raise HTTPException(status_code=404, detail="Profile not found")
@@ -30,7 +35,7 @@ def update_profile(profile_in: UserProfileUpdate, db: Session = Depends(get_db),
     return updated
 
 @router.delete("/profile", status_code=204)
-def delete_profile(db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+def delete_profile(db: Session = Depends(get_db), current_user=Depends(get_current_principal)):
     profile = crud_user_profile.get_by_user_id(db, current_user.id)
     if not profile:
         raise HTTPException(status_code=404, detail="Profile not found")
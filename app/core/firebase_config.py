@@ -1,5 +1,4 @@
 import os
-import json
 import logging
 from typing import Optional
 
@@ -8,7 +7,8 @@ logger = logging.getLogger(__name__)
 def create_firebase_credentials_json() -> Optional[dict]:
     """
     Create Firebase credentials JSON from environment variables
-    Returns the same JSON structure as the original service-account-key.json
+    Returns the same JSON structure as the original service-account-key.json;
+    it is passed to firebase_admin directly, so nothing is written to disk
     """
     try:
         # Check if all required environment variables are set
@@ -45,36 +45,3 @@ def create_firebase_credentials_json() -> Optional[dict]:
     except Exception as e:
         logger.error(f"Error creating Firebase credentials from environment: {str(e)}")
         return None
-
-def get_firebase_credentials_file_path() -> str:
-    """
-    Get the path to the Firebase credentials file
-    This maintains the same file path structure as before
-    """
-    return "firebase_credentials/service-account-key.json"
-
-def ensure_firebase_credentials_file() -> bool:
-    """
-    Ensure Firebase credentials file exists by creating it from environment variables
-    Returns True if successful, False otherwise
-    """
-    try:
-        # Create firebase_credentials directory if it doesn't exist
-        os.makedirs("firebase_credentials", exist_ok=True)
-
-        # Get credentials from environment variables
-        credentials = create_firebase_credentials_json()
-        if not credentials:
-            return False
-
-        # Write to the same file path as before
-        file_path = get_firebase_credentials_file_path()
-        with open(file_path, 'w') as f:
-            json.dump(credentials, f, indent=2)
-
-        logger.info(f"Firebase credentials file created at: {file_path}")
-        return True
-
-    except Exception as e:
-        logger.error(f"Error creating Firebase credentials file: {str(e)}")
-        return False
\ No newline at end of file
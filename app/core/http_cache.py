@@ -0,0 +1,85 @@
+"""
+Conditional GET support for read endpoints.
+
+Routes build a `Validator` from cheap columns (row versions, timestamps,
+counts) before loading or serializing the body. When the client's
+`If-None-Match` (or, without one, `If-Modified-Since`) shows its copy is
+current, `not_modified()` answers 304 with no body; otherwise `apply()` puts
+the ETag, Last-Modified and Cache-Control headers on the full response.
+
+All cached data is per user, so responses are `private`. Mutable resources use
+`no-cache` (clients keep the copy but revalidate on every use); immutable ones
+such as scan results get a long `max-age` and `immutable`.
+"""
+import hashlib
+import os
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Request, Response
+
+# Lifetime of responses that never change once created (scan results)
+IMMUTABLE_MAX_AGE_SECONDS = int(os.getenv("IMMUTABLE_MAX_AGE_SECONDS", str(365 * 24 * 3600)))
+
+REVALIDATE = "private, no-cache"
+IMMUTABLE = f"private, max-age={IMMUTABLE_MAX_AGE_SECONDS}, immutable"
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite hands back naive datetimes; server_default=func.now() stores UTC
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).replace(microsecond=0)
+
+
+def latest(*values: Optional[datetime]) -> Optional[datetime]:
+    """Most recent of several timestamps (naive or aware), ignoring missing ones"""
+    present = [_as_utc(value) for value in values if value is not None]
+    return max(present) if present else None
+
+
+class Validator:
+    """ETag (and optional Last-Modified) for one representation of a resource"""
+
+    def __init__(self, *parts, last_modified: Optional[datetime] = None, cache_control: str = REVALIDATE):
+        digest = hashlib.sha1(repr(parts).encode()).hexdigest()[:24]
+        # Weak: the same data may be serialized or compressed differently
+        self.etag = f'W/"{digest}"'
+        self.last_modified = _as_utc(last_modified) if last_modified else None
+        self.cache_control = cache_control
+
+    def headers(self) -> dict:
+        headers = {"ETag": self.etag, "Cache-Control": self.cache_control}
+        if self.last_modified:
+            headers["Last-Modified"] = format_datetime(self.last_modified, usegmt=True)
+        return headers
+
+    def matches(self, request: Request) -> bool:
+        """True when the client's cached copy is still current (RFC 9110 13.2.2 order)"""
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            if if_none_match.strip() == "*":
+                return True
+            # Weak comparison: W/"x" and "x" name the same entity
+            opaque = self.etag[2:]
+            return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since and self.last_modified:
+            try:
+                since = parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+            if since.tzinfo is None:
+                since = since.replace(tzinfo=timezone.utc)
+            return self.last_modified <= since
+        return False
+
+    def not_modified(self) -> Response:
+        return Response(status_code=304, headers=self.headers())
+
+    def apply(self, response: Response):
+        """Add the validator headers to the response FastAPI is building"""
+        for name, value in self.headers().items():
+            response.headers[name] = value
@@ -0,0 +1,99 @@
+"""
+Process lifecycle helpers shared by the web app and the workers.
+
+`inflight` counts units of work that must not be cut off by a shutdown
+(reminder ticks, outbox batches, skin analyses); `TaskSupervisor` owns the
+long-running background loops so they are not garbage-collected and their
+crashes are logged.
+"""
+import asyncio
+import logging
+import os
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Coroutine, Dict
+
+from app.core import metrics
+
+logger = logging.getLogger(__name__)
+
+# How long shutdown may wait for in-flight work before cancelling it
+SHUTDOWN_DRAIN_SECONDS = float(os.getenv("SHUTDOWN_DRAIN_SECONDS", "25"))
+
+
+class InflightTracker:
+    """Thread-safe counters of work in progress, by kind"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._active = Counter()
+        self.completed = Counter()
+
+    @contextmanager
+    def track(self, kind: str):
+        with self._lock:
+            self._active[kind] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._active[kind] -= 1
+                self.completed[kind] += 1
+
+    def active(self) -> Dict[str, int]:
+        with self._lock:
+            return {kind: count for kind, count in self._active.items() if count}
+
+    async def wait_idle(self, timeout: float, poll_seconds: float = 0.05) -> bool:
+        """Wait until nothing is in flight; returns False if the timeout ran out first"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while self.active():
+            if loop.time() >= deadline:
+                return False
+            await asyncio.sleep(poll_seconds)
+        return True
+
+
+class TaskSupervisor:
+    """Keeps strong references to background tasks and reports how they end"""
+
+    def __init__(self):
+        self.tasks: Dict[str, asyncio.Task] = {}
+
+    def start(self, name: str, coro: Coroutine) -> asyncio.Task:
+        task = asyncio.create_task(coro, name=name)
+        self.tasks[name] = task
+        task.add_done_callback(self._on_done)
+        return task
+
+    def _on_done(self, task: asyncio.Task):
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is not None:
+            logger.error(f"Background task {task.get_name()} crashed: {error!r}", exc_info=error)
+        else:
+            logger.info(f"Background task {task.get_name()} finished")
+
+    async def stop(self, timeout: float):
+        """Cancel every task (they should already be idle) and wait for them to unwind"""
+        tasks = [task for task in self.tasks.values() if not task.done()]
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.wait(tasks, timeout=max(timeout, 0))
+        self.tasks.clear()
+
+
+def remaining(deadline: float) -> float:
+    return max(deadline - asyncio.get_running_loop().time(), 0)
+
+
+# Global in-flight work tracker
+inflight = InflightTracker()
+
+metrics.registry.gauge(
+    "inflight_work", "Requests and background jobs a shutdown would wait for", ("kind",),
+    callback=inflight.active)
@@ -0,0 +1,95 @@
+import os
+import time
+import logging
+from typing import Optional
+
+from app.core.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "30"))
+PRINCIPAL_CACHE_MAX_ENTRIES = int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", "10000"))
+# Optional file shared by all workers on a host; bumping it invalidates every worker's cache
+PRINCIPAL_CACHE_VERSION_FILE = os.getenv("PRINCIPAL_CACHE_VERSION_FILE")
+PRINCIPAL_CACHE_VERSION_POLL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_VERSION_POLL_SECONDS", "1"))
+
+
+class PrincipalCache:
+    """
+    In-process cache of authenticated users keyed by token subject (email).
+
+    Values are plain column snapshots, never live ORM instances, so a cached
+    principal can be re-attached to any request session without a query.
+    When PRINCIPAL_CACHE_VERSION_FILE is set, invalidations also bump a shared
+    version counter so other workers drop their entries on the next poll.
+    """
+
+    def __init__(self, ttl: float = PRINCIPAL_CACHE_TTL_SECONDS,
+                 maxsize: int = PRINCIPAL_CACHE_MAX_ENTRIES,
+                 version_file: Optional[str] = PRINCIPAL_CACHE_VERSION_FILE):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.version_file = version_file
+        self._version = self._read_shared_version()
+        self._version_checked_at = time.monotonic()
+        self.invalidations = 0
+
+    def get(self, subject: str) -> Optional[dict]:
+        self._sync_shared_version()
+        return self._cache.get(subject)
+
+    def set(self, subject: str, snapshot: dict):
+        self._cache.set(subject, snapshot)
+
+    def invalidate(self, subject: str):
+        """Drop a single principal, locally and (if configured) on other workers"""
+        self._cache.pop(subject)
+        self.invalidations += 1
+        self._bump_shared_version()
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        stats = self._cache.stats()
+        stats["invalidations"] = self.invalidations
+        stats["version"] = self._version
+        return stats
+
+    def _read_shared_version(self) -> int:
+        if not self.version_file:
+            return 0
+        try:
+            with open(self.version_file) as f:
+                return int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def _bump_shared_version(self):
+        if not self.version_file:
+            return
+        # Nanosecond timestamps are unique enough to act as a monotonically changing counter
+        version = time.time_ns()
+        try:
+            tmp_path = f"{self.version_file}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                f.write(str(version))
+            os.replace(tmp_path, self.version_file)
+            self._version = version
+        except OSError as e:
+            logger.warning(f"Could not bump principal cache version: {e}")
+
+    def _sync_shared_version(self):
+        if not self.version_file:
+            return
+        now = time.monotonic()
+        if now - self._version_checked_at < PRINCIPAL_CACHE_VERSION_POLL_SECONDS:
+            return
+        self._version_checked_at = now
+        version = self._read_shared_version()
+        if version != self._version:
+            self._version = version
+            self._cache.clear()
+
+
+# Global principal cache
+principal_cache = PrincipalCache()
@@ -0,0 +1,173 @@
+"""
+On-demand profiling for a running process.
+
+`SamplingProfiler` samples every thread's Python stack from a background
+thread (sys._current_frames) and returns collapsed stacks, the input format of
+flamegraph.pl, speedscope and most flamegraph viewers. Overhead is one stack
+walk per thread per interval, so it is safe to run briefly in production.
+
+`RequestProfilerMiddleware` runs cProfile around a single request when it
+carries both `X-Profile: 1` and a valid `X-Admin-Token`; the result is kept in
+memory and fetched from /admin/profile/requests/{id}.
+
+Password hashing runs in the hasher's worker processes, so bcrypt time shows up
+here only as the request thread waiting on the pool.
+"""
+import cProfile
+import io
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional
+
+from app.core.security import is_admin_token
+
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "60"))
+PROFILE_DEFAULT_INTERVAL_MS = float(os.getenv("PROFILE_DEFAULT_INTERVAL_MS", "10"))
+# Per-request profiles kept in memory, oldest dropped first
+PROFILE_KEEP_REQUESTS = int(os.getenv("PROFILE_KEEP_REQUESTS", "20"))
+
+
+class ProfilerBusy(Exception):
+    pass
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    # Keep the last two path components: enough to tell app/ from site-packages/
+    filename = "/".join(code.co_filename.rsplit("/", 2)[-2:])
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """Thread-based sampling profiler; one profile runs at a time per process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.runs = 0
+
+    def run(self, seconds: float, interval_ms: float = PROFILE_DEFAULT_INTERVAL_MS) -> dict:
+        """Sample all threads for `seconds` (blocking) and return the collapsed stacks"""
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy("A profile is already running")
+        try:
+            seconds = min(seconds, PROFILE_MAX_SECONDS)
+            interval = max(interval_ms, 1) / 1000
+            me = threading.get_ident()
+            stacks: Counter = Counter()
+            samples = 0
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                for ident, frame in sys._current_frames().items():
+                    if ident == me:
+                        continue
+                    labels = []
+                    while frame is not None:
+                        labels.append(_frame_label(frame))
+                        frame = frame.f_back
+                    labels.append(names.get(ident, f"thread-{ident}"))
+                    stacks[";".join(reversed(labels))] += 1
+                samples += 1
+                time.sleep(interval)
+            self.runs += 1
+            return {"seconds": seconds, "interval_ms": interval * 1000, "samples": samples, "stacks": stacks}
+        finally:
+            self._lock.release()
+
+    @staticmethod
+    def collapsed(stacks: Counter) -> str:
+        """Brendan Gregg's folded format: "root;caller;callee count" per line"""
+        return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+class RequestProfiles:
+    """The most recent per-request cProfile results"""
+
+    def __init__(self, keep: int = PROFILE_KEEP_REQUESTS):
+        self.keep = keep
+        self._profiles: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, profile_id: str, method: str, path: str, status: int, seconds: float,
+            profiler: cProfile.Profile):
+        profiler.create_stats()
+        with self._lock:
+            self._profiles[profile_id] = {
+                "id": profile_id, "method": method, "path": path, "status": status,
+                "seconds": round(seconds, 4), "created_at": time.time(),
+                # Same bytes pstats.dump_stats writes, so snakeviz and pstats can load them
+                "pstats": marshal.dumps(profiler.stats),
+            }
+            while len(self._profiles) > self.keep:
+                self._profiles.popitem(last=False)
+
+    def get(self, profile_id: str) -> Optional[dict]:
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def list(self) -> List[dict]:
+        with self._lock:
+            return [{k: v for k, v in p.items() if k != "pstats"} for p in reversed(self._profiles.values())]
+
+    @staticmethod
+    def text(profile: dict, sort: str = "cumulative", limit: int = 50) -> str:
+        out = io.StringIO()
+        stats = pstats.Stats(stream=out)
+        stats.stats = marshal.loads(profile["pstats"])
+        stats.get_top_level_stats()
+        stats.sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+
+class RequestProfilerMiddleware:
+    """ASGI middleware running cProfile around requests that ask for it with an admin token"""
+
+    def __init__(self, app):
+        self.app = app
+        # The event loop thread can only have one active cProfile
+        self._profiling = False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self._profiling:
+            await self.app(scope, receive, send)
+            return
+        headers: Dict[bytes, bytes] = dict(scope["headers"])
+        if headers.get(b"x-profile") != b"1" or not is_admin_token(headers.get(b"x-admin-token", b"").decode("latin-1")):
+            await self.app(scope, receive, send)
+            return
+
+        # cProfile follows the event loop thread only: that covers async routes
+        # and anything they block on, but also other requests interleaved on the
+        # loop meanwhile. Sync routes run in the threadpool and are better seen
+        # with the sampling profiler.
+        self._profiling = True
+        profiler = cProfile.Profile()
+        status = {"code": 500}
+        profile_id = uuid.uuid4().hex[:12]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.disable()
+            self._profiling = False
+            request_profiles.add(profile_id, scope["method"], scope["path"], status["code"],
+                                 time.perf_counter() - started, profiler)
+
+
+# Global profilers
+sampling_profiler = SamplingProfiler()
+request_profiles = RequestProfiles()
@@ -1,17 +1,48 @@
+import os
+import time
+import hashlib
+import secrets
 from passlib.context import CryptContext
 from jose import jwt, JWTError
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
+from app.core.cache import TTLCache
 
-SECRET_KEY = "supersecretkey"
+SECRET_KEY = os.getenv("SECRET_KEY", "supersecretkey")
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 3000
+# Access tokens are short-lived; revocation is checked against the cached user, not a per-token lookup
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "15"))
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "30"))
+ACCESS_TOKEN_TYPE = "access"
+# Verified-token cache; 0 disables it and every request runs a full jwt.decode
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "50000"))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Decoded payloads keyed by sha256(token), each kept until the token's own exp
+_token_cache = TTLCache(maxsize=TOKEN_CACHE_MAX_ENTRIES, ttl=ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+# Tokens revoked before their exp, and per-subject "not before" cutoffs.
+# Entries only need to outlive the tokens they reject. The subject cutoffs only
+# cover this process; the durable one is users.tokens_valid_after, checked in deps.
+_revoked_tokens = TTLCache(maxsize=100000, ttl=ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+_revoked_subjects = TTLCache(maxsize=100000, ttl=ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+
+# bcrypt work factor; hashes created with a different cost are upgraded on next login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+# Guards the /admin endpoints and per-request profiling; leaving it unset disables them
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+def is_admin_token(value: Optional[str]) -> bool:
+    return bool(ADMIN_TOKEN and value) and secrets.compare_digest(value.encode(), ADMIN_TOKEN.encode())
 
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
+def verify_and_update_password(plain_password, hashed_password) -> Tuple[bool, Optional[str]]:
+    """Verify a password and return a replacement hash if the stored one is outdated"""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
 def get_password_hash(password):
     return pwd_context.hash(password)
 
@@ -21,13 +52,89 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    # iat keeps sub-second precision (a NumericDate may be fractional), so a token issued
+    # right after revoke_subject_tokens in the same second is still told apart from older ones
+    to_encode.update({"exp": expire, "iat": time.time()})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 def decode_access_token(token: str):
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
-    except JWTError:
-        return None 
\ No newline at end of file
+    """
+    Decode and verify an access token.
+    Verified payloads are cached until the token expires, so repeat requests
+    with the same token skip the signature check. The returned dict is shared
+    with the cache and must not be mutated.
+    """
+    key = _token_key(token)
+    if _revoked_tokens.get(key) is not None:
+        return None
+
+    payload = _token_cache.get(key) if TOKEN_CACHE_MAX_ENTRIES > 0 else None
+    if payload is None:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError:
+            return None
+        if TOKEN_CACHE_MAX_ENTRIES > 0:
+            _token_cache.set(key, payload, ttl=_seconds_until_expiry(payload))
+
+    if _is_subject_revoked(payload):
+        _token_cache.pop(key)
+        return None
+    return payload
+
+def revoke_access_token(token: str):
+    """Reject a single access token for the rest of its lifetime"""
+    key = _token_key(token)
+    _token_cache.pop(key)
+    _revoked_tokens.set(key, True)
+
+def revoke_subject_tokens(subject: str):
+    """Reject every access token issued to a subject up to now (password change, deactivation)"""
+    _revoked_subjects.set(subject, time.time())
+
+def invalidate_token_cache():
+    _token_cache.clear()
+
+def token_cache_stats() -> dict:
+    return _token_cache.stats()
+
+def _token_key(token: str) -> bytes:
+    return hashlib.sha256(token.encode("utf-8")).digest()
+
+def _seconds_until_expiry(payload: dict) -> float:
+    exp = payload.get("exp")
+    if exp is None:
+        return ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    return float(exp) - time.time()
+
+def _is_subject_revoked(payload: dict) -> bool:
+    return is_issued_before(payload, _revoked_subjects.get(payload.get("sub")))
+
+def is_issued_before(payload: dict, cutoff: Optional[float]) -> bool:
+    """True when the token was issued at or before a revocation cutoff (epoch seconds)"""
+    if cutoff is None:
+        return False
+    # Tokens from before fractional iat carry whole seconds and are rejected for the whole revocation second
+    return payload.get("iat", 0) <= cutoff
+
+def create_user_access_token(user) -> str:
+    """
+    Issue a short-lived access token for a user.
+    Besides the subject it embeds the user id and status flags, so tokens of
+    deactivated accounts can be rejected before any lookup.
+    """
+    return create_access_token({
+        "sub": user.email,
+        "uid": user.id,
+        "act": bool(user.is_active),
+        "vrf": bool(user.is_verified),
+        "typ": ACCESS_TOKEN_TYPE,
+    })
+
+def generate_refresh_token() -> str:
+    """Generate an opaque refresh token; only its hash is ever stored"""
+    return secrets.token_urlsafe(48)
+
+def hash_refresh_token(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
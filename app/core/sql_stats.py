@@ -0,0 +1,214 @@
+"""
+Per-scope SQL statement statistics.
+
+Engine events count and time every statement run inside a scope: an HTTP
+request (`SQLStatsMiddleware`) or a background unit of work (`track_queries`).
+Statements are fingerprinted with literals and IN-lists collapsed; a scope that
+runs the same fingerprint SQL_N_PLUS_ONE_THRESHOLD times or more is logged as a
+likely N+1. Statements slower than SQL_SLOW_QUERY_MS are logged with their
+EXPLAIN plan.
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core import metrics
+from app.core.security import is_admin_token
+from app.core.timing import current_timer
+
+logger = logging.getLogger(__name__)
+
+SQL_N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "5"))
+SQL_SLOW_QUERY_MS = float(os.getenv("SQL_SLOW_QUERY_MS", "200"))
+# Each slow fingerprint is EXPLAINed at most once per interval
+SQL_EXPLAIN_INTERVAL_SECONDS = float(os.getenv("SQL_EXPLAIN_INTERVAL_SECONDS", "300"))
+# Add X-SQL-* headers to every response; requests with a valid X-Admin-Token always get them
+SQL_DEBUG_HEADERS = os.getenv("SQL_DEBUG_HEADERS", "false").lower() == "true"
+
+_PLACEHOLDER = r"(?:\?|%s|%\(\w+\)s|:\w+)"
+_IN_LIST = re.compile(rf"\(\s*{_PLACEHOLDER}(?:\s*,\s*{_PLACEHOLDER})+\s*\)")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_WHITESPACE = re.compile(r"\s+")
+
+sql_n_plus_one_total = metrics.registry.counter(
+    "sql_n_plus_one_total", "Scopes that repeated one statement fingerprint past the N+1 threshold", ("scope",))
+sql_slow_queries_total = metrics.registry.counter(
+    "sql_slow_queries_total", "Statements slower than SQL_SLOW_QUERY_MS")
+sql_statements_per_scope = metrics.registry.histogram(
+    "sql_statements_per_scope", "Statements run per request or background tick", ("scope",),
+    buckets=(1, 2, 5, 10, 20, 50, 100, 250, 1000))
+
+
+def fingerprint(statement: str) -> str:
+    """Normalize a statement so repeats differing only in values compare equal"""
+    statement = _STRING.sub("?", statement)
+    statement = _NUMBER.sub("?", statement)
+    statement = _IN_LIST.sub("(?+)", statement)
+    return _WHITESPACE.sub(" ", statement).strip()
+
+
+class QueryStats:
+    """Statements run in one scope, grouped by fingerprint"""
+
+    def __init__(self, scope: str):
+        self.scope = scope
+        self.count = 0
+        self.seconds = 0.0
+        self.fingerprints: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def add(self, statement: str, seconds: float):
+        key = fingerprint(statement)
+        with self._lock:
+            self.count += 1
+            self.seconds += seconds
+            self.fingerprints[key] += 1
+
+    def repeated(self, threshold: int = SQL_N_PLUS_ONE_THRESHOLD) -> List[tuple]:
+        with self._lock:
+            return [(key, n) for key, n in self.fingerprints.most_common() if n >= threshold]
+
+    def duplicates(self) -> int:
+        """Statements beyond the first of each fingerprint"""
+        with self._lock:
+            return self.count - len(self.fingerprints)
+
+    def finish(self):
+        """Record the scope's totals and flag N+1 patterns"""
+        sql_statements_per_scope.observe(self.count, scope=self.scope)
+        for key, n in self.repeated():
+            sql_n_plus_one_total.inc(scope=self.scope)
+            logger.warning(json.dumps({
+                "event": "sql_n_plus_one", "scope": self.scope, "count": n, "fingerprint": key[:500],
+            }))
+
+    def headers(self) -> List[tuple]:
+        return [
+            (b"x-sql-count", str(self.count).encode()),
+            (b"x-sql-time-ms", f"{self.seconds * 1000:.1f}".encode()),
+            (b"x-sql-duplicates", str(self.duplicates()).encode()),
+        ]
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+@contextmanager
+def track_queries(scope: str):
+    """Collect statement stats for a background unit of work (a tick, a batch)"""
+    stats = QueryStats(scope)
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+        stats.finish()
+
+
+class _Explainer:
+    """Runs EXPLAIN for slow statements, at most once per fingerprint per interval"""
+
+    def __init__(self):
+        self._last: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def due(self, key: str) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last.get(key, -SQL_EXPLAIN_INTERVAL_SECONDS) < SQL_EXPLAIN_INTERVAL_SECONDS:
+                return False
+            self._last[key] = now
+            return True
+
+    def plan(self, conn, statement: str, parameters) -> Optional[list]:
+        prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+        # The raw DBAPI cursor keeps the EXPLAIN itself out of the engine events
+        cursor = conn.connection.dbapi_connection.cursor()
+        try:
+            cursor.execute(prefix + statement, parameters)
+            return [list(row) for row in cursor.fetchall()]
+        except Exception as e:
+            return [f"EXPLAIN failed: {e}"]
+        finally:
+            cursor.close()
+
+
+_explainer = _Explainer()
+
+
+def _log_slow_query(conn, statement: str, parameters, seconds: float, executemany: bool):
+    sql_slow_queries_total.inc()
+    key = fingerprint(statement)
+    if not _explainer.due(key):
+        return
+    stats = _current_stats.get()
+    plan = None
+    # Only reads are safe to EXPLAIN everywhere (EXPLAIN on some backends can run DML)
+    if not executemany and statement.lstrip().upper().startswith("SELECT"):
+        plan = _explainer.plan(conn, statement, parameters)
+    logger.warning(json.dumps({
+        "event": "slow_query", "scope": stats.scope if stats else None, "ms": round(seconds * 1000, 1),
+        "fingerprint": key[:1000], "plan": plan,
+    }, default=str))
+
+
+def instrument_engine(engine: Engine):
+    """Count and time every statement on `engine` for the current request or tracked scope"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info["query_started"].pop()
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.add(statement, seconds)
+        timer = current_timer()
+        if timer is not None:
+            timer.add_statement(statement, seconds)
+        if seconds * 1000 >= SQL_SLOW_QUERY_MS:
+            _log_slow_query(conn, statement, parameters, seconds, executemany)
+
+
+class SQLStatsMiddleware:
+    """ASGI middleware giving each request its own QueryStats, optionally exposed as X-SQL-* headers"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats(f"{scope['method']} {scope['path']}")
+        token = _current_stats.set(stats)
+        show_headers = SQL_DEBUG_HEADERS or is_admin_token(
+            dict(scope["headers"]).get(b"x-admin-token", b"").decode("latin-1"))
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and show_headers:
+                message["headers"] = list(message.get("headers", [])) + stats.headers()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_stats.reset(token)
+            # Label by route template (known once routing ran) to keep the metric's series bounded
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            stats.scope = f"{scope['method']} {route}"
+            stats.finish()
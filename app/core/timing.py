@@ -0,0 +1,136 @@
+"""
+Request-scoped timing spans.
+
+`ServerTimingMiddleware` starts a `RequestTimer` for every HTTP request and
+keeps it in a context variable; code on the request path wraps its stages in
+`span("name")`, and app.core.sql_stats adds every SQL statement. The
+totals go out as a `Server-Timing` header (shown per request in browser dev
+tools) and requests slower than SLOW_REQUEST_MS are logged as one JSON line
+with their breakdown.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Requests taking at least this long are logged with their span breakdown
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "1000"))
+# The header exposes internal timings; disable it if clients must not see them
+SERVER_TIMING_HEADER = os.getenv("SERVER_TIMING_HEADER", "true").lower() == "true"
+# Slow-request logs keep at most this many of the slowest SQL statements
+SLOW_REQUEST_MAX_STATEMENTS = int(os.getenv("SLOW_REQUEST_MAX_STATEMENTS", "5"))
+
+
+class RequestTimer:
+    """Accumulated span durations for one request, keyed by span name"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans: Dict[str, List[float]] = {}
+        self.statements: List[tuple] = []
+        # Spans can be recorded from threadpool threads running the same request
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float):
+        with self._lock:
+            span = self.spans.setdefault(name, [0.0, 0])
+            span[0] += seconds
+            span[1] += 1
+
+    def add_statement(self, statement: str, seconds: float):
+        self.add("sql", seconds)
+        with self._lock:
+            self.statements.append((seconds, statement))
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def header(self, total: float) -> str:
+        with self._lock:
+            spans = list(self.spans.items())
+        parts = []
+        for name, (seconds, count) in spans:
+            part = f"{name};dur={seconds * 1000:.1f}"
+            if count > 1:
+                part += f';desc="{count}x"'
+            parts.append(part)
+        parts.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(parts)
+
+    def summary(self) -> dict:
+        with self._lock:
+            slowest = sorted(self.statements, reverse=True)[:SLOW_REQUEST_MAX_STATEMENTS]
+            return {
+                "spans_ms": {name: round(seconds * 1000, 1) for name, (seconds, _) in self.spans.items()},
+                "sql_count": len(self.statements),
+                "slowest_sql": [{"ms": round(s * 1000, 1), "sql": sql[:300]} for s, sql in slowest],
+            }
+
+
+_current_timer: ContextVar[Optional[RequestTimer]] = ContextVar("request_timer", default=None)
+
+
+def current_timer() -> Optional[RequestTimer]:
+    return _current_timer.get()
+
+
+@contextmanager
+def span(name: str):
+    """Time a block as part of the current request; a no-op outside a request"""
+    timer = _current_timer.get()
+    if timer is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.add(name, time.perf_counter() - started)
+
+
+class ServerTimingMiddleware:
+    """ASGI middleware adding a Server-Timing header and logging slow requests"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timer = RequestTimer()
+        token = _current_timer.set(timer)
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                if SERVER_TIMING_HEADER:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", timer.header(timer.elapsed()).encode("latin-1")))
+                    message["headers"] = headers
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_timer.reset(token)
+            total_ms = timer.elapsed() * 1000
+            if total_ms >= SLOW_REQUEST_MS:
+                route = getattr(scope.get("route"), "path", None)
+                logger.warning(json.dumps({
+                    "event": "slow_request",
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "route": route,
+                    "status": status["code"],
+                    "duration_ms": round(total_ms, 1),
+                    **timer.summary(),
+                }))
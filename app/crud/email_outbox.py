@@ -0,0 +1,114 @@
+from sqlalchemy import and_, bindparam, or_, update
+from sqlalchemy.orm import Session
+from app.models.email_outbox import EmailOutbox
+from datetime import datetime, timedelta
+from typing import List, Tuple
+import uuid
+
+PENDING = "pending"
+SENDING = "sending"
+SENT = "sent"
+DEAD = "dead"
+
+
+def enqueue_email(db: Session, to_email: str, subject: str, body: str, commit: bool = True) -> EmailOutbox:
+    """
+    Record an email for delivery by the outbox worker.
+    Pass commit=False to write it in the same transaction as the change that triggered it.
+    """
+    db_email = EmailOutbox(
+        to_email=to_email,
+        subject=subject,
+        body=body,
+        status=PENDING,
+        attempts=0,
+        next_attempt_at=datetime.utcnow()
+    )
+    db.add(db_email)
+    if commit:
+        db.commit()
+        db.refresh(db_email)
+    return db_email
+
+
+def _claimable(now: datetime, lease_seconds: int):
+    # Rows stuck in "sending" belong to a worker that died mid-batch
+    return or_(
+        and_(EmailOutbox.status == PENDING, EmailOutbox.next_attempt_at <= now),
+        and_(EmailOutbox.status == SENDING, EmailOutbox.claimed_at <= now - timedelta(seconds=lease_seconds))
+    )
+
+
+def claim_batch(db: Session, batch_size: int = 50, lease_seconds: int = 300) -> List[EmailOutbox]:
+    """
+    Atomically claim up to batch_size due emails for this worker.
+    Rows are tagged with a fresh claim token, so concurrent workers never send the same email.
+    """
+    now = datetime.utcnow()
+    ids = [row.id for row in db.query(EmailOutbox.id).filter(
+        _claimable(now, lease_seconds)
+    ).order_by(EmailOutbox.next_attempt_at.asc()).limit(batch_size)]
+    if not ids:
+        return []
+
+    claim_token = uuid.uuid4().hex
+    db.query(EmailOutbox).filter(
+        EmailOutbox.id.in_(ids),
+        _claimable(now, lease_seconds)
+    ).update({
+        EmailOutbox.status: SENDING,
+        EmailOutbox.claim_token: claim_token,
+        EmailOutbox.claimed_at: now
+    }, synchronize_session=False)
+    db.commit()
+    return db.query(EmailOutbox).filter(EmailOutbox.claim_token == claim_token).all()
+
+
+def complete_batch(db: Session, claim_token: str, sent_ids: List[int], failures: List[Tuple[int, int, str]],
+                   max_attempts: int, base_backoff_seconds: float, max_backoff_seconds: float) -> List[int]:
+    """
+    Record a delivered batch in one transaction: sent rows, retries with
+    exponential backoff, and dead letters. Every UPDATE is scoped to the batch's
+    claim token, so a worker whose lease expired cannot overwrite rows another
+    worker has claimed since. Bodies of finished rows are blanked so OTPs are
+    not kept in plain text. `failures` holds (id, attempts before this one,
+    error) per failed email. Returns the ids of dead-lettered emails.
+    """
+    now = datetime.utcnow()
+    table = EmailOutbox.__table__
+    if sent_ids:
+        db.execute(update(table).where(table.c.id.in_(sent_ids), table.c.claim_token == claim_token).values(
+            status=SENT, attempts=table.c.attempts + 1, sent_at=now, last_error=None, body=""
+        ))
+
+    retries, dead = [], []
+    for email_id, previous_attempts, error in failures:
+        attempts = previous_attempts + 1
+        params = {"b_id": email_id, "b_attempts": attempts, "b_error": error}
+        if attempts >= max_attempts:
+            dead.append(params)
+        else:
+            backoff = min(base_backoff_seconds * (2 ** (attempts - 1)), max_backoff_seconds)
+            retries.append({**params, "b_next_attempt_at": now + timedelta(seconds=backoff)})
+
+    # Per-row values go out as one executemany UPDATE each
+    in_batch = and_(table.c.id == bindparam("b_id"), table.c.claim_token == claim_token)
+    if retries:
+        db.execute(update(table).where(in_batch).values(
+            status=PENDING, attempts=bindparam("b_attempts"), last_error=bindparam("b_error"),
+            next_attempt_at=bindparam("b_next_attempt_at")
+        ), retries)
+    if dead:
+        db.execute(update(table).where(in_batch).values(
+            status=DEAD, attempts=bindparam("b_attempts"), last_error=bindparam("b_error"), body=""
+        ), dead)
+    db.commit()
+    return [params["b_id"] for params in dead]
+
+
+def count_backlog(db: Session) -> int:
+    return db.query(EmailOutbox).filter(EmailOutbox.status.in_([PENDING, SENDING])).count()
+
+
+def count_dead(db: Session) -> int:
+    return db.query(EmailOutbox).filter(EmailOutbox.status == DEAD).count()
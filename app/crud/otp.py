@@ -1,29 +1,72 @@
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from app.models.otp import OTP
 from datetime import datetime, timedelta
-import random
+from typing import Optional
+import hmac
+import secrets
 
 def generate_otp():
-    return str(random.randint(100000, 999999))
+    return str(secrets.randbelow(900000) + 100000)
 
-def create_otp(db: Session, email: str, purpose: str, expires_minutes: int = 10):
+def create_otp(db: Session, email: str, purpose: str, expires_minutes: int = 10, commit: bool = True):
+    """
+    Issue a fresh OTP for (email, purpose), replacing any previous code in place.
+    Pass commit=False to write it as part of a larger transaction.
+    """
     otp_code = generate_otp()
     expires_at = datetime.utcnow() + timedelta(minutes=expires_minutes)
-    otp = OTP(email=email, otp_code=otp_code, purpose=purpose, expires_at=expires_at, is_used=False)
-    db.add(otp)
-    db.commit()
-    db.refresh(otp)
+    otp = get_latest_otp(db, email, purpose)
+    if otp is None:
+        otp = OTP(email=email, purpose=purpose)
+        db.add(otp)
+    otp.otp_code = otp_code
+    otp.expires_at = expires_at
+    otp.is_used = False
+    otp.attempts = 0
+    otp.created_at = datetime.utcnow()
+    try:
+        db.flush()
+    except IntegrityError:
+        # A concurrent request inserted the row first. Rolling back would also
+        # discard the caller's pending writes, so only retry when we own the transaction
+        if not commit:
+            raise
+        db.rollback()
+        return create_otp(db, email, purpose, expires_minutes, commit)
+    if commit:
+        db.commit()
+        db.refresh(otp)
     return otp
 
 def get_latest_otp(db: Session, email: str, purpose: str):
     return db.query(OTP).filter(OTP.email == email, OTP.purpose == purpose).order_by(OTP.expires_at.desc()).first()
 
-def verify_otp(db: Session, email: str, otp_code: str, purpose: str):
-    otp = db.query(OTP).filter(OTP.email == email, OTP.otp_code == otp_code, OTP.purpose == purpose, OTP.is_used == False, OTP.expires_at > datetime.utcnow()).first()
+def verify_otp(db: Session, email: str, otp_code: str, purpose: str, max_attempts: int = 5) -> Optional[OTP]:
+    """
+    Check a code against the single active OTP for (email, purpose).
+    Wrong guesses are counted; after max_attempts the code is no longer accepted.
+    """
+    otp = get_latest_otp(db, email, purpose)
+    if not otp or otp.is_used or otp.expires_at <= datetime.utcnow() or otp.attempts >= max_attempts:
+        return None
+    if not hmac.compare_digest(otp.otp_code.encode(), otp_code.encode()):
+        otp.attempts += 1
+        db.commit()
+        return None
     return otp
 
 def mark_otp_used(db: Session, otp: OTP):
     otp.is_used = True
     db.commit()
     db.refresh(otp)
-    return otp 
\ No newline at end of file
+    return otp
+
+def purge_expired_otps(db: Session) -> int:
+    """Delete used and expired OTP rows"""
+    count = db.query(OTP).filter(
+        or_(OTP.is_used == True, OTP.expires_at <= datetime.utcnow())
+    ).delete(synchronize_session=False)
+    db.commit()
+    return count
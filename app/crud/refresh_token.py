@@ -0,0 +1,96 @@
+from sqlalchemy.orm import Session
+from app.models.refresh_token import RefreshToken
+from app.core.security import generate_refresh_token, hash_refresh_token, REFRESH_TOKEN_EXPIRE_DAYS
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+import logging
+import uuid
+
+logger = logging.getLogger(__name__)
+
+
+def issue_refresh_token(db: Session, user_id: int, family_id: Optional[str] = None,
+                        commit: bool = True) -> Tuple[str, RefreshToken]:
+    """
+    Create a refresh token; returns the raw token (shown to the client once) and its record.
+    Pass commit=False to write it as part of a larger transaction.
+    """
+    raw_token = generate_refresh_token()
+    db_token = RefreshToken(
+        user_id=user_id,
+        token_hash=hash_refresh_token(raw_token),
+        family_id=family_id or uuid.uuid4().hex,
+        expires_at=datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    )
+    db.add(db_token)
+    if commit:
+        db.commit()
+        db.refresh(db_token)
+    else:
+        db.flush()
+    return raw_token, db_token
+
+
+def get_by_token(db: Session, raw_token: str) -> Optional[RefreshToken]:
+    return db.query(RefreshToken).filter(RefreshToken.token_hash == hash_refresh_token(raw_token)).first()
+
+
+def rotate_refresh_token(db: Session, raw_token: str) -> Optional[Tuple[str, RefreshToken]]:
+    """
+    Exchange a refresh token for a new one in the same family.
+    Presenting a token that was already rotated means it leaked, so the whole
+    family is revoked and None is returned.
+    """
+    db_token = get_by_token(db, raw_token)
+    if not db_token:
+        return None
+
+    # Claim the old token before issuing its replacement. Of two concurrent refreshes
+    # with the same token only one can flip revoked_at, so the other counts as reuse
+    claimed = db.query(RefreshToken).filter(
+        RefreshToken.id == db_token.id,
+        RefreshToken.revoked_at.is_(None)
+    ).update({RefreshToken.revoked_at: datetime.utcnow()}, synchronize_session=False)
+    if not claimed:
+        logger.warning(f"Refresh token reuse detected for user {db_token.user_id}; revoking family {db_token.family_id}")
+        revoke_family(db, db_token.family_id)
+        return None
+    if db_token.expires_at <= datetime.utcnow():
+        # Keep it revoked; an expired token is never exchanged
+        db.commit()
+        return None
+
+    new_raw_token, new_token = issue_refresh_token(db, db_token.user_id, db_token.family_id, commit=False)
+    db.query(RefreshToken).filter(RefreshToken.id == db_token.id).update(
+        {RefreshToken.replaced_by_id: new_token.id}, synchronize_session=False)
+    db.commit()
+    db.refresh(new_token)
+    return new_raw_token, new_token
+
+
+def revoke_refresh_token(db: Session, raw_token: str) -> bool:
+    """Revoke the family of the given token (logout from one device)"""
+    db_token = get_by_token(db, raw_token)
+    if not db_token:
+        return False
+    revoke_family(db, db_token.family_id)
+    return True
+
+
+def revoke_family(db: Session, family_id: str) -> int:
+    count = db.query(RefreshToken).filter(
+        RefreshToken.family_id == family_id,
+        RefreshToken.revoked_at.is_(None)
+    ).update({RefreshToken.revoked_at: datetime.utcnow()}, synchronize_session=False)
+    db.commit()
+    return count
+
+
+def revoke_user_tokens(db: Session, user_id: int) -> int:
+    """Bulk-revoke every refresh token of a user (password change, deactivation)"""
+    count = db.query(RefreshToken).filter(
+        RefreshToken.user_id == user_id,
+        RefreshToken.revoked_at.is_(None)
+    ).update({RefreshToken.revoked_at: datetime.utcnow()}, synchronize_session=False)
+    db.commit()
+    return count
@@ -1,7 +1,18 @@
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from app.models.reminder import Reminder
+from app.models.reminder import Reminder, ReminderFrequency
+from app.models.user import User
 from app.schemas.reminder import ReminderCreate, ReminderUpdate
+from app.services.reminder_schedule import compute_day_mask, next_fire_at_for
 from typing import List, Optional
+from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def get_user_timezone(db: Session, user_id: int) -> Optional[str]:
+    return db.query(User.timezone).filter(User.id == user_id).scalar()
 
 
 def create_reminder(db: Session, reminder: ReminderCreate, user_id: int) -> Reminder:
@@ -11,8 +22,11 @@ def create_reminder(db: Session, reminder: ReminderCreate, user_id: int) -> Remi
         name=reminder.name,
         time=reminder.time,
         frequency=reminder.frequency,
-        selected_days=reminder.selected_days
+        selected_days=reminder.selected_days,
+        day_mask=compute_day_mask(reminder.frequency, reminder.selected_days),
+        is_active=True
     )
+    db_reminder.next_fire_at = next_fire_at_for(db_reminder, get_user_timezone(db, user_id))
     db.add(db_reminder)
     db.commit()
     db.refresh(db_reminder)
@@ -27,6 +41,19 @@ def get_user_reminders(db: Session, user_id: int) -> List[Reminder]:
     ).order_by(Reminder.time.asc()).all()
 
 
+def get_user_reminders_state(db: Session, user_id: int) -> tuple:
+    """
+    Cheap fingerprint of get_user_reminders' result for ETags: any insert,
+    update, toggle or delete changes the row count, id sums or version sum
+    """
+    return tuple(db.query(
+        func.count(Reminder.id), func.max(Reminder.id), func.sum(Reminder.id), func.sum(Reminder.version),
+    ).filter(
+        Reminder.user_id == user_id,
+        Reminder.is_active == True
+    ).one())
+
+
 def get_reminder_by_id(db: Session, reminder_id: int, user_id: int) -> Optional[Reminder]:
     """Get reminder by ID"""
     return db.query(Reminder).filter(
@@ -44,6 +71,8 @@ def update_reminder(db: Session, reminder_id: int, user_id: int, reminder_update
     update_data = reminder_update.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_reminder, field, value)
+    db_reminder.day_mask = compute_day_mask(db_reminder.frequency, db_reminder.selected_days)
+    db_reminder.next_fire_at = next_fire_at_for(db_reminder, get_user_timezone(db, user_id))
 
     db.commit()
     db.refresh(db_reminder)
@@ -68,6 +97,39 @@ def toggle_reminder(db: Session, reminder_id: int, user_id: int) -> Optional[Rem
         return None
 
     db_reminder.is_active = not db_reminder.is_active
+    db_reminder.next_fire_at = next_fire_at_for(db_reminder, get_user_timezone(db, user_id))
     db.commit()
     db.refresh(db_reminder)
-    return db_reminder
\ No newline at end of file
+    return db_reminder
+
+
+def _next_fire_at_or_none(db_reminder: Reminder, tz_name: Optional[str]) -> Optional[datetime]:
+    # Rows written before times were validated may hold e.g. "7pm"; leave them unscheduled
+    try:
+        return next_fire_at_for(db_reminder, tz_name)
+    except ValueError:
+        logger.warning(f"Reminder {db_reminder.id} has an invalid time {db_reminder.time!r}; not scheduling it")
+        return None
+
+
+def backfill_schedule(db: Session) -> int:
+    """Compute day_mask and next_fire_at for active reminders created before they existed"""
+    rows = db.query(Reminder, User.timezone).join(User, User.id == Reminder.user_id).filter(
+        Reminder.is_active == True,
+        Reminder.next_fire_at.is_(None)
+    ).all()
+    for db_reminder, tz_name in rows:
+        if db_reminder.day_mask is None and db_reminder.frequency != ReminderFrequency.DAILY:
+            db_reminder.day_mask = compute_day_mask(db_reminder.frequency, db_reminder.selected_days)
+        db_reminder.next_fire_at = _next_fire_at_or_none(db_reminder, tz_name)
+    db.commit()
+    return len(rows)
+
+
+def reschedule_user_reminders(db: Session, user_id: int, tz_name: Optional[str]) -> int:
+    """Recompute next_fire_at for every active reminder of a user, e.g. after a timezone change"""
+    reminders = db.query(Reminder).filter(Reminder.user_id == user_id, Reminder.is_active == True).all()
+    for db_reminder in reminders:
+        db_reminder.next_fire_at = _next_fire_at_or_none(db_reminder, tz_name)
+    db.commit()
+    return len(reminders)
@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta
+from sqlalchemy import case, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.models.scheduler_lease import SchedulerLease
+
+
+def try_acquire(db: Session, name: str, holder: str, ttl_seconds: int) -> bool:
+    """
+    Take or renew the lease `name` for `holder`.
+    A single conditional UPDATE succeeds only if the lease is already ours or has
+    expired, so two instances can never both hold it.
+    """
+    now = datetime.utcnow()
+    updated = db.query(SchedulerLease).filter(
+        SchedulerLease.name == name,
+        or_(SchedulerLease.holder == holder, SchedulerLease.expires_at.is_(None), SchedulerLease.expires_at < now)
+    ).update({
+        # Only stamp acquired_at when the lease changes hands
+        SchedulerLease.acquired_at: case((SchedulerLease.holder == holder, SchedulerLease.acquired_at), else_=now),
+        SchedulerLease.holder: holder,
+        SchedulerLease.heartbeat_at: now,
+        SchedulerLease.expires_at: now + timedelta(seconds=ttl_seconds),
+    }, synchronize_session=False)
+    if updated:
+        db.commit()
+        return True
+    if db.get(SchedulerLease, name) is not None:
+        db.commit()
+        return False
+
+    db.add(SchedulerLease(name=name, holder=holder, acquired_at=now, heartbeat_at=now,
+                          expires_at=now + timedelta(seconds=ttl_seconds)))
+    try:
+        db.commit()
+        return True
+    except IntegrityError:
+        # Another instance created the lease first
+        db.rollback()
+        return False
+
+
+def release(db: Session, name: str, holder: str) -> bool:
+    """Give up a lease we hold so another instance can take over immediately"""
+    released = db.query(SchedulerLease).filter(
+        SchedulerLease.name == name, SchedulerLease.holder == holder
+    ).update({
+        SchedulerLease.holder: None,
+        SchedulerLease.acquired_at: None,
+        SchedulerLease.expires_at: None,
+    }, synchronize_session=False)
+    db.commit()
+    return bool(released)
@@ -0,0 +1,23 @@
+from datetime import datetime
+from typing import Optional
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.models.scheduler_state import SchedulerState
+
+
+def get_last_processed_minute(db: Session, name: str) -> Optional[datetime]:
+    return db.query(SchedulerState.last_processed_minute).filter(SchedulerState.name == name).scalar()
+
+
+def set_last_processed_minute(db: Session, name: str, minute: datetime):
+    state = db.get(SchedulerState, name)
+    if state is None:
+        state = SchedulerState(name=name)
+        db.add(state)
+    state.last_processed_minute = minute
+    try:
+        db.commit()
+    except IntegrityError:
+        # Another process created the row first
+        db.rollback()
+        set_last_processed_minute(db, name, minute)
@@ -1,3 +1,4 @@
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from app.models.skin_analysis import SkinAnalysis
 from app.schemas.skin_analysis import SkinAnalysisCreate, SkinAnalysisRead
@@ -16,6 +17,21 @@ def get_skin_analysis_by_scan_id(db: Session, scan_id: str) -> Optional[SkinAnal
     """Get skin analysis by scan ID"""
     return db.query(SkinAnalysis).filter(SkinAnalysis.scan_id == scan_id).first()
 
+def get_skin_analysis_owner(db: Session, scan_id: str) -> Optional[tuple]:
+    """(user_id, created_at) of a scan, without loading its routines"""
+    return db.query(SkinAnalysis.user_id, SkinAnalysis.created_at)\
+        .filter(SkinAnalysis.scan_id == scan_id)\
+        .first()
+
+def get_skin_analyses_state(db: Session, user_id: int) -> tuple:
+    """
+    (count, max id, latest created_at) of a user's scans; scans are never
+    edited, so this changes whenever one is added or removed
+    """
+    return tuple(db.query(
+        func.count(SkinAnalysis.id), func.max(SkinAnalysis.id), func.max(SkinAnalysis.created_at),
+    ).filter(SkinAnalysis.user_id == user_id).one())
+
 def get_skin_analyses_by_user_id(
     db: Session,
     user_id: int,
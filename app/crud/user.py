@@ -1,21 +1,47 @@
-from sqlalchemy.orm import Session
+import time
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
 from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate
-from app.core.security import get_password_hash, verify_password
+from app.core.principal_cache import principal_cache
+from app.services.password_hasher import password_hasher
+from app.crud.refresh_token import revoke_user_tokens
+from app.core.security import revoke_subject_tokens
+from app.crud.reminder import reschedule_user_reminders
 
 def get_by_email(db: Session, email: str):
     return db.query(User).filter(User.email == email).first()
 
+def get_cached_by_email(db: Session, email: str):
+    """
+    Get a user for authentication, served from the principal cache when possible.
+    On a hit the cached snapshot is merged into the session without a query.
+    """
+    snapshot = principal_cache.get(email)
+    if snapshot is not None:
+        user = User(**snapshot)
+        make_transient_to_detached(user)
+        return db.merge(user, load=False)
+
+    user = get_by_email(db, email=email)
+    if user is not None:
+        principal_cache.set(email, _snapshot(user))
+    return user
+
+def _snapshot(user: User) -> dict:
+    return {attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs}
+
 def create_user(db: Session, user_in: UserCreate):
     user = User(
         email=user_in.email,
-        hashed_password=get_password_hash(user_in.password),
+        hashed_password=password_hasher.hash(user_in.password),
         is_active=True,
         is_verified=False,
         is_first_login=True,  # New users start with first login = True
         first_name=user_in.first_name,
         last_name=user_in.last_name,
-        image=user_in.image
+        image=user_in.image,
+        timezone=user_in.timezone
     )
     db.add(user)
     db.commit()
@@ -26,6 +52,7 @@ def verify_user(db: Session, user: User):
     user.is_verified = True
     db.commit()
     db.refresh(user)
+    principal_cache.invalidate(user.email)
     return user
 
 def update_user(db: Session, user: User, user_in: UserUpdate):
@@ -35,29 +62,68 @@ def update_user(db: Session, user: User, user_in: UserUpdate):
         user.last_name = user_in.last_name
     if user_in.image is not None:
         user.image = user_in.image
+    timezone_changed = user_in.timezone is not None and user_in.timezone != user.timezone
+    if timezone_changed:
+        user.timezone = user_in.timezone
     db.commit()
+    if timezone_changed:
+        reschedule_user_reminders(db, user.id, user.timezone)
     db.refresh(user)
+    principal_cache.invalidate(user.email)
     return user
 
 def set_password(db: Session, user: User, password: str):
-    user.hashed_password = get_password_hash(password)
+    user.hashed_password = password_hasher.hash(password)
+    user.tokens_valid_after = time.time()
     db.commit()
     db.refresh(user)
+    principal_cache.invalidate(user.email)
+    # Sign out every other session once the password changes
+    revoke_user_tokens(db, user.id)
+    revoke_subject_tokens(user.email)
     return user
 
-def check_password(user: User, password: str):
-    return verify_password(password, user.hashed_password)
+def check_password(user: User, password: str, db: Session = None):
+    """
+    Verify a user's password. When a session is given and the stored hash uses
+    outdated parameters (e.g. a lower BCRYPT_ROUNDS), it is transparently rehashed.
+    """
+    verified, new_hash = password_hasher.verify_and_update(password, user.hashed_password)
+    if verified and new_hash and db is not None:
+        user.hashed_password = new_hash
+        db.commit()
+        db.refresh(user)
+        principal_cache.invalidate(user.email)
+    return verified
 
 def set_active(db: Session, user: User, active: bool):
     user.is_active = active
+    if not active:
+        user.tokens_valid_after = time.time()
     db.commit()
     db.refresh(user)
+    principal_cache.invalidate(user.email)
+    if not active:
+        revoke_user_tokens(db, user.id)
+        revoke_subject_tokens(user.email)
     return user
 
+def revoke_access_tokens(db: Session, user: User):
+    """
+    Reject every access token issued to the user so far, in every process.
+    This process rejects them at once; others as soon as their cached principal
+    is invalidated (PRINCIPAL_CACHE_VERSION_FILE) or expires.
+    """
+    user.tokens_valid_after = time.time()
+    db.commit()
+    principal_cache.invalidate(user.email)
+    revoke_subject_tokens(user.email)
+
 def set_verified(db: Session, user: User, verified: bool):
     user.is_verified = verified
     db.commit()
     db.refresh(user)
+    principal_cache.invalidate(user.email)
     return user
 
 def mark_first_login_completed(db: Session, user: User):
@@ -65,9 +131,13 @@ def mark_first_login_completed(db: Session, user: User):
     user.is_first_login = False
     db.commit()
     db.refresh(user)
+    principal_cache.invalidate(user.email)
     return user
 
 def delete_user(db: Session, user: User):
+    email = user.email
     db.delete(user)
     db.commit()
+    principal_cache.invalidate(email)
+    revoke_subject_tokens(email)
     return True
\ No newline at end of file
@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.models.user import User
+from app.models.user_device import UserDevice
+
+# Keeps IN (...) lists well under SQLite's bound-parameter limit
+_IN_CHUNK = 500
+
+
+def register_device(db: Session, user_id: int, token: str, platform: Optional[str] = None) -> UserDevice:
+    """
+    Insert or refresh a device token. Registering the same token again only
+    updates last_seen_at; a token seen under another account moves to this user.
+    """
+    device = db.query(UserDevice).filter(UserDevice.token == token).first()
+    if device is None:
+        device = UserDevice(user_id=user_id, token=token)
+        db.add(device)
+    device.user_id = user_id
+    if platform:
+        device.platform = platform
+    device.last_seen_at = datetime.utcnow()
+    try:
+        db.commit()
+    except IntegrityError:
+        # A concurrent request registered the same token first; update that row instead
+        db.rollback()
+        return register_device(db, user_id, token, platform)
+    return device
+
+
+def remove_devices(db: Session, user_id: int, token: Optional[str] = None) -> int:
+    """Delete one of the user's devices, or all of them when no token is given"""
+    query = db.query(UserDevice).filter(UserDevice.user_id == user_id)
+    if token is not None:
+        query = query.filter(UserDevice.token == token)
+    removed = query.delete(synchronize_session=False)
+    db.commit()
+    return removed
+
+
+def get_user_tokens(db: Session, user_id: int) -> List[str]:
+    return [token for (token,) in db.query(UserDevice.token).filter(UserDevice.user_id == user_id)]
+
+
+def get_tokens_for_users(db: Session, user_ids: List[int]) -> Dict[int, List[str]]:
+    """Map each user id to its device tokens, with one query per 500 users"""
+    tokens: Dict[int, List[str]] = {}
+    user_ids = list(user_ids)
+    for i in range(0, len(user_ids), _IN_CHUNK):
+        rows = db.query(UserDevice.user_id, UserDevice.token).filter(
+            UserDevice.user_id.in_(user_ids[i:i + _IN_CHUNK])
+        )
+        for user_id, token in rows:
+            tokens.setdefault(user_id, []).append(token)
+    return tokens
+
+
+def delete_tokens(db: Session, tokens: List[str]) -> int:
+    """Bulk-delete devices by token, e.g. after FCM reports them unregistered"""
+    deleted = 0
+    for i in range(0, len(tokens), _IN_CHUNK):
+        deleted += db.query(UserDevice).filter(
+            UserDevice.token.in_(tokens[i:i + _IN_CHUNK])
+        ).delete(synchronize_session=False)
+    db.commit()
+    return deleted
+
+
+def purge_stale_devices(db: Session, max_age_days: int) -> int:
+    """Delete devices the app has not registered from in max_age_days"""
+    cutoff = datetime.utcnow() - timedelta(days=max_age_days)
+    deleted = db.query(UserDevice).filter(UserDevice.last_seen_at < cutoff).delete(synchronize_session=False)
+    db.commit()
+    return deleted
+
+
+def backfill_from_users(db: Session) -> int:
+    """Move tokens from the legacy users.device_token column into user_devices"""
+    # Newest account first: when several accounts share a device, the token goes to the one created last
+    users = db.query(User).filter(User.device_token.isnot(None)).order_by(User.id.desc()).all()
+    legacy_tokens = list({user.device_token for user in users})
+    # Tokens already registered, plus those added below: the session does not
+    # autoflush, so a query would not see pending rows and a shared token would be inserted twice
+    seen = set()
+    for i in range(0, len(legacy_tokens), _IN_CHUNK):
+        seen.update(token for (token,) in db.query(UserDevice.token).filter(
+            UserDevice.token.in_(legacy_tokens[i:i + _IN_CHUNK])
+        ))
+    for user in users:
+        if user.device_token not in seen:
+            seen.add(user.device_token)
+            db.add(UserDevice(user_id=user.id, token=user.device_token))
+        user.device_token = None
+    db.commit()
+    return len(users)
@@ -1,6 +1,7 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from app.db.base import Base
+from app.core.sql_stats import instrument_engine
 
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
@@ -8,4 +9,6 @@ SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
 )
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine) 
\ No newline at end of file
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine) 
+# Per-request and per-tick statement counts, N+1 and slow query logging
+instrument_engine(engine)
@@ -4,40 +4,115 @@ load_dotenv()
 from fastapi import FastAPI
 
 import asyncio
+import logging
+from contextlib import asynccontextmanager
+from sqlalchemy import text
+
 from app.services.reminder_service import reminder_service
-from app.db.session import SessionLocal
+from app.services.push_notification import push_service
+from app.services.password_hasher import password_hasher
+from app.services.otp_service import otp_service
+from app.services.mail_service import mail_service
+from app.services.email_outbox_worker import email_outbox_worker
+from app.services.device_registry import device_registry
+from app.services.ai_skin_analysis import get_ai_service
+from app.core.metrics import MetricsMiddleware
+from app.core.timing import ServerTimingMiddleware
+from app.core.sql_stats import SQLStatsMiddleware
+from app.core.profiling import RequestProfilerMiddleware
+from app.core.lifecycle import SHUTDOWN_DRAIN_SECONDS, TaskSupervisor, inflight, remaining
+from app.db.session import engine
 
 # Import all models to ensure relationships are resolved
-from app.models import user, user_profile, skin_analysis, otp, daily_skin_log, reminder
+from app.models import user, user_profile, skin_analysis, otp, daily_skin_log, reminder, refresh_token, email_outbox, user_device, scheduler_state, scheduler_lease
 
 from app.api.routes_user import router as user_router
 from app.api.routes_user_profile import router as user_profile_router
 from app.api.routes_skin_analysis import router as skin_analysis_router
 from app.api.routes_daily_skin_log import router as daily_skin_log_router
 from app.api.routes_reminder import router as reminder_router
+from app.api.routes_metrics import router as metrics_router
+from app.api.routes_admin import router as admin_router
 
 
 
+# Emails are delivered by `python -m app.workers.email_outbox`; set this to also run delivery in the web process
+EMAIL_OUTBOX_IN_WEB = os.getenv("EMAIL_OUTBOX_IN_WEB", "false").lower() == "true"
+# Set to false when reminders are sent by `python -m app.workers.reminders`
+REMINDERS_IN_WEB = os.getenv("REMINDERS_IN_WEB", "true").lower() == "true"
 
-app = FastAPI()
+logger = logging.getLogger(__name__)
 
-app.include_router(user_router, prefix="/api", tags=["users"])
-app.include_router(user_profile_router, prefix="/api", tags=["user-profile"])
-app.include_router(skin_analysis_router, prefix="/api", tags=["skin-analysis"])
-app.include_router(daily_skin_log_router, prefix="/api", tags=["daily-skin-log"])
-app.include_router(reminder_router, prefix="/api", tags=["reminders"])
+
+def _check_database():
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+
+async def warm_up():
+    """Open pools and start executors before the app takes traffic, so the first requests don't pay for it"""
+    steps = [("database", _check_database), ("password hasher", password_hasher.start)]
+    if REMINDERS_IN_WEB:
+        steps.append(("push transport", push_service.start))
+    if os.getenv("GEMINI_API_KEY"):
+        steps.append(("AI client", get_ai_service))
+    for name, step in steps:
+        try:
+            await asyncio.to_thread(step)
+        except Exception as e:
+            # Warm-up is best effort; the component is created again on first use
+            logger.error(f"Warm-up of {name} failed: {e}")
 
 
+async def drain(supervisor: TaskSupervisor):
+    """Let in-flight work finish, then stop background loops and close pools, all within SHUTDOWN_DRAIN_SECONDS"""
+    deadline = asyncio.get_running_loop().time() + SHUTDOWN_DRAIN_SECONDS
+    for service in (reminder_service, device_registry, otp_service, email_outbox_worker):
+        service.stop()
+    if not await inflight.wait_idle(remaining(deadline)):
+        logger.warning(f"Shutdown deadline reached with work still in flight: {inflight.active()}")
+    await supervisor.stop(remaining(deadline))
 
+    # Queued emails and pushes are flushed by the pools' own shutdown
+    for name, step in (("scheduler leases", reminder_service.release_leases), ("push dispatch", push_service.shutdown),
+                       ("SMTP connections", mail_service.shutdown), ("password hasher", password_hasher.shutdown)):
+        try:
+            await asyncio.wait_for(asyncio.to_thread(step), timeout=remaining(deadline))
+        except asyncio.TimeoutError:
+            logger.warning(f"Shutdown deadline reached; {name} is still stopping in the background")
+        except Exception as e:
+            logger.error(f"Error stopping {name}: {e}")
 
-@app.on_event("startup")
-async def startup_event():
-    """Start the reminder service when app starts"""
-    db = SessionLocal()
-    # Start reminder service in background
-    asyncio.create_task(reminder_service.start_reminder_checker(db))
 
-@app.on_event("shutdown")
-async def shutdown_event():
-    """Stop the reminder service when app shuts down"""
-    reminder_service.stop()
\ No newline at end of file
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Owns every background loop, pool and executor of the web process"""
+    await warm_up()
+    supervisor = TaskSupervisor()
+    if REMINDERS_IN_WEB:
+        supervisor.start("reminder-checker", reminder_service.start_reminder_checker())
+        # Expire devices that stopped registering
+        supervisor.start("device-sweep", device_registry.start_sweep_loop())
+    # Purge expired and used OTPs in background
+    supervisor.start("otp-purge", otp_service.start_purge_loop())
+    if EMAIL_OUTBOX_IN_WEB:
+        supervisor.start("email-outbox", email_outbox_worker.start())
+    app.state.supervisor = supervisor
+    yield
+    await drain(supervisor)
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(ServerTimingMiddleware)
+app.add_middleware(SQLStatsMiddleware)
+app.add_middleware(RequestProfilerMiddleware)
+
+app.include_router(user_router, prefix="/api", tags=["users"])
+app.include_router(user_profile_router, prefix="/api", tags=["user-profile"])
+app.include_router(skin_analysis_router, prefix="/api", tags=["skin-analysis"])
+app.include_router(daily_skin_log_router, prefix="/api", tags=["daily-skin-log"])
+app.include_router(reminder_router, prefix="/api", tags=["reminders"])
+# Served at the root, where Prometheus scrapes by default
+app.include_router(metrics_router)
+app.include_router(admin_router, include_in_schema=False)
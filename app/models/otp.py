@@ -1,12 +1,16 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, UniqueConstraint
 from app.db.base import Base
 from datetime import datetime, timedelta
 
 class OTP(Base):
     __tablename__ = "otps"
+    # Only the latest code per (email, purpose) is kept; new requests overwrite it
+    __table_args__ = (UniqueConstraint("email", "purpose", name="uq_otps_email_purpose"),)
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String, index=True, nullable=False)
     otp_code = Column(String, nullable=False)
     purpose = Column(String, nullable=False)  # 'activation' or 'reset'
-    expires_at = Column(DateTime, nullable=False)
-    is_used = Column(Boolean, default=False) 
\ No newline at end of file
+    expires_at = Column(DateTime, nullable=False, index=True)
+    is_used = Column(Boolean, default=False)
+    attempts = Column(Integer, default=0, nullable=False)  # failed verification attempts
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Enum, Text
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Enum, Text, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.base import Base
@@ -13,6 +13,8 @@ class ReminderFrequency(str, enum.Enum):
 
 class Reminder(Base):
     __tablename__ = "reminders"
+    # The scheduler pops active reminders whose next_fire_at has passed
+    __table_args__ = (Index("ix_reminders_active_next_fire_at", "is_active", "next_fire_at"),)
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -20,9 +22,13 @@ class Reminder(Base):
     time = Column(String(5), nullable=False)  # "22:00"
     frequency = Column(Enum(ReminderFrequency), nullable=False)
     selected_days = Column(Text, nullable=True)  # "1,3,5" for Mon,Wed,Fri or "1,15,30" for monthly
+    day_mask = Column(Integer, nullable=True)  # selected_days as a bitmask (bit N = day N), filled at write time
     is_active = Column(Boolean, default=True)
+    next_fire_at = Column(DateTime, nullable=True)  # next occurrence in UTC, in the owner's timezone
+    last_sent_at = Column(DateTime, nullable=True)  # UTC occurrence last handed to the push dispatcher
 
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    version = Column(Integer, nullable=False, default=1, server_default="1", onupdate=text("version + 1"))  # bumped on every UPDATE; feeds ETags
 
     user = relationship("User", back_populates="reminders")
\ No newline at end of file
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, String, DateTime
+from app.db.base import Base
+
+
+class SchedulerLease(Base):
+    __tablename__ = "scheduler_leases"
+
+    name = Column(String(50), primary_key=True)  # "reminders", or "reminders:<shard>/<count>" when sharded
+    holder = Column(String(100), nullable=True)  # "<host>:<pid>:<random>" of the instance running it
+    acquired_at = Column(DateTime, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+    expires_at = Column(DateTime, nullable=True)  # another instance may take over once this passes
@@ -0,0 +1,11 @@
+from sqlalchemy import Column, String, DateTime
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+
+class SchedulerState(Base):
+    __tablename__ = "scheduler_state"
+
+    name = Column(String(50), primary_key=True)  # one row per scheduler, e.g. "reminders"
+    last_processed_minute = Column(DateTime, nullable=True)  # UTC minute whose reminders have all been handled
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, func
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Float, func, text
 from app.db.base import Base
 from sqlalchemy.orm import relationship
 
@@ -14,9 +14,14 @@ class User(Base):
     first_name = Column(String, nullable=True)
     last_name = Column(String, nullable=True)
     image = Column(String, nullable=True)
-    device_token = Column(String(255), nullable=True)
+    device_token = Column(String(255), nullable=True)  # legacy single token; moved to user_devices on startup
+    timezone = Column(String(64), nullable=True)  # IANA name, e.g. "Asia/Karachi"; reminders fire in this zone
+    tokens_valid_after = Column(Float, nullable=True)  # epoch seconds; access tokens issued at or before it are rejected
     skin_analyses = relationship("SkinAnalysis", back_populates="user")
     daily_skin_logs = relationship("DailySkinLog", back_populates="user")
     reminders = relationship("Reminder", back_populates="user")
+    refresh_tokens = relationship("RefreshToken", back_populates="user", cascade="all, delete-orphan")
+    devices = relationship("UserDevice", back_populates="user", cascade="all, delete-orphan")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    version = Column(Integer, nullable=False, default=1, server_default="1", onupdate=text("version + 1"))  # bumped on every UPDATE; feeds ETags
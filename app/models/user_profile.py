@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, func, Date
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, func, Date, text
 from sqlalchemy.orm import relationship
 from app.db.base import Base
 
@@ -17,5 +17,6 @@ class UserProfile(Base):
     skin_goals = Column(String, nullable=True)  # comma-separated
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    version = Column(Integer, nullable=False, default=1, server_default="1", onupdate=text("version + 1"))  # bumped on every UPDATE; feeds ETags
 
     user = relationship("User", backref="profile", uselist=False)
\ No newline at end of file
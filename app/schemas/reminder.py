@@ -1,7 +1,15 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator
 from typing import Optional, List
 from datetime import datetime
 from app.models.reminder import ReminderFrequency
+from app.services.reminder_schedule import is_valid_time
+
+
+def _validate_time(value: Optional[str]) -> Optional[str]:
+    if value is not None and not is_valid_time(value):
+        raise ValueError("Time must be in 24-hour HH:MM format, e.g. 07:30")
+    return value
+
 
 class ReminderCreate(BaseModel):
     name: str
@@ -9,6 +17,8 @@ class ReminderCreate(BaseModel):
     frequency: ReminderFrequency
     selected_days: Optional[str] = None  # "1,3,5" for weekly or "1,15,30" for monthly
 
+    _check_time = field_validator("time")(_validate_time)
+
 class ReminderUpdate(BaseModel):
     name: Optional[str] = None
     time: Optional[str] = None
@@ -16,6 +26,8 @@ class ReminderUpdate(BaseModel):
     selected_days: Optional[str] = None
     is_active: Optional[bool] = None
 
+    _check_time = field_validator("time")(_validate_time)
+
 class ReminderRead(BaseModel):
     id: int
     user_id: int
@@ -24,6 +36,8 @@ class ReminderRead(BaseModel):
     frequency: ReminderFrequency
     selected_days: Optional[str] = None
     is_active: bool
+    next_fire_at: Optional[datetime] = None  # UTC
+    last_sent_at: Optional[datetime] = None  # UTC
     created_at: datetime
     updated_at: Optional[datetime] = None
 
@@ -1,6 +1,13 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, field_validator
 from typing import Optional
 from app.schemas.user_profile import UserProfileCreate, UserProfileRead
+from app.services.reminder_schedule import is_valid_timezone
+
+
+def _validate_timezone(value: Optional[str]) -> Optional[str]:
+    if value is not None and not is_valid_timezone(value):
+        raise ValueError(f"Unknown timezone: {value}")
+    return value
 
 
 class UserBase(BaseModel):
@@ -8,6 +15,9 @@ class UserBase(BaseModel):
     first_name: Optional[str] = None
     last_name: Optional[str] = None
     image: Optional[str] = None
+    timezone: Optional[str] = None
+
+    _check_timezone = field_validator("timezone")(_validate_timezone)
 
 class UserCreate(UserBase):
     password: str
@@ -29,6 +39,9 @@ class UserUpdate(BaseModel):
     first_name: Optional[str] = None
     last_name: Optional[str] = None
     image: Optional[str] = None
+    timezone: Optional[str] = None
+
+    _check_timezone = field_validator("timezone")(_validate_timezone)
 
 class UserLogin(BaseModel):
     email: EmailStr
@@ -47,10 +60,19 @@ class Token(BaseModel):
     access_token: str
     token_type: str
     is_first_login: bool  # Add this field to login response
+    refresh_token: Optional[str] = None
+    expires_in: Optional[int] = None  # access token lifetime in seconds
 
 class TokenData(BaseModel):
     email: Optional[str] = None
 
+class Principal(BaseModel):
+    """Authenticated caller as described by access token claims (no DB lookup)"""
+    id: int
+    email: str
+    is_active: bool
+    is_verified: bool
+
 class PasswordReset(BaseModel):
     password: str
 
@@ -1,21 +1,63 @@
 import os
 import base64
-import google.generativeai as genai
-from typing import Dict, Any, List
+import copy
+import random
+import threading
+from typing import Dict, Any, List, Optional
 import json
 import re
+import time
+from types import SimpleNamespace
 from dotenv import load_dotenv
 
+from app.core import metrics
+from app.core.timing import span
+
 load_dotenv()
 
+# "gemini" calls the Gemini API; "fake" answers locally, for load tests without a key
+AI_BACKEND = os.getenv("AI_BACKEND", "gemini")
+# Simulated model latency when AI_BACKEND=fake
+FAKE_AI_LATENCY_MS = float(os.getenv("FAKE_AI_LATENCY_MS", "2000"))
+
+
+class FakeGenerativeModel:
+    """
+    Stand-in for genai.GenerativeModel.
+    Sleeps for `latency_ms` and answers with `template` as JSON, with random
+    skinHealthMatrix scores so stored scans differ.
+    """
+
+    def __init__(self, template: Dict[str, Any], latency_ms: float = FAKE_AI_LATENCY_MS, seed: Optional[int] = None):
+        self.template = template
+        self.latency_ms = latency_ms
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def generate_content(self, parts):
+        time.sleep(self.latency_ms / 1000)
+        result = copy.deepcopy(self.template)
+        with self._lock:
+            self.calls += 1
+            for key in result["skinHealthMatrix"]:
+                result["skinHealthMatrix"][key] = round(self._random.uniform(20, 90), 1)
+        return SimpleNamespace(text=json.dumps(result))
+
 
 class AISkinAnalysisService:
-    def __init__(self):
+    def __init__(self, backend: str = AI_BACKEND):
+        if backend == "fake":
+            self.model = FakeGenerativeModel(self._get_fallback_response())
+            return
+
         # Configure Gemini API
         api_key = os.getenv("GEMINI_API_KEY")
         if not api_key:
             raise ValueError("GEMINI_API_KEY must be set in environment variables")
 
+        # Imported here because the SDK takes most of a second to load
+        import google.generativeai as genai
         genai.configure(api_key=api_key)
         self.model = genai.GenerativeModel('gemini-1.5-flash')
 
@@ -115,10 +157,18 @@ class AISkinAnalysisService:
             }
             
             # Generate content with the model
-            response = self.model.generate_content([prompt, image_part])
+            started = time.perf_counter()
+            outcome = "error"
+            try:
+                with span("model"):
+                    response = self.model.generate_content([prompt, image_part])
+                outcome = "success"
+            finally:
+                metrics.ai_analysis_duration_seconds.observe(time.perf_counter() - started, outcome=outcome)
             
             # Extract and parse the JSON response
-            ai_result = self._parse_ai_response(response.text)
+            with span("parse"):
+                ai_result = self._parse_ai_response(response.text)
             
             # Validate routine descriptions
             ai_result = self._validate_routine_descriptions(ai_result)
@@ -253,3 +303,17 @@ class AISkinAnalysisService:
         if isinstance(data, list):
             return ", ".join(data)
         return str(data)
+
+
+_ai_service: Optional[AISkinAnalysisService] = None
+_ai_service_lock = threading.Lock()
+
+
+def get_ai_service() -> AISkinAnalysisService:
+    """Return the shared analysis client, creating it on first use"""
+    global _ai_service
+    if _ai_service is None:
+        with _ai_service_lock:
+            if _ai_service is None:
+                _ai_service = AISkinAnalysisService()
+    return _ai_service
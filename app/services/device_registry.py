@@ -0,0 +1,64 @@
+import asyncio
+import logging
+import os
+
+from app.crud import user_device as crud_user_device
+from app.db.session import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Devices the app has not re-registered from in this many days are dropped
+USER_DEVICE_STALE_DAYS = int(os.getenv("USER_DEVICE_STALE_DAYS", "60"))
+USER_DEVICE_SWEEP_INTERVAL_SECONDS = int(os.getenv("USER_DEVICE_SWEEP_INTERVAL_SECONDS", "3600"))
+
+
+class DeviceRegistry:
+    """Background maintenance for the user_devices table"""
+
+    def __init__(self):
+        self.running = False
+        self.swept = 0
+
+    def sweep_stale(self) -> int:
+        db = SessionLocal()
+        try:
+            count = crud_user_device.purge_stale_devices(db, USER_DEVICE_STALE_DAYS)
+        finally:
+            db.close()
+        self.swept += count
+        if count:
+            logger.info(f"Removed {count} devices not seen in {USER_DEVICE_STALE_DAYS} days")
+        return count
+
+    def backfill(self) -> int:
+        db = SessionLocal()
+        try:
+            return crud_user_device.backfill_from_users(db)
+        finally:
+            db.close()
+
+    async def start_sweep_loop(self, interval: int = USER_DEVICE_SWEEP_INTERVAL_SECONDS):
+        """Move legacy tokens once, then periodically expire stale devices"""
+        self.running = True
+        try:
+            moved = await asyncio.to_thread(self.backfill)
+            if moved:
+                logger.info(f"Moved {moved} legacy device tokens into user_devices")
+        except Exception as e:
+            logger.error(f"Error backfilling user devices: {e}")
+        while self.running:
+            try:
+                await asyncio.to_thread(self.sweep_stale)
+            except Exception as e:
+                logger.error(f"Error sweeping stale devices: {e}")
+            await asyncio.sleep(interval)
+
+    def stop(self):
+        self.running = False
+
+    def stats(self) -> dict:
+        return {"swept": self.swept}
+
+
+# Global device registry
+device_registry = DeviceRegistry()
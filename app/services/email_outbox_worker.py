@@ -0,0 +1,132 @@
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+from app.core import metrics
+from app.core.lifecycle import inflight
+from app.core.sql_stats import track_queries
+from app.crud import email_outbox as crud_email_outbox
+from app.db.session import SessionLocal
+from app.models.email_outbox import EmailOutbox
+from app.services.mail_service import SMTP_POOL_SIZE, mail_service
+
+logger = logging.getLogger(__name__)
+
+EMAIL_OUTBOX_BATCH_SIZE = int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", "50"))
+EMAIL_OUTBOX_POLL_SECONDS = float(os.getenv("EMAIL_OUTBOX_POLL_SECONDS", "2"))
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", "8"))
+EMAIL_OUTBOX_BACKOFF_SECONDS = float(os.getenv("EMAIL_OUTBOX_BACKOFF_SECONDS", "30"))
+EMAIL_OUTBOX_MAX_BACKOFF_SECONDS = float(os.getenv("EMAIL_OUTBOX_MAX_BACKOFF_SECONDS", "3600"))
+# A claimed batch not finished within this many seconds is handed to another worker
+EMAIL_OUTBOX_LEASE_SECONDS = int(os.getenv("EMAIL_OUTBOX_LEASE_SECONDS", "300"))
+# Emails of a batch sent in parallel; more than SMTP_POOL_SIZE would only wait for a connection
+EMAIL_OUTBOX_SEND_CONCURRENCY = int(os.getenv("EMAIL_OUTBOX_SEND_CONCURRENCY", str(SMTP_POOL_SIZE)))
+
+
+class EmailOutboxWorker:
+    """
+    Delivers emails recorded in the email_outbox table.
+    Batches are claimed from the table, sent concurrently over the pooled SMTP
+    connections and recorded in one transaction; failures are retried with
+    exponential backoff until they are dead-lettered.
+    """
+
+    def __init__(self):
+        self.running = False
+        self.sent = 0
+        self.failed = 0
+        self.dead = 0
+        self.backlog = 0
+        self.send_seconds_total = 0.0
+        self.send_seconds_max = 0.0
+
+    def run_once(self) -> int:
+        """Claim and deliver one batch; returns the number of emails processed"""
+        db = SessionLocal()
+        try:
+            with track_queries("email_outbox_batch"):
+                batch = crud_email_outbox.claim_batch(db, EMAIL_OUTBOX_BATCH_SIZE, EMAIL_OUTBOX_LEASE_SECONDS)
+                if batch:
+                    self._deliver_batch(db, batch)
+                self.backlog = crud_email_outbox.count_backlog(db)
+                return len(batch)
+        finally:
+            db.close()
+
+    def _deliver_batch(self, db, batch: List[EmailOutbox]):
+        # Sends run concurrently, up to one per pooled SMTP connection; the
+        # session is only used again to record every outcome in one commit
+        claim_token = batch[0].claim_token
+        emails = [(db_email.id, db_email.attempts, db_email.to_email) for db_email in batch]
+        messages = [(db_email.to_email, db_email.subject, db_email.body) for db_email in batch]
+        with ThreadPoolExecutor(max_workers=min(EMAIL_OUTBOX_SEND_CONCURRENCY, len(batch))) as executor:
+            outcomes = list(executor.map(self._send, messages))
+
+        sent_ids, failures = [], []
+        for (email_id, attempts, _), (elapsed, error) in zip(emails, outcomes):
+            if error is None:
+                self.sent += 1
+                self.send_seconds_total += elapsed
+                self.send_seconds_max = max(self.send_seconds_max, elapsed)
+                sent_ids.append(email_id)
+            else:
+                self.failed += 1
+                failures.append((email_id, attempts, error))
+
+        dead_ids = set(crud_email_outbox.complete_batch(
+            db, claim_token, sent_ids, failures, EMAIL_OUTBOX_MAX_ATTEMPTS,
+            EMAIL_OUTBOX_BACKOFF_SECONDS, EMAIL_OUTBOX_MAX_BACKOFF_SECONDS
+        ))
+        self.dead += len(dead_ids)
+        recipients = {email_id: to_email for email_id, _, to_email in emails}
+        for email_id, attempts, error in failures:
+            if email_id in dead_ids:
+                logger.error(f"Email {email_id} to {recipients[email_id]} dead-lettered after {attempts + 1} attempts: {error}")
+            else:
+                logger.warning(f"Email {email_id} failed (attempt {attempts + 1}), will retry: {error}")
+
+    @staticmethod
+    def _send(message: Tuple[str, str, str]) -> Tuple[float, Optional[str]]:
+        started = time.perf_counter()
+        try:
+            mail_service.deliver(*message)
+            return time.perf_counter() - started, None
+        except Exception as e:
+            return time.perf_counter() - started, str(e)
+
+    async def start(self, poll_seconds: float = EMAIL_OUTBOX_POLL_SECONDS):
+        """Poll the outbox until stopped; full batches are followed immediately by the next one"""
+        self.running = True
+        while self.running:
+            try:
+                with inflight.track("email_batch"):
+                    processed = await asyncio.to_thread(self.run_once)
+            except Exception as e:
+                logger.error(f"Error in email outbox worker: {e}")
+                processed = 0
+            if processed < EMAIL_OUTBOX_BATCH_SIZE:
+                await asyncio.sleep(poll_seconds)
+
+    def stop(self):
+        self.running = False
+
+    def stats(self) -> dict:
+        return {
+            "backlog": self.backlog,
+            "sent": self.sent,
+            "failed": self.failed,
+            "dead": self.dead,
+            "avg_send_seconds": round(self.send_seconds_total / self.sent, 4) if self.sent else 0.0,
+            "max_send_seconds": round(self.send_seconds_max, 4),
+        }
+
+
+# Global outbox worker
+email_outbox_worker = EmailOutboxWorker()
+
+metrics.registry.gauge(
+    "email_outbox_backlog", "Pending outbox emails as of the worker's last batch",
+    callback=lambda: email_outbox_worker.backlog)
@@ -0,0 +1,219 @@
+import logging
+import os
+import queue
+import smtplib
+import threading
+import time
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import List
+
+from app.core import metrics
+
+logger = logging.getLogger(__name__)
+
+# "smtp" talks to a real server; "local" uses the in-process LocalSMTP stand-in
+EMAIL_BACKEND = os.getenv("EMAIL_BACKEND", "smtp")
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "465"))
+SMTP_TIMEOUT_SECONDS = float(os.getenv("SMTP_TIMEOUT_SECONDS", "30"))
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "2"))
+# Connections idle longer than this are probed with NOOP before reuse
+SMTP_MAX_IDLE_SECONDS = float(os.getenv("SMTP_MAX_IDLE_SECONDS", "60"))
+LOCAL_SMTP_LATENCY_MS = float(os.getenv("LOCAL_SMTP_LATENCY_MS", "0"))
+
+
+class LocalSMTP:
+    """
+    Drop-in stand-in for smtplib.SMTP_SSL used in tests and load tests.
+    Messages are recorded in LocalSMTP.outbox instead of being sent.
+    """
+    outbox: List[dict] = []
+    _outbox_lock = threading.Lock()
+
+    def __init__(self, host: str = "", port: int = 0, timeout: float = None):
+        self.host = host
+        self.port = port
+        self.closed = False
+
+    def login(self, user: str, password: str):
+        time.sleep(LOCAL_SMTP_LATENCY_MS / 1000)
+
+    def noop(self):
+        if self.closed:
+            raise smtplib.SMTPServerDisconnected("connection closed")
+        return (250, b"OK")
+
+    def sendmail(self, from_addr: str, to_addrs, msg: str):
+        if self.closed:
+            raise smtplib.SMTPServerDisconnected("connection closed")
+        time.sleep(LOCAL_SMTP_LATENCY_MS / 1000)
+        with LocalSMTP._outbox_lock:
+            LocalSMTP.outbox.append({"from": from_addr, "to": to_addrs, "msg": msg})
+        return {}
+
+    def quit(self):
+        self.closed = True
+
+    def close(self):
+        self.closed = True
+
+
+class SMTPConnectionPool:
+    """
+    Small pool of logged-in SMTP connections.
+    Reusing connections avoids a TLS handshake and AUTH round trip per message;
+    stale connections are detected with NOOP and replaced transparently.
+    """
+
+    def __init__(self, size: int = SMTP_POOL_SIZE, backend: str = EMAIL_BACKEND):
+        self.size = size
+        self.backend = backend
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self.connections_opened = 0
+        self.reconnects = 0
+
+    def _credentials(self):
+        user = os.environ.get("GMAIL_USER")
+        password = os.environ.get("GMAIL_APP_PASSWORD")
+        if self.backend == "local":
+            return user or "local@localhost", password or ""
+        if not user or not password:
+            raise Exception("GMAIL_USER and GMAIL_APP_PASSWORD environment variables must be set.")
+        return user, password
+
+    @property
+    def sender(self) -> str:
+        return self._credentials()[0]
+
+    def _connect(self):
+        user, password = self._credentials()
+        if self.backend == "local":
+            conn = LocalSMTP(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT_SECONDS)
+        else:
+            conn = smtplib.SMTP_SSL(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT_SECONDS)
+        conn.login(user, password)
+        self.connections_opened += 1
+        return conn
+
+    def acquire(self):
+        self._slots.acquire()
+        try:
+            while True:
+                try:
+                    conn, last_used = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._connect()
+                if time.monotonic() - last_used < SMTP_MAX_IDLE_SECONDS:
+                    return conn
+                try:
+                    conn.noop()
+                    return conn
+                except OSError:  # includes smtplib.SMTPException
+                    self.reconnects += 1
+                    self._close(conn)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, conn, broken: bool = False):
+        if broken:
+            self._close(conn)
+        else:
+            self._idle.put((conn, time.monotonic()))
+        self._slots.release()
+
+    def close_all(self):
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                conn.quit()
+            except Exception:
+                self._close(conn)
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+class MailService:
+    """
+    Email delivery over the shared SMTP connection pool.
+    Emails are queued durably in the email_outbox table; the outbox worker
+    calls deliver() for each claimed row.
+    """
+
+    def __init__(self):
+        self.pool = SMTPConnectionPool()
+        self.sent = 0
+        self.failed = 0
+
+    def build_message(self, to_email: str, subject: str, body: str) -> MIMEMultipart:
+        msg = MIMEMultipart()
+        msg["From"] = self.pool.sender
+        msg["To"] = to_email
+        msg["Subject"] = subject
+        msg.attach(MIMEText(body, "plain"))
+        return msg
+
+    def deliver(self, to_email: str, subject: str, body: str):
+        """Send an email synchronously on a pooled connection; raises on failure"""
+        self._deliver(self.build_message(to_email, subject, body))
+
+    def _deliver(self, msg: MIMEMultipart):
+        started = time.perf_counter()
+        outcome = "failed"
+        try:
+            self._deliver_pooled(msg)
+            outcome = "sent"
+            self.sent += 1
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            metrics.email_send_duration_seconds.observe(time.perf_counter() - started, outcome=outcome)
+
+    def _deliver_pooled(self, msg: MIMEMultipart):
+        # Every pooled connection may have been dropped by the server since its
+        # last use, so allow enough retries to discard all of them and reconnect
+        attempts = self.pool.size + 1
+        for attempt in range(attempts):
+            conn = self.pool.acquire()
+            try:
+                conn.sendmail(msg["From"], msg["To"], msg.as_string())
+                self.pool.release(conn)
+                return
+            except (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError):
+                self.pool.release(conn, broken=True)
+                self.pool.reconnects += 1
+                if attempt == attempts - 1:
+                    raise
+            except (smtplib.SMTPRecipientsRefused, smtplib.SMTPResponseException):
+                # The server rejected this message but the session is still usable
+                self.pool.release(conn)
+                raise
+            except Exception:
+                self.pool.release(conn, broken=True)
+                raise
+
+    def shutdown(self):
+        """Close pooled connections"""
+        self.pool.close_all()
+
+    def stats(self) -> dict:
+        return {
+            "sent": self.sent,
+            "failed": self.failed,
+            "connections_opened": self.pool.connections_opened,
+            "reconnects": self.pool.reconnects,
+        }
+
+
+# Global mail service
+mail_service = MailService()
@@ -0,0 +1,142 @@
+import asyncio
+import hmac
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.email_utils import build_otp_email
+from app.crud import otp as crud_otp
+from app.crud import email_outbox as crud_email_outbox
+from app.db.session import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# "db" keeps codes in the otps table; "memory" is for single-node deployments only
+OTP_STORE_BACKEND = os.getenv("OTP_STORE_BACKEND", "db")
+OTP_EXPIRE_MINUTES = int(os.getenv("OTP_EXPIRE_MINUTES", "10"))
+OTP_MAX_ATTEMPTS = int(os.getenv("OTP_MAX_ATTEMPTS", "5"))
+OTP_PURGE_INTERVAL_SECONDS = int(os.getenv("OTP_PURGE_INTERVAL_SECONDS", "300"))
+
+
+class DatabaseOTPStore:
+    """Stores one row per (email, purpose) in the otps table"""
+
+    def issue(self, db: Session, email: str, purpose: str, commit: bool = True) -> str:
+        otp = crud_otp.create_otp(db, email, purpose, OTP_EXPIRE_MINUTES, commit=commit)
+        return otp.otp_code
+
+    def verify(self, db: Session, email: str, otp_code: str, purpose: str) -> bool:
+        otp = crud_otp.verify_otp(db, email, otp_code, purpose, OTP_MAX_ATTEMPTS)
+        if not otp:
+            return False
+        crud_otp.mark_otp_used(db, otp)
+        return True
+
+    def purge(self, db: Session) -> int:
+        return crud_otp.purge_expired_otps(db)
+
+
+class _MemoryOTP:
+    __slots__ = ("otp_code", "expires_at", "attempts")
+
+    def __init__(self, otp_code: str, expires_at: datetime):
+        self.otp_code = otp_code
+        self.expires_at = expires_at
+        self.attempts = 0
+
+
+class MemoryOTPStore:
+    """
+    Keeps OTPs in process memory with a TTL.
+    Codes are lost on restart and not shared between workers, so use it only
+    when the app runs as a single process.
+    """
+
+    def __init__(self):
+        self._codes = {}
+        self._lock = threading.Lock()
+
+    def issue(self, db: Optional[Session], email: str, purpose: str, commit: bool = True) -> str:
+        otp_code = crud_otp.generate_otp()
+        expires_at = datetime.utcnow() + timedelta(minutes=OTP_EXPIRE_MINUTES)
+        with self._lock:
+            self._codes[(email, purpose)] = _MemoryOTP(otp_code, expires_at)
+        return otp_code
+
+    def verify(self, db: Optional[Session], email: str, otp_code: str, purpose: str) -> bool:
+        with self._lock:
+            otp = self._codes.get((email, purpose))
+            if not otp or otp.expires_at <= datetime.utcnow() or otp.attempts >= OTP_MAX_ATTEMPTS:
+                return False
+            if not hmac.compare_digest(otp.otp_code.encode(), otp_code.encode()):
+                otp.attempts += 1
+                return False
+            # Codes are single-use
+            del self._codes[(email, purpose)]
+            return True
+
+    def purge(self, db: Optional[Session]) -> int:
+        now = datetime.utcnow()
+        with self._lock:
+            expired = [key for key, otp in self._codes.items() if otp.expires_at <= now]
+            for key in expired:
+                del self._codes[key]
+        return len(expired)
+
+
+class OTPService:
+    def __init__(self, backend: str = OTP_STORE_BACKEND):
+        self.store = MemoryOTPStore() if backend == "memory" else DatabaseOTPStore()
+        self.running = False
+        self.purged = 0
+
+    def issue(self, db: Session, email: str, purpose: str, commit: bool = True) -> str:
+        """Create (or replace) the OTP for this email and purpose and return the code"""
+        return self.store.issue(db, email, purpose, commit=commit)
+
+    def issue_and_email(self, db: Session, email: str, purpose: str, purpose_label: str) -> str:
+        """
+        Issue an OTP and record its email in the outbox in one transaction,
+        so a code is never stored without its email (or vice versa).
+        """
+        otp_code = self.store.issue(db, email, purpose, commit=False)
+        subject, body = build_otp_email(otp_code, purpose_label, OTP_EXPIRE_MINUTES)
+        crud_email_outbox.enqueue_email(db, email, subject, body, commit=False)
+        db.commit()
+        return otp_code
+
+    def verify(self, db: Session, email: str, otp_code: str, purpose: str) -> bool:
+        """Check and consume an OTP"""
+        return self.store.verify(db, email, otp_code, purpose)
+
+    def purge_expired(self) -> int:
+        db = SessionLocal()
+        try:
+            count = self.store.purge(db)
+        finally:
+            db.close()
+        self.purged += count
+        if count:
+            logger.info(f"Purged {count} expired or used OTPs")
+        return count
+
+    async def start_purge_loop(self, interval: int = OTP_PURGE_INTERVAL_SECONDS):
+        """Periodically delete expired and used OTPs so the table stays small"""
+        self.running = True
+        while self.running:
+            try:
+                await asyncio.to_thread(self.purge_expired)
+            except Exception as e:
+                logger.error(f"Error purging OTPs: {e}")
+            await asyncio.sleep(interval)
+
+    def stop(self):
+        self.running = False
+
+
+# Global OTP service
+otp_service = OTPService()
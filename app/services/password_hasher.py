@@ -0,0 +1,148 @@
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Tuple
+
+from app.core import metrics
+from app.core.security import get_password_hash, verify_and_update_password
+
+logger = logging.getLogger(__name__)
+
+# 0 disables the pool and hashes inline on the calling thread
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+# Upper bound on hashing jobs queued or running; further callers wait for a slot
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "256"))
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt hashing and verification in a bounded process pool.
+
+    bcrypt is deliberately CPU-heavy (100-300 ms per call), so doing it on the
+    request thread serializes logins and registrations. Jobs are pushed to a
+    pool of worker processes, which lets bursts scale with the number of cores.
+    The sync route handlers call it from Starlette's threadpool, which only
+    waits on the result.
+    """
+
+    def __init__(self, max_workers: int = PASSWORD_HASH_WORKERS,
+                 max_pending: int = PASSWORD_HASH_MAX_PENDING):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._stats_lock = threading.Lock()
+        self._started_at = time.monotonic()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rehashed = 0
+        self.pending = 0
+        self.total_seconds = 0.0
+
+    def hash(self, password: str) -> str:
+        """Hash a password, blocking the calling thread until a worker is done"""
+        return self._run(get_password_hash, password)
+
+    def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """Verify a password; also returns a new hash when the stored one uses outdated parameters"""
+        verified, new_hash = self._run(verify_and_update_password, password, hashed_password)
+        if new_hash:
+            with self._stats_lock:
+                self.rehashed += 1
+        return verified, new_hash
+
+    def start(self):
+        """Spin up the worker processes ahead of the first request"""
+        if self.max_workers > 0:
+            self._get_executor()
+
+    def shutdown(self, wait: bool = True):
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait, cancel_futures=not wait)
+                self._executor = None
+
+    def stats(self) -> dict:
+        """Return throughput and queue metrics"""
+        with self._stats_lock:
+            uptime = time.monotonic() - self._started_at
+            return {
+                "workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "pending": self.pending,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rehashed": self.rehashed,
+                "avg_seconds": round(self.total_seconds / self.completed, 4) if self.completed else 0.0,
+                "throughput_per_second": round(self.completed / uptime, 4) if uptime else 0.0,
+            }
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                # spawn avoids forking a process that already runs threads (uvicorn, SQLAlchemy pool)
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def _reset_executor(self, broken: ProcessPoolExecutor):
+        with self._executor_lock:
+            if self._executor is broken:
+                logger.error("Password hashing pool broke; starting a new one")
+                self._executor = None
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def _submit(self, fn, *args) -> Future:
+        executor = self._get_executor()
+        try:
+            return executor.submit(fn, *args)
+        except BrokenProcessPool:
+            self._reset_executor(executor)
+            return self._get_executor().submit(fn, *args)
+
+    def _begin(self):
+        with self._stats_lock:
+            self.submitted += 1
+            self.pending += 1
+        return time.perf_counter()
+
+    def _finish(self, started: float, ok: bool):
+        with self._stats_lock:
+            self.pending -= 1
+            if ok:
+                self.completed += 1
+                self.total_seconds += time.perf_counter() - started
+            else:
+                self.failed += 1
+
+    def _run(self, fn, *args):
+        self._slots.acquire()
+        started = self._begin()
+        ok = False
+        try:
+            if self.max_workers <= 0:
+                result = fn(*args)
+            else:
+                result = self._submit(fn, *args).result()
+            ok = True
+            return result
+        finally:
+            self._finish(started, ok)
+            self._slots.release()
+
+
+# Global password hasher
+password_hasher = PasswordHasher()
+
+metrics.registry.gauge(
+    "password_hash_pending", "Password hash jobs queued or running in the process pool",
+    callback=lambda: password_hasher.pending)
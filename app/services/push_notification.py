@@ -1,38 +1,176 @@
 import firebase_admin
-from firebase_admin import credentials, messaging
+from firebase_admin import credentials, exceptions, messaging
+import asyncio
 import os
-from typing import Optional
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
 import logging
-from app.core.firebase_config import ensure_firebase_credentials_file, get_firebase_credentials_file_path
+from app.core import metrics
+from app.core.firebase_config import create_firebase_credentials_json
 
 logger = logging.getLogger(__name__)
 
+# "firebase" sends through FCM; "fake" records messages in memory for local load tests
+PUSH_TRANSPORT = os.getenv("PUSH_TRANSPORT", "firebase")
+# Simulated round trip of one FCM call when PUSH_TRANSPORT=fake
+FAKE_PUSH_LATENCY_MS = float(os.getenv("FAKE_PUSH_LATENCY_MS", "50"))
+# FCM accepts at most 500 messages per send_each call
+PUSH_BATCH_SIZE = min(int(os.getenv("PUSH_BATCH_SIZE", "500")), 500)
+# Threads making blocking FCM calls; also the number of send_each batches in flight at once
+PUSH_DISPATCH_WORKERS = int(os.getenv("PUSH_DISPATCH_WORKERS", "4"))
+# Upper bound on push calls waiting for or holding a worker thread
+PUSH_MAX_CONCURRENCY = int(os.getenv("PUSH_MAX_CONCURRENCY", "64"))
+# Wait after a failed Firebase initialization before trying again; doubles per failure up to the max
+FIREBASE_INIT_RETRY_SECONDS = float(os.getenv("FIREBASE_INIT_RETRY_SECONDS", "30"))
+FIREBASE_INIT_RETRY_MAX_SECONDS = float(os.getenv("FIREBASE_INIT_RETRY_MAX_SECONDS", "600"))
 
-class PushNotificationService:
-    def __init__(self):
-        """Initialize Firebase Admin SDK"""
-        try:
-            # Check if Firebase is already initialized
-            if not firebase_admin._apps:
-                # Ensure Firebase credentials file exists (created from env variables)
-                if ensure_firebase_credentials_file():
-                    # Use the same file path as before
-                    service_account_path = get_firebase_credentials_file_path()
-
-                    if os.path.exists(service_account_path):
-                        cred = credentials.Certificate(service_account_path)
-                        firebase_admin.initialize_app(cred)
-                        logger.info("Firebase Admin SDK initialized successfully")
-                    else:
-                        logger.error(" Firebase service account key not found!")
-                        logger.error(f"Please check environment variables for Firebase configuration")
+
+class FirebaseTransport:
+    """
+    Blocking FCM calls through the Firebase Admin SDK.
+    The SDK is initialized on the first send (or by start()), so importing the
+    app never touches credentials or the network.
+    """
+
+    def __init__(self, retry_seconds: float = FIREBASE_INIT_RETRY_SECONDS,
+                 max_retry_seconds: float = FIREBASE_INIT_RETRY_MAX_SECONDS):
+        self._initialized = False
+        self._init_lock = threading.Lock()
+        self.retry_seconds = retry_seconds
+        self.max_retry_seconds = max_retry_seconds
+        self.failures = 0
+        self._retry_at = 0.0
+
+    def start(self) -> bool:
+        """
+        Initialize Firebase Admin SDK from the FIREBASE_* environment variables.
+        After a failure, calls return False without retrying until the backoff runs out.
+        """
+        with self._init_lock:
+            if self._initialized:
+                return True
+            if time.monotonic() < self._retry_at:
+                return False
+            try:
+                # Check if Firebase is already initialized
+                if not firebase_admin._apps:
+                    service_account = create_firebase_credentials_json()
+                    if not service_account:
+                        raise ValueError("please set all FIREBASE_* environment variables")
+                    # Credentials are loaded from memory; no key file is written to disk
+                    firebase_admin.initialize_app(credentials.Certificate(service_account))
+                    logger.info("Firebase Admin SDK initialized successfully")
                 else:
-                    logger.error("Failed to create Firebase credentials file from environment variables!")
-                    logger.error("Please set all FIREBASE_* environment variables")
-            else:
-                logger.info("Firebase Admin SDK already initialized")
-        except Exception as e:
-            logger.error(f"Failed to initialize Firebase: {str(e)}")
+                    logger.info("Firebase Admin SDK already initialized")
+                self._initialized = True
+                self.failures = 0
+            except Exception as e:
+                backoff = min(self.retry_seconds * 2 ** self.failures, self.max_retry_seconds)
+                self.failures += 1
+                self._retry_at = time.monotonic() + backoff
+                logger.error(f"Failed to initialize Firebase: {str(e)}; retrying in {backoff:.0f}s")
+            return self._initialized
+
+    def _ensure_started(self):
+        if not self.start():
+            raise RuntimeError("Firebase Admin SDK is not initialized")
+
+    def send(self, message: messaging.Message) -> str:
+        self._ensure_started()
+        return messaging.send(message)
+
+    def send_each(self, messages: List[messaging.Message]) -> messaging.BatchResponse:
+        self._ensure_started()
+        return messaging.send_each(messages)
+
+    def send_each_for_multicast(self, message: messaging.MulticastMessage) -> messaging.BatchResponse:
+        self._ensure_started()
+        return messaging.send_each_for_multicast(message)
+
+
+class FakeTransport:
+    """
+    In-memory stand-in for FCM used to measure dispatch throughput locally.
+    Each call sleeps for `latency_ms` to mimic the HTTP round trip; tokens
+    starting with "invalid" are answered with UnregisteredError.
+    """
+
+    def __init__(self, latency_ms: float = FAKE_PUSH_LATENCY_MS):
+        self.latency_ms = latency_ms
+        self.sent: List[messaging.Message] = []
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def start(self) -> bool:
+        return True
+
+    def send(self, message: messaging.Message) -> str:
+        response = self.send_each([message]).responses[0]
+        if response.exception:
+            raise response.exception
+        return response.message_id
+
+    def send_each(self, messages: List[messaging.Message]) -> messaging.BatchResponse:
+        time.sleep(self.latency_ms / 1000)
+        responses = []
+        with self._lock:
+            self.calls += 1
+            for message in messages:
+                if message.token.startswith("invalid"):
+                    error = messaging.UnregisteredError("Requested entity was not found.")
+                    responses.append(messaging.SendResponse(None, error))
+                else:
+                    self.sent.append(message)
+                    responses.append(messaging.SendResponse({"name": f"fake/messages/{len(self.sent)}"}, None))
+        return messaging.BatchResponse(responses)
+
+    def send_each_for_multicast(self, message: messaging.MulticastMessage) -> messaging.BatchResponse:
+        return self.send_each([
+            messaging.Message(notification=message.notification, data=message.data, token=token)
+            for token in message.tokens
+        ])
+
+
+def is_dead_token_error(error: Optional[Exception]) -> bool:
+    """
+    True when FCM rejected the token itself: the app was uninstalled
+    (UnregisteredError), the token is malformed (InvalidArgumentError),
+    or it belongs to another Firebase project (SenderIdMismatchError).
+    """
+    return isinstance(error, (
+        messaging.UnregisteredError,
+        messaging.SenderIdMismatchError,
+        exceptions.InvalidArgumentError,
+    ))
+
+
+def create_transport(name: str = PUSH_TRANSPORT):
+    if name == "fake":
+        return FakeTransport()
+    return FirebaseTransport()
+
+
+class PushNotificationService:
+    """
+    Push notifications over a pluggable transport.
+    The transport is blocking, so every call runs on a bounded thread pool and
+    async callers never stall the event loop.
+    """
+
+    def __init__(self, transport=None, workers: int = PUSH_DISPATCH_WORKERS,
+                 max_concurrency: int = PUSH_MAX_CONCURRENCY):
+        self.transport = transport or create_transport()
+        self.workers = workers
+        self.max_concurrency = max_concurrency
+        self._dispatch_executor: Optional[ThreadPoolExecutor] = None
+        self._dispatch_lock = threading.Lock()
+        self._semaphores = {}
+        # Tokens FCM reported as dead, waiting to be cleared by drain_dead_tokens()
+        self._dead_tokens = set()
+        self._dead_tokens_lock = threading.Lock()
+        self.dead_tokens_seen = 0
 
     async def send_push_notification(self, device_token: str, title: str, body: str) -> bool:
         """
@@ -52,25 +190,21 @@ class PushNotificationService:
                 return False
 
             # Create the notification message
-            message = messaging.Message(
-                notification=messaging.Notification(
-                    title=title,
-                    body=body
-                ),
-                token=device_token
-            )
+            message = self.build_message(device_token, title, body)
 
             # Send the message
-            response = messaging.send(message)
+            response = await self._run(self._timed, "single", self.transport.send, message)
+            metrics.push_messages_total.inc(outcome="success")
             logger.info(f"Push notification sent successfully: {response}")
-            print(f"PUSH NOTIFICATION SENT: {title} - {body}")
             return True
 
-        except messaging.UnregisteredError:
-            logger.warning(f"Device token is invalid or unregistered: {device_token}")
-            return False
         except Exception as e:
-            logger.error(f"Failed to send push notification: {str(e)}")
+            metrics.push_messages_total.inc(outcome="dead_token" if is_dead_token_error(e) else "failed")
+            if is_dead_token_error(e):
+                logger.warning(f"Device token is invalid or unregistered: {device_token}")
+                self.report_dead_tokens([device_token])
+            else:
+                logger.error(f"Failed to send push notification: {str(e)}")
             return False
 
     async def send_to_multiple_devices(self, device_tokens: list, title: str, body: str) -> dict:
@@ -99,12 +233,16 @@ class PushNotificationService:
                 tokens=device_tokens
             )
 
-            # Send the message
-            response = messaging.send_multicast(message)
+            # Send the message (send_multicast was removed from the Admin SDK)
+            response = await self._run(self._timed, "multicast", self.transport.send_each_for_multicast, message)
 
+            dead_tokens = [
+                token for token, r in zip(device_tokens, response.responses) if is_dead_token_error(r.exception)
+            ]
+            self.report_dead_tokens(dead_tokens)
+            self._count_outcomes(response.success_count, response.failure_count, len(dead_tokens))
             logger.info(
                 f"Multicast notification sent: {response.success_count} successful, {response.failure_count} failed")
-            print(f"MULTICAST NOTIFICATION: {response.success_count} sent, {response.failure_count} failed")
 
             return {
                 "success": response.success_count,
@@ -113,9 +251,138 @@ class PushNotificationService:
             }
 
         except Exception as e:
+            metrics.push_messages_total.inc(len(device_tokens), outcome="failed")
             logger.error(f"Failed to send multicast notification: {str(e)}")
             return {"success": 0, "failed": len(device_tokens)}
 
+    def build_message(self, device_token: str, title: str, body: str) -> messaging.Message:
+        return messaging.Message(
+            notification=messaging.Notification(
+                title=title,
+                body=body
+            ),
+            token=device_token
+        )
+
+    def send_batch(self, messages: List[messaging.Message]) -> dict:
+        """
+        Send many messages with send_each, PUSH_BATCH_SIZE per call, running up to
+        PUSH_DISPATCH_WORKERS calls in parallel. Blocks until every batch is done.
+
+        Returns:
+            dict: success/failure totals, per-batch counts, the tokens FCM reported
+            as dead, and an `errors` list aligned with `messages` (None where the
+            message was accepted)
+        """
+        results = list(self._get_dispatch_executor().map(self._send_chunk, self._chunks(messages)))
+        return self._merge_batches(results)
+
+    async def send_batch_async(self, messages: List[messaging.Message]) -> dict:
+        """Async version of send_batch; batches share the bounded worker pool"""
+        results = await asyncio.gather(*(self._run(self._send_chunk, chunk) for chunk in self._chunks(messages)))
+        return self._merge_batches(results)
+
+    def _chunks(self, messages: List[messaging.Message]) -> List[List[messaging.Message]]:
+        return [messages[i:i + PUSH_BATCH_SIZE] for i in range(0, len(messages), PUSH_BATCH_SIZE)]
+
+    def _send_chunk(self, chunk: List[messaging.Message]) -> dict:
+        dead_tokens = []
+        try:
+            response = self._timed("batch", self.transport.send_each, chunk)
+            errors = [None if r.success else r.exception for r in response.responses]
+            success, failed = response.success_count, response.failure_count
+            # Only per-message errors say anything about a token; a failed call says nothing
+            dead_tokens = [m.token for m, error in zip(chunk, errors) if is_dead_token_error(error)]
+        except Exception as e:
+            # The whole call failed (auth, network), so none of the chunk went out
+            logger.error(f"Failed to send push batch of {len(chunk)}: {str(e)}")
+            errors = [e] * len(chunk)
+            success, failed = 0, len(chunk)
+        self._count_outcomes(success, failed, len(dead_tokens))
+        return {"size": len(chunk), "success": success, "failed": failed, "errors": errors, "dead_tokens": dead_tokens}
+
+    def _timed(self, kind: str, fn, *args):
+        with metrics.push_send_duration_seconds.time(kind=kind):
+            return fn(*args)
+
+    def _count_outcomes(self, success: int, failed: int, dead: int):
+        metrics.push_messages_total.inc(success, outcome="success")
+        metrics.push_messages_total.inc(failed - dead, outcome="failed")
+        metrics.push_messages_total.inc(dead, outcome="dead_token")
+
+    def _merge_batches(self, results: List[dict]) -> dict:
+        errors = []
+        dead_tokens = []
+        for result in results:
+            errors.extend(result["errors"])
+            dead_tokens.extend(result["dead_tokens"])
+        self.report_dead_tokens(dead_tokens)
+        return {
+            "batches": [{"size": r["size"], "success": r["success"], "failed": r["failed"]} for r in results],
+            "success": sum(r["success"] for r in results),
+            "failed": sum(r["failed"] for r in results),
+            "dead_tokens": dead_tokens,
+            "errors": errors,
+        }
+
+    def report_dead_tokens(self, tokens: List[str]):
+        """Queue tokens FCM rejected so the next drain_dead_tokens() clears them in bulk"""
+        if not tokens:
+            return
+        with self._dead_tokens_lock:
+            self._dead_tokens.update(tokens)
+            self.dead_tokens_seen += len(tokens)
+
+    def drain_dead_tokens(self) -> List[str]:
+        """Return and forget every dead token reported since the last drain"""
+        with self._dead_tokens_lock:
+            tokens, self._dead_tokens = list(self._dead_tokens), set()
+        return tokens
+
+    def stats(self) -> dict:
+        with self._dead_tokens_lock:
+            return {
+                "dead_tokens_seen": self.dead_tokens_seen,
+                "dead_tokens_pending": len(self._dead_tokens),
+            }
+
+    async def _run(self, fn, *args):
+        """Run a blocking transport call on the worker pool, at most max_concurrency at a time"""
+        async with self._get_semaphore():
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_dispatch_executor(), fn, *args)
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Semaphores are bound to the loop they are first used on
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return semaphore
+
+    def _get_dispatch_executor(self) -> ThreadPoolExecutor:
+        with self._dispatch_lock:
+            if self._dispatch_executor is None:
+                self._dispatch_executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="push-dispatch"
+                )
+            return self._dispatch_executor
+
+    def start(self) -> bool:
+        """Initialize the transport and worker threads ahead of the first push"""
+        self._get_dispatch_executor()
+        return self.transport.start()
+
+    def shutdown(self):
+        with self._dispatch_lock:
+            if self._dispatch_executor is not None:
+                self._dispatch_executor.shutdown(wait=True)
+                self._dispatch_executor = None
+
 
 # Create a global instance
-push_service = PushNotificationService()
\ No newline at end of file
+push_service = PushNotificationService()
+
+metrics.registry.gauge(
+    "push_dead_tokens_pending", "Dead device tokens waiting to be pruned",
+    callback=lambda: push_service.stats()["dead_tokens_pending"])
@@ -0,0 +1,112 @@
+"""
+Pure helpers for reminder scheduling.
+
+Reminder days are stored as a bitmask next to the human-readable
+selected_days string: weekly reminders set bit N for ISO weekday N
+(1=Monday .. 7=Sunday), monthly reminders set bit N for day-of-month N (1..31).
+
+Each active reminder also stores next_fire_at, the next occurrence of its
+local "HH:MM" time in the owner's timezone, converted to naive UTC.
+"""
+import os
+import re
+from datetime import datetime, timedelta, time, timezone
+from typing import List, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from app.models.reminder import ReminderFrequency
+
+# Used for users who have not set a timezone
+DEFAULT_USER_TIMEZONE = os.getenv("DEFAULT_USER_TIMEZONE", "UTC")
+# Monthly reminders on e.g. the 31st can skip months, so search a bit over two months ahead
+_MAX_LOOKAHEAD_DAYS = 62
+_HH_MM = re.compile(r"([01]\d|2[0-3]):[0-5]\d")
+
+
+def parse_selected_days(selected_days: Optional[str]) -> List[int]:
+    """Parse "1,3,5" into [1, 3, 5], ignoring blanks and malformed entries"""
+    if not selected_days:
+        return []
+    days = []
+    for day in selected_days.split(","):
+        day = day.strip()
+        if day.isdigit():
+            days.append(int(day))
+    return days
+
+
+def compute_day_mask(frequency, selected_days: Optional[str]) -> Optional[int]:
+    """Build the day bitmask stored on a reminder; None for daily reminders"""
+    if frequency == ReminderFrequency.WEEKLY:
+        valid = range(1, 8)
+    elif frequency == ReminderFrequency.MONTHLY:
+        valid = range(1, 32)
+    else:
+        return None
+    mask = 0
+    for day in parse_selected_days(selected_days):
+        if day in valid:
+            mask |= 1 << day
+    return mask
+
+
+def day_bit(day: int) -> int:
+    return 1 << day
+
+
+def get_zone(tz_name: Optional[str]) -> ZoneInfo:
+    try:
+        return ZoneInfo(tz_name or DEFAULT_USER_TIMEZONE)
+    except (ZoneInfoNotFoundError, ValueError):
+        return ZoneInfo(DEFAULT_USER_TIMEZONE)
+
+
+def is_valid_timezone(tz_name: str) -> bool:
+    try:
+        ZoneInfo(tz_name)
+        return True
+    except (ZoneInfoNotFoundError, ValueError):
+        return False
+
+
+def parse_time(time_str: str) -> time:
+    hour, minute = time_str.split(":")
+    return time(int(hour), int(minute))
+
+
+def is_valid_time(time_str: str) -> bool:
+    """True for a 24-hour "HH:MM" time such as 07:30 or 22:00"""
+    return bool(_HH_MM.fullmatch(time_str))
+
+
+def compute_next_fire_at(frequency, time_str: str, day_mask: Optional[int],
+                         tz_name: Optional[str], after: datetime) -> Optional[datetime]:
+    """
+    Return the first occurrence strictly after `after` (naive UTC) as naive UTC,
+    or None when the reminder can never fire (e.g. weekly with no days selected).
+    """
+    if frequency != ReminderFrequency.DAILY and not day_mask:
+        return None
+    zone = get_zone(tz_name)
+    fire_time = parse_time(time_str)
+    local_after = after.replace(tzinfo=timezone.utc).astimezone(zone)
+
+    for offset in range(_MAX_LOOKAHEAD_DAYS + 1):
+        day = local_after.date() + timedelta(days=offset)
+        if frequency == ReminderFrequency.WEEKLY and not day_mask & day_bit(day.isoweekday()):
+            continue
+        if frequency == ReminderFrequency.MONTHLY and not day_mask & day_bit(day.day):
+            continue
+        candidate = datetime.combine(day, fire_time, tzinfo=zone).astimezone(timezone.utc).replace(tzinfo=None)
+        if candidate > after:
+            return candidate
+    return None
+
+
+def next_fire_at_for(reminder, tz_name: Optional[str], after: Optional[datetime] = None) -> Optional[datetime]:
+    """next_fire_at for a Reminder row, or None if it is inactive"""
+    if not reminder.is_active:
+        return None
+    return compute_next_fire_at(
+        reminder.frequency, reminder.time, reminder.day_mask, tz_name, after or datetime.utcnow()
+    )
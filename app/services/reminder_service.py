@@ -1,121 +1,301 @@
 import asyncio
-from datetime import datetime, time
+import os
+from time import perf_counter
+from datetime import datetime, time, timedelta
 from sqlalchemy.orm import Session
 from app.crud import reminder as crud_reminder
+from app.crud import user_device as crud_user_device
+from app.crud import scheduler_state as crud_scheduler_state
 from app.models.reminder import Reminder
 from app.models.user import User
+from app.core import metrics
+from app.core.lifecycle import inflight
+from app.core.sql_stats import track_queries
+from app.db.session import SessionLocal
 from app.services.push_notification import push_service
-from typing import List
+from app.services.scheduler_lease import LeaseManager
+from app.services.reminder_schedule import next_fire_at_for
+from typing import List, Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
+# After downtime or a slow tick, missed minutes up to this far back are replayed;
+# older occurrences are skipped instead of being sent late
+REMINDER_CATCHUP_MINUTES = int(os.getenv("REMINDER_CATCHUP_MINUTES", "10"))
+REMINDER_PUSH_TITLE = "Glowzel Reminder"
+SCHEDULER_NAME = "reminders"
+# Split due reminders across instances by user_id % REMINDER_SHARD_COUNT; each shard has its own lease
+REMINDER_SHARD_COUNT = max(int(os.getenv("REMINDER_SHARD_COUNT", "1")), 1)
+# Shards one instance may own; with several instances, keep this * instances >= REMINDER_SHARD_COUNT
+REMINDER_MAX_SHARDS_PER_INSTANCE = int(os.getenv("REMINDER_MAX_SHARDS_PER_INSTANCE", str(REMINDER_SHARD_COUNT)))
+# Due reminders are loaded, advanced, committed and pushed this many at a time
+REMINDER_PAGE_SIZE = int(os.getenv("REMINDER_PAGE_SIZE", "500"))
+
+
+def floor_minute(moment: datetime) -> datetime:
+    return moment.replace(second=0, microsecond=0)
+
+
+def shard_name(shard: Optional[int]) -> str:
+    if shard is None:
+        return SCHEDULER_NAME
+    return f"{SCHEDULER_NAME}:{shard}/{REMINDER_SHARD_COUNT}"
+
 
 class ReminderService:
     def __init__(self):
         self.running = False
+        # Shard None means "all reminders"; only used when sharding is off
+        self.shards = list(range(REMINDER_SHARD_COUNT)) if REMINDER_SHARD_COUNT > 1 else [None]
+        self.leases = LeaseManager([shard_name(shard) for shard in self.shards], REMINDER_MAX_SHARDS_PER_INSTANCE)
+        self.sent = 0
+        self.failed = 0
+        self.skipped = 0
+        self.pruned_tokens = 0
+        self.duplicates = 0
+        self.last_dispatch: Optional[dict] = None
+        self.last_processed_minute = {}
+        self.ticks = 0
+        self.caught_up_minutes = 0
+        self.last_tick_seconds = 0.0
+        self.max_tick_seconds = 0.0
+        self.last_lag_seconds = 0.0
+        self.max_lag_seconds = 0.0
 
-    async def start_reminder_checker(self, db: Session):
+    async def start_reminder_checker(self):
         """
         WHAT THIS DOES:
-        - Runs in background every minute
-        - Checks all active reminders
+        - Wakes up right at the start of every minute
+        - Only the instance holding the scheduler lease (or a shard's lease) sends
+        - Looks up the reminders due by that minute, including any it missed
         - Sends notifications when it's time
         - Like a clock that never stops checking
         """
         self.running = True
-        while self.running:
-            try:
-                await self.check_reminders(db)
-                await asyncio.sleep(60)  # Check every minute
-            except Exception as e:
-                logger.error(f"Error in reminder checker: {e}")
-                await asyncio.sleep(60)
-
-    async def check_reminders(self, db: Session):
-        """Check if it's time to send reminders"""
-        current_time = datetime.now().strftime("%H:%M")
-        current_weekday = datetime.now().weekday() + 1  # 1=Monday, 7=Sunday
-        current_day = datetime.now().day  # Day of month (1-31)
+        try:
+            await asyncio.to_thread(self.backfill_schedule)
+        except Exception as e:
+            logger.error(f"Error backfilling reminder schedule: {e}")
+        # Renews the leases while we wait or tick; it ends with this loop
+        heartbeat = asyncio.create_task(self.leases.heartbeat_loop())
+        try:
+            while self.running:
+                minute = floor_minute(datetime.utcnow())
+                # A fresh session per tick keeps the identity map from growing for the life of the process
+                db = SessionLocal()
+                try:
+                    with inflight.track("reminder_tick"), track_queries("reminder_tick"):
+                        await self.run_tick(db, minute)
+                except Exception as e:
+                    db.rollback()
+                    logger.error(f"Error in reminder checker: {e}")
+                finally:
+                    db.close()
+                # Sleep to the next minute boundary rather than a fixed 60s, so tick time never accumulates as drift
+                await asyncio.sleep(max((minute + timedelta(minutes=1) - datetime.utcnow()).total_seconds(), 0))
+        finally:
+            heartbeat.cancel()
 
-        # ADD DEBUG LOGGING
-        print(f" Checking reminders at {current_time}, weekday: {current_weekday}, day: {current_day}")
+    def backfill_schedule(self):
+        db = SessionLocal()
+        try:
+            crud_reminder.backfill_schedule(db)
+        finally:
+            db.close()
 
-        # Get all active reminders
-        all_reminders = db.query(Reminder).filter(Reminder.is_active == True).all()
-        print(f" Found {len(all_reminders)} active reminders")
+    async def run_tick(self, db: Session, minute: datetime):
+        """
+        Process one minute boundary for every shard whose lease we hold.
+        Blocking DB work runs in a thread (one at a time, so the session is never
+        shared between threads); only the push dispatch awaits on the loop.
+        """
+        started = perf_counter()
+        self.last_lag_seconds = (datetime.utcnow() - minute).total_seconds()
+        self.max_lag_seconds = max(self.max_lag_seconds, self.last_lag_seconds)
+        metrics.reminder_tick_lag_seconds.set(self.last_lag_seconds)
+
+        held = await asyncio.to_thread(self.leases.refresh, db)
+        processed = False
+        for shard in self.shards:
+            if shard_name(shard) in held:
+                processed = await self.run_shard_tick(db, minute, shard) or processed
+        if not processed:
+            return
 
-        for reminder in all_reminders:
-            try:
-                should_send = self.should_send_reminder(reminder, current_time, current_weekday, current_day)
-                print(f" Reminder '{reminder.name}' at {reminder.time} ({reminder.frequency}): {'SEND' if should_send else 'Skip'}")
+        self.ticks += 1
+        self.last_tick_seconds = perf_counter() - started
+        self.max_tick_seconds = max(self.max_tick_seconds, self.last_tick_seconds)
+        metrics.reminder_tick_duration_seconds.observe(self.last_tick_seconds)
 
-                if should_send:
-                    await self.send_reminder(reminder, db)
-            except Exception as e:
-                logger.error(f"Error checking reminder {reminder.id}: {e}")
+    async def run_shard_tick(self, db: Session, minute: datetime, shard: Optional[int]) -> bool:
+        """Process one minute for one shard; returns False if it was already processed"""
+        name = shard_name(shard)
+        # Always read progress from the DB: another instance may have held this shard meanwhile
+        last_processed = await asyncio.to_thread(crud_scheduler_state.get_last_processed_minute, db, name)
+        if last_processed is not None and minute <= last_processed:
+            return False
+        if last_processed is not None and minute - last_processed > timedelta(minutes=1):
+            missed = int((minute - last_processed).total_seconds() // 60) - 1
+            self.caught_up_minutes += min(missed, REMINDER_CATCHUP_MINUTES)
+            logger.warning(f"Reminder scheduler {name} missed {missed} minute(s) since {last_processed:%H:%M}; "
+                           f"replaying up to {REMINDER_CATCHUP_MINUTES}")
+
+        await self.check_reminders(db, minute, shard)
+        await asyncio.to_thread(crud_scheduler_state.set_last_processed_minute, db, name, minute)
+        self.last_processed_minute[name] = minute
+        return True
 
-    def should_send_reminder(self, reminder, current_time: str, current_weekday: int, current_day: int) -> bool:
+    async def check_reminders(self, db: Session, minute: Optional[datetime] = None, shard: Optional[int] = None):
+        """Check if it's time to send reminders"""
+        now = minute or datetime.utcnow()
+        cutoff = floor_minute(now) - timedelta(minutes=REMINDER_CATCHUP_MINUTES)
+        logger.debug(f"Checking reminders due by {now:%Y-%m-%d %H:%M} UTC")
+
+        counts = {"due": 0, "skipped": 0, "duplicates": 0, "no_token": 0}
+        dispatch = {"batches": [], "success": 0, "failed": 0, "dead_tokens": 0, "seconds": 0.0}
+        last_id = 0
+        while True:
+            page_size, last_id, messages = await asyncio.to_thread(
+                self.advance_next_page, db, now, cutoff, shard, last_id, counts)
+            if not page_size:
+                break
+            result = await self.dispatch(messages)
+            dispatch["batches"].extend(result["batches"])
+            for key in ("success", "failed", "dead_tokens", "seconds"):
+                dispatch[key] += result[key]
+            if page_size < REMINDER_PAGE_SIZE:
+                break
+        dispatch["seconds"] = round(dispatch["seconds"], 3)
+        dispatch["pruned_tokens"] = await asyncio.to_thread(self.prune_dead_tokens, db)
+
+        due, skipped, duplicates, no_token = counts["due"], counts["skipped"], counts["duplicates"], counts["no_token"]
+        self.skipped += skipped
+        self.duplicates += duplicates
+        # Message-level success and failure are counted by push_messages_total
+        dispatched = due - skipped - duplicates - no_token
+        for outcome, count in (("dispatched", dispatched), ("skipped", skipped),
+                               ("duplicate", duplicates), ("no_token", no_token)):
+            metrics.reminders_processed_total.inc(count, outcome=outcome)
+        self.last_dispatch = dict(dispatch, **counts)
+        logger.info(f"Processed {due} due reminders: {dispatch['success']} sent, {dispatch['failed']} failed, "
+                    f"{no_token} without device token, {skipped} stale skipped, {duplicates} duplicates "
+                    f"in {dispatch['seconds']}s; {dispatch['pruned_tokens']} dead device tokens removed")
+
+    def advance_next_page(self, db: Session, now: datetime, cutoff: datetime, shard: Optional[int],
+                          last_id: int, counts: dict):
         """
-        WHAT THIS DOES:
-        - Checks if it's time to send this reminder
-        - For daily: always send at the time
-        - For weekly: send if today is in selected_days
-        - For monthly: send if today is in selected_days
+        Load the next page of due reminders after `last_id`, advance them and commit.
+        Returns (page size, last id, push messages); runs in a worker thread.
         """
-        # Check if time matches
-        if reminder.time != current_time:
-            return False
+        # Keyset pages by primary key keep memory flat however many reminders are due at once
+        page = self.due_reminders_query(db, now, shard).filter(
+            Reminder.id > last_id
+        ).limit(REMINDER_PAGE_SIZE).all()
+        if not page:
+            return 0, last_id, []
+        last_id = page[-1][0].id
+        messages = self.advance_page(db, page, now, cutoff, counts)
+        # Record the occurrences as sent before pushing, so a crash mid-dispatch cannot send them twice
+        db.commit()
+        return len(page), last_id, messages
 
-        # Check frequency
-        if reminder.frequency == "daily":
-            return True
-        elif reminder.frequency == "weekly":
-            if not reminder.selected_days:
-                return False
-            # Parse selected days: "1,3,5" -> [1, 3, 5] (Mon, Wed, Fri)
-            selected_days = [int(day.strip()) for day in reminder.selected_days.split(",")]
-            return current_weekday in selected_days
-        elif reminder.frequency == "monthly":
-            if not reminder.selected_days:
-                return False
-            # Parse selected days: "1,15,30" -> [1, 15, 30]
-            selected_days = [int(day.strip()) for day in reminder.selected_days.split(",")]
-            return current_day in selected_days
-
-        return False
-
-    async def send_reminder(self, reminder, db: Session):
+    def advance_page(self, db: Session, page: list, now: datetime, cutoff: datetime, counts: dict) -> list:
         """
-        WHAT THIS DOES:
-        - Sends push notification to user's phone
-        - Like WhatsApp message or alarm
-        - User gets notification even if app is closed
+        Build the push messages for one page of (reminder, owner timezone) rows and
+        advance each reminder's next_fire_at; outcome counts are added to `counts`
         """
-        message = f"Time for: {reminder.name}"
-        print(f" REMINDER SENT: {message}")
-        logger.info(f"REMINDER: {message}")
-
-        # Get user's device token
-        user = db.query(User).filter(User.id == reminder.user_id).first()
-        if user and user.device_token:
-            # Send push notification
-            success = await push_service.send_push_notification(
-                device_token=user.device_token,
-                title="Glowzel Reminder",
-                body=message
-            )
-            if success:
-                print(f"Push notification sent to user {user.id}")
+        # All owners' devices are loaded at once; every device of every owner becomes
+        # one message, and send_each batches them across users
+        tokens_by_user = crud_user_device.get_tokens_for_users(db, {reminder.user_id for reminder, _ in page})
+        messages = []
+        counts["due"] += len(page)
+        for reminder, tz_name in page:
+            fire_at = reminder.next_fire_at
+            device_tokens = tokens_by_user.get(reminder.user_id)
+            if fire_at < cutoff:
+                counts["skipped"] += 1
+            elif reminder.last_sent_at is not None and reminder.last_sent_at >= fire_at:
+                # This occurrence was already dispatched (e.g. the tick crashed before advancing)
+                counts["duplicates"] += 1
+            elif not device_tokens:
+                counts["no_token"] += 1
             else:
-                print(f"Failed to send push notification to user {user.id}")
-        else:
-            print(f"No device token found for user {reminder.user_id}")
+                body = f"Time for: {reminder.name}"
+                messages.extend(push_service.build_message(token, REMINDER_PUSH_TITLE, body) for token in device_tokens)
+                reminder.last_sent_at = fire_at
+            # Advance past now so a missed backlog is not replayed occurrence by occurrence
+            reminder.next_fire_at = next_fire_at_for(reminder, tz_name, after=max(fire_at, now))
+        return messages
+
+    def due_reminders_query(self, db: Session, now: datetime, shard: Optional[int] = None):
+        """Query for active reminders (with their owner's timezone) whose next occurrence has passed, by id"""
+        query = db.query(Reminder, User.timezone).join(User, User.id == Reminder.user_id).filter(
+            Reminder.is_active == True,
+            Reminder.next_fire_at <= now
+        )
+        if shard is not None:
+            query = query.filter(Reminder.user_id % REMINDER_SHARD_COUNT == shard)
+        return query.order_by(Reminder.id.asc())
+
+    async def dispatch(self, messages: list) -> dict:
+        """Send reminder pushes in send_each batches and record per-batch results"""
+        started = perf_counter()
+        result = await push_service.send_batch_async(messages)
+        result.pop("errors")
+        result["dead_tokens"] = len(result["dead_tokens"])
+        result["seconds"] = round(perf_counter() - started, 3)
+        self.sent += result["success"]
+        self.failed += result["failed"]
+        for i, batch in enumerate(result["batches"]):
+            if batch["failed"]:
+                logger.warning(f"Reminder push batch {i}: {batch['success']}/{batch['size']} sent, {batch['failed']} failed")
+        return result
+
+    def prune_dead_tokens(self, db: Session) -> int:
+        """Delete, in one pass, every device FCM reported as unregistered or invalid"""
+        tokens = push_service.drain_dead_tokens()
+        if not tokens:
+            return 0
+        try:
+            cleared = crud_user_device.delete_tokens(db, tokens)
+        except Exception as e:
+            logger.error(f"Error clearing {len(tokens)} dead device tokens: {e}")
+            push_service.report_dead_tokens(tokens)
+            return 0
+        self.pruned_tokens += cleared
+        logger.info(f"Removed {cleared} dead device tokens")
+        return cleared
+
+    def stats(self) -> dict:
+        return {
+            "sent": self.sent,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "pruned_tokens": self.pruned_tokens,
+            "duplicates": self.duplicates,
+            "ticks": self.ticks,
+            "last_processed_minute": {name: minute.isoformat() for name, minute in self.last_processed_minute.items()},
+            "leases": self.leases.stats(),
+            "caught_up_minutes": self.caught_up_minutes,
+            "last_tick_seconds": round(self.last_tick_seconds, 3),
+            "max_tick_seconds": round(self.max_tick_seconds, 3),
+            "last_lag_seconds": round(self.last_lag_seconds, 3),
+            "max_lag_seconds": round(self.max_lag_seconds, 3),
+            "last_dispatch": self.last_dispatch,
+        }
 
     def stop(self):
-        """Stop the reminder checker"""
+        """Stop the reminder checker after the current tick"""
         self.running = False
 
+    def release_leases(self):
+        """Hand our leases to another instance; call once the last tick has finished"""
+        try:
+            self.leases.release_all()
+        except Exception as e:
+            logger.error(f"Error releasing scheduler leases: {e}")
+
 
 # Global reminder service
 reminder_service = ReminderService()
\ No newline at end of file
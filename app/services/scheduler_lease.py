@@ -0,0 +1,92 @@
+import asyncio
+import logging
+import os
+import socket
+import threading
+import uuid
+from typing import List, Optional, Set
+
+from app.crud import scheduler_lease as crud_scheduler_lease
+from app.db.session import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# A holder that misses heartbeats for this long loses its leases to another instance
+SCHEDULER_LEASE_TTL_SECONDS = int(os.getenv("SCHEDULER_LEASE_TTL_SECONDS", "60"))
+SCHEDULER_LEASE_HEARTBEAT_SECONDS = int(os.getenv("SCHEDULER_LEASE_HEARTBEAT_SECONDS", "15"))
+
+
+class LeaseManager:
+    """
+    Keeps DB leases so that each named job runs on exactly one instance.
+    Leases are renewed by a heartbeat; if the holder dies, they expire after
+    SCHEDULER_LEASE_TTL_SECONDS and the next instance to refresh picks them up.
+    """
+
+    def __init__(self, names: List[str], max_held: Optional[int] = None,
+                 ttl_seconds: int = SCHEDULER_LEASE_TTL_SECONDS):
+        self.names = names
+        self.max_held = max_held or len(names)
+        self.ttl_seconds = ttl_seconds
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.held: Set[str] = set()
+        # The heartbeat thread and the tick both refresh, so changes are made under this lock;
+        # held is replaced rather than mutated, so readers can take it without locking
+        self._lock = threading.Lock()
+        self.running = False
+        self.acquired = 0
+        self.lost = 0
+
+    def refresh(self, db) -> Set[str]:
+        """Renew the leases we hold and try to take free ones, up to max_held"""
+        with self._lock:
+            held = set(self.held)
+            for name in self.names:
+                if name in held:
+                    if not crud_scheduler_lease.try_acquire(db, name, self.holder, self.ttl_seconds):
+                        held.discard(name)
+                        self.lost += 1
+                        logger.warning(f"Lost scheduler lease {name}")
+                elif len(held) < self.max_held:
+                    if crud_scheduler_lease.try_acquire(db, name, self.holder, self.ttl_seconds):
+                        held.add(name)
+                        self.acquired += 1
+                        logger.info(f"Acquired scheduler lease {name} as {self.holder}")
+            self.held = held
+            return set(held)
+
+    def refresh_in_new_session(self) -> Set[str]:
+        db = SessionLocal()
+        try:
+            return self.refresh(db)
+        finally:
+            db.close()
+
+    async def heartbeat_loop(self, interval: int = SCHEDULER_LEASE_HEARTBEAT_SECONDS):
+        """Renew leases between ticks so a long tick does not let them expire"""
+        self.running = True
+        while self.running:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.refresh_in_new_session)
+            except Exception as e:
+                logger.error(f"Error renewing scheduler leases: {e}")
+
+    def release_all(self):
+        self.running = False
+        db = SessionLocal()
+        try:
+            with self._lock:
+                for name in self.held:
+                    crud_scheduler_lease.release(db, name, self.holder)
+                self.held = set()
+        finally:
+            db.close()
+
+    def stats(self) -> dict:
+        return {
+            "holder": self.holder,
+            "held": sorted(self.held),
+            "acquired": self.acquired,
+            "lost": self.lost,
+        }
@@ -0,0 +1,49 @@
+"""
+Standalone email delivery worker.
+
+Drains the email_outbox table so web processes never talk to SMTP:
+
+    python -m app.workers.email_outbox [--metrics-port N]
+
+Send and backlog metrics are served on --metrics-port (default METRICS_PORT).
+"""
+import argparse
+import asyncio
+import logging
+import signal
+
+from dotenv import load_dotenv
+load_dotenv()
+
+# Import all models to ensure relationships are resolved
+from app.models import user, user_profile, skin_analysis, otp, daily_skin_log, reminder, refresh_token, email_outbox, user_device, scheduler_state, scheduler_lease
+
+from app.core import metrics
+from app.services.email_outbox_worker import email_outbox_worker
+from app.services.mail_service import mail_service
+
+logger = logging.getLogger(__name__)
+
+
+async def main():
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, email_outbox_worker.stop)
+    logger.info("Email outbox worker started")
+    try:
+        await email_outbox_worker.start()
+    finally:
+        mail_service.shutdown()
+        logger.info(f"Email outbox worker stopped: {email_outbox_worker.stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Deliver queued emails from the outbox")
+    parser.add_argument("--metrics-port", type=int, default=metrics.METRICS_PORT,
+                        help="serve GET /metrics on this port (default METRICS_PORT; 0 disables)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s [%(name)s] %(message)s")
+    if args.metrics_port:
+        metrics.start_http_server(args.metrics_port)
+    asyncio.run(main())
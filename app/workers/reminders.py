@@ -0,0 +1,87 @@
+"""
+Standalone reminder scheduler and push dispatcher.
+
+Runs the minute-aligned reminder loop outside the web process, so notification
+bursts never compete with request handling:
+
+    python -m app.workers.reminders [--push-workers N] [--push-concurrency N] [--metrics-port N]
+
+Start the web app with REMINDERS_IN_WEB=false when using it. Several copies can
+run at once; the scheduler lease makes sure each reminder is sent by only one.
+Tick, push and lease metrics are served on --metrics-port (default METRICS_PORT).
+"""
+import argparse
+import asyncio
+import logging
+import signal
+import sys
+
+from dotenv import load_dotenv
+load_dotenv()
+
+# Import all models to ensure relationships are resolved
+from app.models import user, user_profile, skin_analysis, otp, daily_skin_log, reminder, refresh_token, email_outbox, user_device, scheduler_state, scheduler_lease
+
+from app.core import metrics
+from app.core.lifecycle import SHUTDOWN_DRAIN_SECONDS, TaskSupervisor, inflight
+from app.services.device_registry import device_registry
+from app.services.push_notification import push_service
+from app.services.reminder_service import reminder_service
+
+logger = logging.getLogger(__name__)
+
+
+async def main() -> int:
+    """Run until SIGINT/SIGTERM; returns a non-zero exit code if a loop died on its own"""
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopping.set)
+    logger.info(f"Reminder worker started (push workers: {push_service.workers}, "
+                f"max concurrency: {push_service.max_concurrency})")
+    await asyncio.to_thread(push_service.start)
+    supervisor = TaskSupervisor()
+    loops = {
+        supervisor.start("reminder-checker", reminder_service.start_reminder_checker()),
+        supervisor.start("device-sweep", device_registry.start_sweep_loop()),
+    }
+    stop_wait = asyncio.create_task(stopping.wait())
+    exit_code = 0
+    try:
+        # The loops sleep up to a minute between runs, so stop on the signal rather than
+        # waiting for them, but also notice when one of them ends on its own
+        done, _ = await asyncio.wait(loops | {stop_wait}, return_when=asyncio.FIRST_COMPLETED)
+        ended = [task for task in done if task is not stop_wait]
+        if ended:
+            # TaskSupervisor has already logged the crash; exit so the process manager restarts us
+            logger.error(f"Stopping: {', '.join(task.get_name() for task in ended)} ended unexpectedly")
+            exit_code = 1
+    finally:
+        stop_wait.cancel()
+        reminder_service.stop()
+        device_registry.stop()
+        # Let a tick that is already dispatching finish before cancelling the loops
+        if not await inflight.wait_idle(SHUTDOWN_DRAIN_SECONDS):
+            logger.warning(f"Shutdown deadline reached with work still in flight: {inflight.active()}")
+        await supervisor.stop(timeout=5)
+        reminder_service.release_leases()
+        push_service.shutdown()
+        logger.info(f"Reminder worker stopped: {reminder_service.stats()}")
+    return exit_code
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the reminder scheduler and push dispatcher")
+    parser.add_argument("--push-workers", type=int, help="threads making FCM calls (default PUSH_DISPATCH_WORKERS)")
+    parser.add_argument("--push-concurrency", type=int, help="max push calls in flight (default PUSH_MAX_CONCURRENCY)")
+    parser.add_argument("--metrics-port", type=int, default=metrics.METRICS_PORT,
+                        help="serve GET /metrics on this port (default METRICS_PORT; 0 disables)")
+    args = parser.parse_args()
+    if args.push_workers:
+        push_service.workers = args.push_workers
+    if args.push_concurrency:
+        push_service.max_concurrency = args.push_concurrency
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s [%(name)s] %(message)s")
+    if args.metrics_port:
+        metrics.start_http_server(args.metrics_port)
+    sys.exit(asyncio.run(main()))
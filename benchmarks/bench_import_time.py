@@ -0,0 +1,64 @@
+"""
+Cold import time of the web app and the workers, measured in fresh interpreters.
+
+Also checks that importing has no side effects: it must succeed without
+GEMINI_API_KEY or FIREBASE_* variables and must not create files.
+
+Usage:
+    python -m benchmarks.bench_import_time [runs]
+"""
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+MODULES = ["app.main", "app.workers.reminders", "app.workers.email_outbox"]
+# Variables that used to be required (or used) at import time
+UNSET = ["GEMINI_API_KEY"] + [name for name in os.environ if name.startswith("FIREBASE_")]
+
+
+def _import_seconds(module: str, cwd: str) -> float:
+    env = {k: v for k, v in os.environ.items() if k not in UNSET}
+    env["PYTHONPATH"] = os.pathsep.join([os.getcwd(), env.get("PYTHONPATH", "")])
+    # Skip .env so the measurement sees the bare environment
+    code = f"import dotenv; dotenv.load_dotenv = lambda *a, **k: False; import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    result = subprocess.run([sys.executable, "-c", code], cwd=cwd, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr}")
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def _slowest_imports(module: str, cwd: str, top: int = 8):
+    env = {k: v for k, v in os.environ.items() if k not in UNSET}
+    env["PYTHONPATH"] = os.pathsep.join([os.getcwd(), env.get("PYTHONPATH", "")])
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=cwd, env=env, capture_output=True, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Top-level packages only, to keep the list readable
+        if name.strip() and "." not in name.strip():
+            rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main(runs: int = 5):
+    with tempfile.TemporaryDirectory() as cwd:
+        for module in MODULES:
+            samples = [_import_seconds(module, cwd) for _ in range(runs)]
+            print(f"{module:<28} median {statistics.median(samples) * 1000:7.1f} ms  "
+                  f"min {min(samples) * 1000:7.1f} ms  ({runs} runs)")
+        created = os.listdir(cwd)
+        print(f"files created by importing: {created or 'none'}")
+
+        print("\nslowest top-level imports for app.main (cumulative):")
+        for cumulative_us, name in _slowest_imports("app.main", cwd):
+            print(f"  {name:<24} {cumulative_us / 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,60 @@
+"""
+Throughput of push dispatch against the fake transport, and event-loop
+responsiveness while pushes are in flight.
+
+Usage:
+    python -m benchmarks.bench_push_transport [messages] [latency_ms]
+"""
+import asyncio
+import sys
+import time
+
+from app.services.push_notification import FakeTransport, PushNotificationService
+
+
+async def _loop_lag(stop: asyncio.Event) -> float:
+    """Worst delay seen by a 10 ms ticker; large values mean something blocked the loop"""
+    worst = 0.0
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.01)
+        worst = max(worst, time.perf_counter() - started - 0.01)
+    return worst
+
+
+async def _measure(label: str, coro_factory):
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(_loop_lag(stop))
+    started = time.perf_counter()
+    sent = await coro_factory()
+    elapsed = time.perf_counter() - started
+    stop.set()
+    lag = await lag_task
+    print(f"{label:<28} {sent:>7} msgs  {elapsed:7.3f} s  {sent / elapsed:10.0f} msg/s  max loop lag {lag * 1000:6.1f} ms")
+
+
+async def main(messages: int = 5000, latency_ms: float = 50):
+    service = PushNotificationService(transport=FakeTransport(latency_ms=latency_ms))
+    tokens = [f"token-{i}" for i in range(messages)]
+
+    async def single_sends():
+        # Individual sends are far slower per message, so only time a slice of them
+        count = min(messages, 500)
+        results = await asyncio.gather(*(
+            service.send_push_notification(token, "Bench", "body") for token in tokens[:count]
+        ))
+        return sum(results)
+
+    async def batched_sends():
+        result = await service.send_batch_async([service.build_message(t, "Bench", "body") for t in tokens])
+        return result["success"]
+
+    print(f"fake transport latency: {latency_ms} ms/call, workers: {service.workers}")
+    await _measure("send_push_notification x N", single_sends)
+    await _measure("send_batch_async", batched_sends)
+    service.shutdown()
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    asyncio.run(main(int(args[0]) if args else 5000, float(args[1]) if len(args) > 1 else 50))
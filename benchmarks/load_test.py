@@ -0,0 +1,350 @@
+"""
+Local load test: runs the app in-process against fake Gemini, FCM and SMTP
+backends, seeds a scratch SQLite database with generated users, reminders and
+scans, and drives scripted scenarios, reporting throughput and latency
+percentiles. Nothing leaves the machine and the dev database is not touched.
+
+Scenarios:
+    analysis_burst    concurrent skin-analysis uploads
+    login_storm       concurrent logins (password hashing pool)
+    reminder_spike    one scheduler minute where most users' 22:00 reminders fire,
+                      with reminder-list traffic running alongside
+    history_browsing  scan history, single scans and reminder lists
+
+Usage:
+    python -m benchmarks.load_test [scenario ...] [--users N] [--concurrency N] [--requests N]
+        [--ai-latency-ms MS] [--push-latency-ms MS] [--smtp-latency-ms MS] [--seed N] [--json PATH]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import Awaitable, Callable, Dict, List, Optional
+
+# The run chdirs into a scratch directory, so keep the repo importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SCENARIOS = ("analysis_burst", "login_storm", "reminder_spike", "history_browsing")
+# Requests per scenario unless --requests is given; analyses are slow by design
+DEFAULT_REQUESTS = {"analysis_burst": 50, "login_storm": 200, "history_browsing": 500}
+PASSWORD = "load-test-password"
+SPIKE_TIMEZONE = "Asia/Karachi"
+SPIKE_TIME = "22:00"
+OTHER_TIMEZONES = ("Europe/London", "America/New_York", "Asia/Tokyo", None)
+
+
+# Reporting
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(pct / 100 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+class Recorder:
+    def __init__(self, name: str):
+        self.name = name
+        self.latencies: List[float] = []
+        self.statuses: Counter = Counter()
+
+    def record(self, seconds: float, status):
+        self.latencies.append(seconds)
+        self.statuses[status] += 1
+
+    def report(self, elapsed: float, **extra) -> dict:
+        latencies = sorted(self.latencies)
+        errors = sum(count for status, count in self.statuses.items() if not (isinstance(status, int) and status < 400))
+        return {
+            "scenario": self.name,
+            "requests": len(latencies),
+            "errors": errors,
+            "statuses": {str(k): v for k, v in self.statuses.items()},
+            "seconds": round(elapsed, 3),
+            "throughput_per_second": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+            **{f"p{p}_ms": round(percentile(latencies, p) * 1000, 1) for p in (50, 90, 95, 99)},
+            "max_ms": round(latencies[-1] * 1000, 1) if latencies else 0.0,
+            **extra,
+        }
+
+
+def print_report(result: dict):
+    print(f"\n== {result['scenario']}")
+    print(f"   requests {result['requests']}  errors {result['errors']}  statuses {result['statuses']}")
+    print(f"   {result['throughput_per_second']} req/s over {result['seconds']} s")
+    print(f"   latency ms  p50 {result['p50_ms']}  p90 {result['p90_ms']}  p95 {result['p95_ms']}  "
+          f"p99 {result['p99_ms']}  max {result['max_ms']}")
+    for key in ("due", "messages", "tick_seconds", "messages_per_second"):
+        if key in result:
+            print(f"   {key} {result[key]}")
+
+
+async def run_requests(name: str, total: int, concurrency: int,
+                       make_request: Callable[[int], Awaitable], stop: Optional[asyncio.Event] = None) -> dict:
+    """
+    Issue `total` requests from `concurrency` workers (or keep going until
+    `stop` is set) and return the latency report
+    """
+    recorder = Recorder(name)
+    counter = iter(range(total if stop is None else sys.maxsize))
+
+    async def worker():
+        for i in counter:
+            if stop is not None and stop.is_set():
+                return
+            started = time.perf_counter()
+            try:
+                status = (await make_request(i)).status_code
+            except Exception as e:
+                status = type(e).__name__
+            recorder.record(time.perf_counter() - started, status)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return recorder.report(time.perf_counter() - started)
+
+
+# Data generators
+
+def seed_users(db, count: int, rng: random.Random) -> List[SimpleNamespace]:
+    """Verified users sharing one password hash (hashing each would dominate seeding)"""
+    from sqlalchemy import insert
+    from app.core.security import get_password_hash
+    from app.models.user import User
+
+    hashed = get_password_hash(PASSWORD)
+    rows = []
+    for i in range(count):
+        # Most users share the spike timezone, like a single-market launch
+        tz_name = SPIKE_TIMEZONE if rng.random() < 0.8 else rng.choice(OTHER_TIMEZONES)
+        rows.append({"email": f"load{i}@example.com", "hashed_password": hashed, "is_active": True,
+                     "is_verified": True, "is_first_login": False, "timezone": tz_name})
+    db.execute(insert(User), rows)
+    db.commit()
+    return [SimpleNamespace(id=user.id, email=user.email, timezone=user.timezone, is_active=True, is_verified=True)
+            for user in db.query(User).order_by(User.id)]
+
+
+def seed_reminders(db, users: List[SimpleNamespace], rng: random.Random, devices_per_user: int = 2) -> int:
+    """Every user gets a daily SPIKE_TIME reminder plus one at a random time, and registered devices"""
+    from sqlalchemy import insert
+    from app.models.reminder import Reminder, ReminderFrequency
+    from app.models.user_device import UserDevice
+    from app.services.reminder_schedule import compute_next_fire_at
+
+    now = datetime.utcnow()
+    reminders = []
+    devices = []
+    for user in users:
+        times = (SPIKE_TIME, f"{rng.randrange(24):02d}:{rng.choice((0, 15, 30, 45)):02d}")
+        for n, time_str in enumerate(times):
+            reminders.append({
+                "user_id": user.id, "name": f"Routine {n + 1}", "time": time_str,
+                "frequency": ReminderFrequency.DAILY, "is_active": True,
+                "next_fire_at": compute_next_fire_at(ReminderFrequency.DAILY, time_str, None, user.timezone, now),
+            })
+        for n in range(devices_per_user):
+            devices.append({"user_id": user.id, "token": f"load-{user.id}-{n}",
+                            "platform": rng.choice(("ios", "android")), "last_seen_at": now})
+    db.execute(insert(Reminder), reminders)
+    db.execute(insert(UserDevice), devices)
+    db.commit()
+    return len(reminders)
+
+
+def seed_scans(db, users: List[SimpleNamespace], rng: random.Random, per_user: int = 5) -> Dict[int, List[str]]:
+    """Stored analyses per user, returned as {user_id: [scan_id, ...]}"""
+    from sqlalchemy import insert
+    from app.models.skin_analysis import SkinAnalysis
+    from app.services.ai_skin_analysis import AISkinAnalysisService
+
+    template = AISkinAnalysisService(backend="fake")._get_fallback_response()
+    scans = {}
+    rows = []
+    for user in users:
+        for n in range(per_user):
+            scan_id = f"skin_scan_load{user.id}x{n}"
+            scans.setdefault(user.id, []).append(scan_id)
+            scores = {f"{key}_score": round(rng.uniform(20, 90), 1) for key in
+                      ("moisture", "texture", "acne", "dryness", "elasticity", "complexion", "skin_age")}
+            rows.append({"scan_id": scan_id, "user_id": user.id, "image_path": f"uploads/skin_images/{scan_id}.jpg",
+                         "am_routine": template["amRoutine"], "pm_routine": template["pmRoutine"],
+                         "nutrition_recommendations": template["nutritionRecommendations"],
+                         "product_recommendations": ", ".join(template["productRecommendations"]),
+                         "ingredient_recommendations": ", ".join(template["ingredientRecommendations"]),
+                         **scores})
+    db.execute(insert(SkinAnalysis), rows)
+    db.commit()
+    return scans
+
+
+# Scenarios
+
+def auth_headers(user: SimpleNamespace) -> dict:
+    from app.core.security import create_user_access_token
+    return {"Authorization": f"Bearer {create_user_access_token(user)}"}
+
+
+async def analysis_burst(client, users, scans, args, rng) -> dict:
+    image = rng.randbytes(200 * 1024)
+
+    def request(i):
+        user = users[i % len(users)]
+        return client.post("/api/skin-analysis", headers=auth_headers(user), data={"user_id": user.id},
+                           files={"image": ("scan.jpg", image, "image/jpeg")})
+
+    return await run_requests("analysis_burst", args.requests or DEFAULT_REQUESTS["analysis_burst"],
+                              args.concurrency, request)
+
+
+async def login_storm(client, users, scans, args, rng) -> dict:
+    def request(i):
+        user = users[i % len(users)]
+        return client.post("/api/login", json={"email": user.email, "password": PASSWORD})
+
+    return await run_requests("login_storm", args.requests or DEFAULT_REQUESTS["login_storm"],
+                              args.concurrency, request)
+
+
+async def reminder_spike(client, users, scans, args, rng) -> dict:
+    from app.db.session import SessionLocal
+    from app.services.reminder_schedule import compute_next_fire_at
+    from app.models.reminder import ReminderFrequency
+    from app.services.reminder_service import floor_minute, reminder_service
+
+    minute = floor_minute(compute_next_fire_at(ReminderFrequency.DAILY, SPIKE_TIME, None, SPIKE_TIMEZONE,
+                                               datetime.utcnow() - timedelta(minutes=1)))
+    stop = asyncio.Event()
+
+    async def tick():
+        db = SessionLocal()
+        try:
+            started = time.perf_counter()
+            await reminder_service.check_reminders(db, minute)
+            return time.perf_counter() - started
+        finally:
+            db.close()
+            stop.set()
+
+    def request(i):
+        return client.get("/api/reminders", headers=auth_headers(users[i % len(users)]))
+
+    tick_seconds, result = await asyncio.gather(
+        tick(), run_requests("reminder_spike", 0, args.concurrency, request, stop=stop))
+    dispatch = reminder_service.last_dispatch
+    messages = dispatch.get("success", 0) + dispatch.get("failed", 0)
+    result.update(due=dispatch.get("due", 0), messages=messages, tick_seconds=round(tick_seconds, 3),
+                  messages_per_second=round(messages / tick_seconds, 1) if tick_seconds else 0.0)
+    return result
+
+
+async def history_browsing(client, users, scans, args, rng) -> dict:
+    def request(i):
+        user = users[i % len(users)]
+        headers = auth_headers(user)
+        page = i % 3
+        if page == 0:
+            return client.get(f"/api/skin-analysis/user/{user.id}/history", headers=headers, params={"limit": 10})
+        if page == 1:
+            return client.get(f"/api/skin-analysis/{scans[user.id][i % len(scans[user.id])]}", headers=headers)
+        return client.get("/api/reminders", headers=headers)
+
+    return await run_requests("history_browsing", args.requests or DEFAULT_REQUESTS["history_browsing"],
+                              args.concurrency, request)
+
+
+SCENARIO_FUNCTIONS = {
+    "analysis_burst": analysis_burst,
+    "login_storm": login_storm,
+    "reminder_spike": reminder_spike,
+    "history_browsing": history_browsing,
+}
+
+
+def configure_environment(args):
+    """Point every external backend at its local fake; must run before the app is imported"""
+    os.environ.update({
+        "AI_BACKEND": "fake",
+        "FAKE_AI_LATENCY_MS": str(args.ai_latency_ms),
+        "PUSH_TRANSPORT": "fake",
+        "FAKE_PUSH_LATENCY_MS": str(args.push_latency_ms),
+        "EMAIL_BACKEND": "local",
+        "LOCAL_SMTP_LATENCY_MS": str(args.smtp_latency_ms),
+        # The scenarios drive the scheduler themselves
+        "REMINDERS_IN_WEB": "false",
+        "SLOW_REQUEST_MS": os.getenv("SLOW_REQUEST_MS", "60000"),
+    })
+
+
+async def run(args) -> List[dict]:
+    import httpx
+    from app.main import app
+    from app.db.base import Base
+    from app.db.session import SessionLocal, engine
+
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(args.seed)
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        users = seed_users(db, args.users, rng)
+        reminders = seed_reminders(db, users, rng)
+        scans = seed_scans(db, users, rng)
+        print(f"Seeded {len(users)} users, {reminders} reminders, {sum(map(len, scans.values()))} scans "
+              f"in {time.perf_counter() - started:.1f} s")
+    finally:
+        db.close()
+
+    results = []
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=120) as client:
+            for name in args.scenarios:
+                result = await SCENARIO_FUNCTIONS[name](client, users, scans, args, rng)
+                print_report(result)
+                results.append(result)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run local load-test scenarios against fake backends")
+    parser.add_argument("scenarios", nargs="*", help=f"any of {', '.join(SCENARIOS)} (default: all)")
+    parser.add_argument("--users", type=int, default=500)
+    # Above the SQLAlchemy pool size (15) async routes stall on connection checkout
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=0, help="requests per scenario (default: per-scenario)")
+    parser.add_argument("--ai-latency-ms", type=float, default=200)
+    parser.add_argument("--push-latency-ms", type=float, default=50)
+    parser.add_argument("--smtp-latency-ms", type=float, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+    args.scenarios = args.scenarios or list(SCENARIOS)
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(sorted(unknown))}")
+
+    configure_environment(args)
+    json_path = os.path.abspath(args.json) if args.json else None
+    # Scratch directory for the SQLite database and uploaded images
+    workdir = tempfile.mkdtemp(prefix="skin-load-test-")
+    os.chdir(workdir)
+    print(f"Working directory: {workdir}")
+
+    results = asyncio.run(run(args))
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {json_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""
+Microbenchmarks for hot request-path functions, measured in isolation against
+an in-memory SQLite database seeded at production-like scale.
+
+Each benchmark's best and median time per call are written to
+MICROBENCH_RESULTS, and the best round (least disturbed by scheduler noise) is
+compared with MICROBENCH_BASELINE: a benchmark fails when it is more than
+MICROBENCH_TOLERANCE (default 0.5, i.e. 50%) slower than its baseline. The
+first run, or any run with MICROBENCH_UPDATE=1, saves its results as the
+baseline. Baselines are machine-specific, so keep them out of git.
+
+Usage:
+    python -m pytest benchmarks/microbench.py -q -s
+    python -m benchmarks.microbench [pytest args]
+"""
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List
+
+import pytest
+from fastapi import Request, Response
+from fastapi.security import HTTPAuthorizationCredentials
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.api.deps import get_current_user
+from app.api.routes_skin_analysis import get_user_skin_analysis_history
+from app.core import security
+from app.core.principal_cache import principal_cache
+from app.crud import daily_skin_log as crud_daily_skin_log
+from app.db.base import Base
+from app.models import user, user_profile, skin_analysis, otp, daily_skin_log, reminder, refresh_token, email_outbox, user_device, scheduler_state, scheduler_lease
+from app.models.daily_skin_log import DailySkinLog
+from app.models.reminder import Reminder, ReminderFrequency
+from app.models.skin_analysis import SkinAnalysis
+from app.models.user import User
+from app.schemas.daily_skin_log import DailySkinLogRead
+from app.schemas.user import Principal
+from app.services.reminder_schedule import compute_day_mask, next_fire_at_for
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+MICROBENCH_BASELINE = os.getenv("MICROBENCH_BASELINE", os.path.join(BENCH_DIR, "microbench_baseline.json"))
+MICROBENCH_RESULTS = os.getenv("MICROBENCH_RESULTS", os.path.join(BENCH_DIR, "microbench_results.json"))
+MICROBENCH_TOLERANCE = float(os.getenv("MICROBENCH_TOLERANCE", "0.5"))
+MICROBENCH_UPDATE = os.getenv("MICROBENCH_UPDATE", "").lower() in ("1", "true")
+MICROBENCH_ROUNDS = int(os.getenv("MICROBENCH_ROUNDS", "15"))
+
+# Seed scale
+USERS = 1000
+LOG_USERS = 200
+LOGS_PER_USER = 365
+SCANS_PER_USER = 50
+REMINDERS = 100_000
+
+_results: Dict[str, dict] = {}
+
+
+def _load_baseline() -> Dict[str, dict]:
+    if MICROBENCH_UPDATE or not os.path.exists(MICROBENCH_BASELINE):
+        return {}
+    with open(MICROBENCH_BASELINE) as f:
+        return json.load(f)
+
+
+_baseline = _load_baseline()
+
+
+def bench(name: str, fn: Callable, inner: int = 1, rounds: int = MICROBENCH_ROUNDS) -> dict:
+    """
+    Time `fn` over `rounds` rounds of `inner` calls, record the per-call time,
+    and fail if the best round regressed past the baseline tolerance
+    """
+    fn()  # warm up caches and lazy imports
+    per_call = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for _ in range(inner):
+            fn()
+        per_call.append((time.perf_counter() - started) / inner)
+    result = {
+        "median_us": round(statistics.median(per_call) * 1e6, 2),
+        "min_us": round(min(per_call) * 1e6, 2),
+        "rounds": rounds,
+        "inner": inner,
+    }
+    _results[name] = result
+
+    baseline = _baseline.get(name)
+    if baseline:
+        change = result["min_us"] / baseline["min_us"] - 1
+        result["change_vs_baseline"] = round(change, 3)
+        print(f"\n{name:<48} {result['min_us']:>12.1f} us  ({change:+.0%} vs baseline)", end="")
+        if change > MICROBENCH_TOLERANCE:
+            pytest.fail(f"{name} regressed {change:.0%}: {result['min_us']} us vs "
+                        f"baseline {baseline['min_us']} us (tolerance {MICROBENCH_TOLERANCE:.0%})")
+    else:
+        print(f"\n{name:<48} {result['min_us']:>12.1f} us", end="")
+    return result
+
+
+@pytest.fixture(scope="session", autouse=True)
+def results_file():
+    yield
+    if not _results:
+        return
+    with open(MICROBENCH_RESULTS, "w") as f:
+        json.dump(_results, f, indent=2, sort_keys=True)
+    if MICROBENCH_UPDATE or not os.path.exists(MICROBENCH_BASELINE):
+        with open(MICROBENCH_BASELINE, "w") as f:
+            baseline = {name: {"min_us": r["min_us"], "median_us": r["median_us"]} for name, r in _results.items()}
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"\nBaseline saved to {MICROBENCH_BASELINE}")
+
+
+@pytest.fixture(scope="module")
+def db():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    rng = random.Random(7)
+    now = datetime.utcnow()
+
+    session.execute(insert(User), [
+        {"id": i, "email": f"bench{i}@example.com", "hashed_password": "x", "is_active": True,
+         "is_verified": True, "is_first_login": False}
+        for i in range(1, USERS + 1)
+    ])
+    session.execute(insert(DailySkinLog), [
+        {"user_id": user_id, "log_date": date.today() - timedelta(days=day), "created_at": now,
+         "skin_feel": rng.choice(("normal", "dry", "oily")), "skin_description": "combination",
+         "sleep_hours": rng.choice(("3-6", "6-9", "9+")), "diet_items": "dairy, snacks", "water_intake": "2 bottles"}
+        for user_id in range(1, LOG_USERS + 1) for day in range(LOGS_PER_USER)
+    ])
+    routine = {"steps": [{"step_number": n, "product_type": f"Product {n}", "description": "Apply gently."}
+                         for n in range(1, 5)]}
+    session.execute(insert(SkinAnalysis), [
+        {"scan_id": f"skin_scan_{user_id}x{n}", "user_id": user_id, "image_path": "uploads/x.jpg",
+         "moisture_score": 50, "texture_score": 50, "acne_score": 50, "dryness_score": 50,
+         "elasticity_score": 50, "complexion_score": 50, "skin_age_score": 30,
+         "am_routine": routine, "pm_routine": routine, "nutrition_recommendations": "Balanced diet",
+         "product_recommendations": "Cleanser, SPF", "ingredient_recommendations": "Niacinamide"}
+        for user_id in range(1, LOG_USERS + 1) for n in range(SCANS_PER_USER)
+    ])
+    session.commit()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def test_get_current_user(db):
+    token = security.create_access_token({"sub": "bench42@example.com"})
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+    def cold():
+        security.invalidate_token_cache()
+        principal_cache.clear()
+        return get_current_user(credentials, db)
+
+    assert cold().id == 42
+    bench("get_current_user.cold_cache", cold, inner=20)
+    bench("get_current_user.warm_cache", lambda: get_current_user(credentials, db), inner=200)
+
+
+def test_get_daily_skin_logs_by_user(db):
+    assert len(crud_daily_skin_log.get_daily_skin_logs_by_user(db, 7)) == 100
+    bench("crud_daily_skin_log.get_daily_skin_logs_by_user", lambda: (
+        db.expunge_all(), crud_daily_skin_log.get_daily_skin_logs_by_user(db, 7)), inner=5)
+
+
+def test_skin_analysis_history_response(db):
+    principal = Principal(id=7, email="bench7@example.com", is_active=True, is_verified=True)
+    request = Request({"type": "http", "headers": []})
+    loop = asyncio.new_event_loop()
+
+    def history():
+        db.expunge_all()
+        return loop.run_until_complete(get_user_skin_analysis_history(
+            7, request, Response(), skip=0, limit=10, db=db, current_user=principal))
+
+    try:
+        assert history()["data"]["total"] == 10
+        bench("routes_skin_analysis.history_response", history, inner=5)
+    finally:
+        loop.close()
+
+
+def _make_reminders(count: int) -> List[Reminder]:
+    rng = random.Random(11)
+    reminders = []
+    for i in range(count):
+        frequency = rng.choice(list(ReminderFrequency))
+        days = sorted(rng.sample(range(1, 8) if frequency == ReminderFrequency.WEEKLY else range(1, 29), 3))
+        reminders.append(Reminder(
+            user_id=i, name="Routine", time=rng.choice(("22:00", "07:30", "12:15")), is_active=True,
+            frequency=frequency, selected_days=",".join(map(str, days)),
+            day_mask=compute_day_mask(frequency, ",".join(map(str, days))),
+        ))
+    return reminders
+
+
+def test_next_fire_at_for_100k():
+    reminders = _make_reminders(REMINDERS)
+    zones = ("Europe/Berlin", "Asia/Karachi", "America/New_York", None)
+    # The night Europe moves its clocks forward, so some occurrences land in the DST gap
+    after = datetime(2026, 3, 29, 0, 30)
+
+    def advance_all():
+        return sum(next_fire_at_for(r, zones[r.user_id % len(zones)], after=after) is not None for r in reminders)
+
+    assert advance_all() == REMINDERS
+    bench("reminder_schedule.next_fire_at_for.100k", advance_all, rounds=5)
+
+
+@pytest.mark.filterwarnings("ignore::DeprecationWarning")
+def test_daily_skin_log_read_conversion(db):
+    logs = crud_daily_skin_log.get_daily_skin_logs_by_user(db, 7, limit=LOGS_PER_USER)
+    assert len(logs) == LOGS_PER_USER
+    adapter = TypeAdapter(List[DailySkinLogRead])
+
+    bench("DailySkinLogRead.from_orm.365", lambda: [DailySkinLogRead.from_orm(log) for log in logs], inner=5)
+    bench("DailySkinLogRead.model_validate.365", lambda: [DailySkinLogRead.model_validate(log) for log in logs], inner=5)
+    bench("TypeAdapter(List[DailySkinLogRead]).365", lambda: adapter.validate_python(logs, from_attributes=True), inner=5)
+
+
+def main(argv=None):
+    return pytest.main([os.path.abspath(__file__), "-q", "-s", "-p", "no:cacheprovider", *(argv or [])])
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
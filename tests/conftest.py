@@ -0,0 +1,105 @@
+"""
+Shared fixtures: every test gets a fresh in-memory SQLite database with the
+full schema, and background services run inline (no bcrypt process pool,
+in-memory SMTP and push transports).
+"""
+import os
+import sys
+
+os.environ.setdefault("PASSWORD_HASH_WORKERS", "0")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("EMAIL_BACKEND", "local")
+os.environ.setdefault("PUSH_TRANSPORT", "fake")
+os.environ.setdefault("FAKE_PUSH_LATENCY_MS", "0")
+os.environ.setdefault("REMINDERS_IN_WEB", "false")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.db.base import Base
+# Import all models to ensure relationships are resolved
+from app.models import user, user_profile, skin_analysis, otp, daily_skin_log, reminder, refresh_token, email_outbox, user_device, scheduler_state, scheduler_lease
+from app.core.principal_cache import principal_cache
+from app.core import security
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def session_factory(engine):
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture
+def db(session_factory):
+    session = session_factory()
+    yield session
+    session.close()
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    principal_cache.clear()
+    security.invalidate_token_cache()
+    yield
+    principal_cache.clear()
+    security.invalidate_token_cache()
+
+
+@pytest.fixture
+def statements(engine):
+    """SQL statements run on the test engine, in order"""
+    from sqlalchemy import event
+    seen = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        seen.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield seen
+    event.remove(engine, "before_cursor_execute", record)
+
+
+def make_user(db, email="user@example.com", password=None, **fields):
+    from app.models.user import User
+    hashed_password = security.get_password_hash(password) if password else "x"
+    values = dict(email=email, hashed_password=hashed_password, is_active=True, is_verified=True, is_first_login=False)
+    values.update(fields)
+    user = User(**values)
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user
+
+
+@pytest.fixture
+def client(session_factory):
+    """TestClient on the app with request sessions bound to the test database (lifespan not run)"""
+    from fastapi.testclient import TestClient
+    from app.api.deps import get_db
+    from app.main import app
+
+    def get_test_db():
+        session = session_factory()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app.dependency_overrides[get_db] = get_test_db
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def auth_headers(user) -> dict:
+    return {"Authorization": f"Bearer {security.create_user_access_token(user)}"}
@@ -0,0 +1,138 @@
+from datetime import datetime, timedelta
+from unittest import mock
+
+from app.core import security
+from app.core.principal_cache import principal_cache
+from app.crud import user as crud_user
+from app.crud import refresh_token as crud_refresh_token
+from app.models.refresh_token import RefreshToken
+from conftest import auth_headers, make_user
+
+
+def _login(client, email, password):
+    response = client.post("/api/login", json={"email": email, "password": password})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_revocation_rejects_tokens_issued_in_the_same_second():
+    with mock.patch("app.core.security.time.time", return_value=1_800_000_000.2):
+        token = security.create_access_token({"sub": "same-second@example.com"})
+    with mock.patch("app.core.security.time.time", return_value=1_800_000_000.7):
+        security.revoke_subject_tokens("same-second@example.com")
+    with mock.patch("app.core.security.time.time", return_value=1_800_000_000.9):
+        fresh = security.create_access_token({"sub": "same-second@example.com"})
+
+    assert security.decode_access_token(token) is None
+    assert security.decode_access_token(fresh) is not None
+
+
+def test_change_password_signs_out_existing_tokens(db, client):
+    make_user(db, "change@example.com", password="old-password")
+    tokens = _login(client, "change@example.com", "old-password")
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    assert client.get("/api/me", headers=headers).status_code == 200
+
+    response = client.post("/api/change-password", headers=headers,
+                           json={"old_password": "old-password", "new_password": "new-password"})
+    assert response.status_code == 200
+
+    assert client.get("/api/me", headers=headers).status_code == 401
+    assert client.post("/api/verify-refresh-token", json=tokens["refresh_token"]).status_code == 401
+    new_tokens = _login(client, "change@example.com", "new-password")
+    assert client.get("/api/me", headers={"Authorization": f"Bearer {new_tokens['access_token']}"}).status_code == 200
+
+
+def test_logout_all_revokes_access_and_refresh_tokens(db, client):
+    make_user(db, "everywhere@example.com", password="password")
+    phone, laptop = _login(client, "everywhere@example.com", "password"), _login(client, "everywhere@example.com", "password")
+    headers = {"Authorization": f"Bearer {phone['access_token']}"}
+
+    assert client.post("/api/logout-all", headers=headers).json()["revoked"] == 2
+
+    assert client.get("/api/me", headers=headers).status_code == 401
+    assert client.get("/api/me", headers={"Authorization": f"Bearer {laptop['access_token']}"}).status_code == 401
+    assert client.post("/api/verify-refresh-token", json=laptop["refresh_token"]).status_code == 401
+
+
+def _as_another_worker():
+    """Forget this process's in-memory revocations, as a worker that did not handle the request"""
+    security._revoked_subjects.clear()
+    security.invalidate_token_cache()
+    principal_cache.clear()
+
+
+def test_logout_all_reaches_other_workers(db, client):
+    make_user(db, "elsewhere@example.com", password="password")
+    headers = {"Authorization": f"Bearer {_login(client, 'elsewhere@example.com', 'password')['access_token']}"}
+    assert client.post("/api/logout-all", headers=headers).status_code == 200
+
+    _as_another_worker()
+    assert client.get("/api/me", headers=headers).status_code == 401
+    assert client.get("/api/reminders", headers=headers).status_code == 401
+    fresh = _login(client, "elsewhere@example.com", "password")
+    assert client.get("/api/reminders", headers={"Authorization": f"Bearer {fresh['access_token']}"}).status_code == 200
+
+
+def test_deactivation_rejects_tokens_on_principal_routes(db, client):
+    user = make_user(db, "deactivated@example.com")
+    headers = auth_headers(user)
+    assert client.get("/api/reminders", headers=headers).status_code == 200
+
+    crud_user.set_active(db, user, False)
+    _as_another_worker()
+    # The token still claims act=true; the cached user is what counts
+    assert client.get("/api/reminders", headers=headers).status_code == 401
+
+
+def test_refresh_tokens_rotate_and_reuse_revokes_the_family(db):
+    user = make_user(db, "rotate@example.com")
+    first, _ = crud_refresh_token.issue_refresh_token(db, user.id)
+
+    second, second_record = crud_refresh_token.rotate_refresh_token(db, first)
+    assert second != first
+    # Replaying the rotated token means it leaked: the whole family goes
+    assert crud_refresh_token.rotate_refresh_token(db, first) is None
+    assert crud_refresh_token.rotate_refresh_token(db, second) is None
+    db.refresh(second_record)
+    assert second_record.revoked_at is not None
+    # Only hashes are stored
+    assert db.query(RefreshToken).filter(RefreshToken.token_hash == second).count() == 0
+
+
+def test_concurrent_rotation_of_one_token_counts_as_reuse(db, session_factory):
+    user = make_user(db, "race@example.com")
+    raw, _ = crud_refresh_token.issue_refresh_token(db, user.id)
+    # The second request read the token before the first one rotated it
+    slow = session_factory()
+    stale = crud_refresh_token.get_by_token(slow, raw)
+    assert stale.revoked_at is None
+
+    winner = crud_refresh_token.rotate_refresh_token(db, raw)
+    assert winner is not None
+    assert crud_refresh_token.rotate_refresh_token(slow, raw) is None
+    slow.close()
+
+    # The loser revoked the family, including the winner's replacement
+    db.refresh(winner[1])
+    assert winner[1].revoked_at is not None
+    assert db.query(RefreshToken).count() == 2
+    original = db.query(RefreshToken).filter(RefreshToken.id != winner[1].id).one()
+    assert original.replaced_by_id == winner[1].id
+
+
+def test_expired_refresh_token_is_rejected(db):
+    user = make_user(db, "expired@example.com")
+    raw, record = crud_refresh_token.issue_refresh_token(db, user.id)
+    record.expires_at = datetime.utcnow() - timedelta(seconds=1)
+    db.commit()
+    assert crud_refresh_token.rotate_refresh_token(db, raw) is None
+
+
+def test_access_token_carries_status_claims(db, client):
+    user = make_user(db, "claims@example.com", is_verified=False)
+    payload = security.decode_access_token(security.create_user_access_token(user))
+    assert (payload["uid"], payload["act"], payload["vrf"], payload["typ"]) == (user.id, True, False, "access")
+
+    inactive = make_user(db, "inactive@example.com", is_active=False)
+    assert client.get("/api/reminders", headers=auth_headers(inactive)).status_code == 401
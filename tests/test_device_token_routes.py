@@ -0,0 +1,33 @@
+import inspect
+import logging
+
+from app.api import routes_user
+from app.crud import user_device as crud_user_device
+from conftest import auth_headers, make_user
+
+
+def test_device_token_handlers_are_sync():
+    # Their DB calls block, so FastAPI must run them in the threadpool, not on the event loop
+    assert not inspect.iscoroutinefunction(routes_user.update_device_token)
+    assert not inspect.iscoroutinefunction(routes_user.remove_device_token)
+
+
+def test_register_and_remove_device_token(db, client, caplog, capsys):
+    user = make_user(db, "device@example.com")
+    headers = auth_headers(user)
+    token = "fcm-token-abcdefghijklmnopqrstuvwxyz"
+
+    with caplog.at_level(logging.DEBUG, logger=routes_user.__name__):
+        registered = client.post("/api/device-token", headers=headers,
+                                 json={"device_token": token, "platform": "ios"})
+        assert registered.status_code == 200
+        assert crud_user_device.get_user_tokens(db, user.id) == [token]
+
+        removed = client.delete("/api/device-token", headers=headers, params={"device_token": token})
+        assert removed.status_code == 200
+        assert removed.json()["devices_removed"] == 1
+        assert crud_user_device.get_user_tokens(db, user.id) == []
+
+    # Nothing on stdout, and no part of the token in the logs
+    assert capsys.readouterr().out == ""
+    assert token[:10] not in caplog.text
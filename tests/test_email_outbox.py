@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.crud import email_outbox as crud_email_outbox
+from app.models.email_outbox import EmailOutbox
+from app.services import email_outbox_worker as worker_module
+from app.services.email_outbox_worker import EmailOutboxWorker
+from app.services.mail_service import LocalSMTP, mail_service
+
+
+@pytest.fixture
+def worker(session_factory, monkeypatch):
+    monkeypatch.setattr(worker_module, "SessionLocal", session_factory)
+    LocalSMTP.outbox.clear()
+    yield EmailOutboxWorker()
+    LocalSMTP.outbox.clear()
+
+
+def _enqueue(db, count):
+    for i in range(count):
+        crud_email_outbox.enqueue_email(db, f"to{i}@example.com", "Your OTP", f"Your OTP is: {100000 + i}", commit=False)
+    db.commit()
+
+
+def test_batch_is_sent_and_recorded_without_per_row_queries(db, worker, statements):
+    _enqueue(db, 10)
+    statements.clear()
+
+    assert worker.run_once() == 10
+
+    assert len(LocalSMTP.outbox) == 10
+    rows = db.query(EmailOutbox).all()
+    assert {row.status for row in rows} == {crud_email_outbox.SENT}
+    assert all(row.attempts == 1 and row.sent_at is not None for row in rows)
+    # Delivered OTPs are not kept in plain text
+    assert all(row.body == "" for row in rows)
+    # claim (select ids, update, select rows) + one update for the sent rows + backlog count
+    assert len(statements) <= 6
+
+
+def test_failures_are_retried_with_backoff_then_dead_lettered(db, worker, monkeypatch):
+    _enqueue(db, 2)
+
+    def deliver(to_email, subject, body):
+        if to_email == "to1@example.com":
+            raise ConnectionError("refused")
+
+    monkeypatch.setattr(mail_service, "deliver", deliver)
+    monkeypatch.setattr(worker_module, "EMAIL_OUTBOX_MAX_ATTEMPTS", 2)
+    assert worker.run_once() == 2
+
+    failed = db.query(EmailOutbox).filter(EmailOutbox.to_email == "to1@example.com").one()
+    assert failed.status == crud_email_outbox.PENDING
+    assert failed.attempts == 1 and failed.last_error == "refused"
+    assert failed.next_attempt_at > datetime.utcnow() + timedelta(seconds=20)
+    assert failed.body != ""
+
+    failed.next_attempt_at = datetime.utcnow()
+    db.commit()
+    assert worker.run_once() == 1
+    db.expire_all()
+    assert failed.status == crud_email_outbox.DEAD and failed.attempts == 2
+    assert failed.body == ""
+    assert worker.stats()["dead"] == 1
+
+
+def test_expired_claim_cannot_overwrite_a_reclaimed_row(db):
+    _enqueue(db, 1)
+    first = crud_email_outbox.claim_batch(db, lease_seconds=300)
+    stale_token, email_id = first[0].claim_token, first[0].id
+
+    # The first worker stalls past its lease and another one claims the row
+    db.query(EmailOutbox).update({EmailOutbox.claimed_at: datetime.utcnow() - timedelta(seconds=600)})
+    db.commit()
+    second = crud_email_outbox.claim_batch(db, lease_seconds=300)
+    assert second[0].claim_token != stale_token
+
+    crud_email_outbox.complete_batch(db, stale_token, [email_id], [], 8, 30, 3600)
+    db.expire_all()
+    row = db.get(EmailOutbox, email_id)
+    assert row.status == crud_email_outbox.SENDING
+    assert row.claim_token == second[0].claim_token
@@ -0,0 +1,53 @@
+import urllib.error
+import urllib.request
+
+import pytest
+
+from app.core import metrics
+
+
+@pytest.fixture
+def metrics_token(monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_TOKEN", "scrape-secret")
+    return "scrape-secret"
+
+
+def test_metrics_are_open_without_a_token(client):
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert "# TYPE" in response.text
+
+
+@pytest.mark.parametrize("headers", [
+    {},
+    {"Authorization": "Bearer wrong"},
+    # Non-ASCII header values must be a 401, not a TypeError from compare_digest
+    {"Authorization": "Bearer sécret".encode("latin-1")},
+], ids=["missing", "wrong", "non-ascii"])
+def test_metrics_reject_bad_tokens(client, metrics_token, headers):
+    assert client.get("/metrics", headers=headers).status_code == 401
+
+
+def test_metrics_accept_the_token(client, metrics_token):
+    response = client.get("/metrics", headers={"Authorization": f"Bearer {metrics_token}"})
+
+    assert response.status_code == 200
+
+
+def test_worker_metrics_server(metrics_token):
+    metrics.reminder_tick_lag_seconds.set(1.5)
+    server = metrics.start_http_server(0, host="127.0.0.1")
+    url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+    try:
+        with pytest.raises(urllib.error.HTTPError) as denied:
+            urllib.request.urlopen(url, timeout=5)
+        assert denied.value.code == 401
+
+        request = urllib.request.Request(url, headers={"Authorization": f"Bearer {metrics_token}"})
+        with urllib.request.urlopen(request, timeout=5) as response:
+            assert response.headers["Content-Type"] == metrics.CONTENT_TYPE
+            assert "reminder_tick_lag_seconds 1.5" in response.read().decode()
+    finally:
+        server.shutdown()
+        server.server_close()
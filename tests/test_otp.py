@@ -0,0 +1,57 @@
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from app.core.email_utils import build_otp_email
+from app.crud import otp as crud_otp
+from app.models.email_outbox import EmailOutbox
+from app.models.otp import OTP
+from app.services import otp_service as otp_module
+from app.services.otp_service import MemoryOTPStore, OTPService
+
+
+def test_issue_replaces_the_previous_code(db):
+    first = crud_otp.create_otp(db, "a@example.com", "activation")
+    second = crud_otp.create_otp(db, "a@example.com", "activation")
+
+    assert db.query(OTP).count() == 1
+    assert second.id == first.id
+    assert crud_otp.verify_otp(db, "a@example.com", second.otp_code, "activation") is not None
+
+
+@pytest.mark.parametrize("store", [None, MemoryOTPStore()], ids=["db", "memory"])
+def test_non_ascii_code_is_rejected_not_an_error(db, store):
+    service = OTPService()
+    if store is not None:
+        service.store = store
+    service.issue(db, "a@example.com", "activation")
+
+    assert service.verify(db, "a@example.com", "１２３４５６", "activation") is False
+
+
+def test_wrong_guesses_lock_the_code(db):
+    code = crud_otp.create_otp(db, "a@example.com", "reset").otp_code
+    for _ in range(5):
+        assert crud_otp.verify_otp(db, "a@example.com", "000000", "reset") is None
+
+    assert crud_otp.verify_otp(db, "a@example.com", code, "reset") is None
+
+
+def test_conflict_inside_caller_transaction_is_not_rolled_back(db, monkeypatch):
+    crud_otp.create_otp(db, "a@example.com", "activation")
+    # The caller has unrelated pending work and loses the insert race
+    db.add(EmailOutbox(to_email="x@example.com", subject="s", body="b"))
+    db.flush()
+    monkeypatch.setattr(crud_otp, "get_latest_otp", lambda *args: None)
+
+    # The caller decides what to do with its transaction instead of having
+    # its pending rows silently discarded by a rollback here
+    with pytest.raises(IntegrityError):
+        crud_otp.create_otp(db, "a@example.com", "activation", commit=False)
+
+
+def test_email_states_the_configured_lifetime(db, monkeypatch):
+    monkeypatch.setattr(otp_module, "OTP_EXPIRE_MINUTES", 15)
+    OTPService().issue_and_email(db, "a@example.com", "activation", "activation")
+
+    assert "valid for 15 minutes" in db.query(EmailOutbox).one().body
+    assert build_otp_email("123456", "reset", 1)[1].endswith("valid for 1 minute.")
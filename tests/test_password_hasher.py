@@ -0,0 +1,54 @@
+from passlib.context import CryptContext
+
+from app.crud import user as crud_user
+from app.services.password_hasher import PasswordHasher, password_hasher
+from conftest import auth_headers, make_user
+
+
+def test_inline_hashing_round_trips():
+    hasher = PasswordHasher(max_workers=0)
+    hashed = hasher.hash("s3cret")
+
+    assert hasher.verify_and_update("s3cret", hashed) == (True, None)
+    assert hasher.verify_and_update("wrong", hashed) == (False, None)
+    assert hasher.stats()["completed"] == 3
+    assert hasher.stats()["pending"] == 0
+
+
+def test_process_pool_hashing_round_trips():
+    hasher = PasswordHasher(max_workers=1)
+    try:
+        hashed = hasher.hash("s3cret")
+        assert hasher.verify_and_update("s3cret", hashed)[0] is True
+    finally:
+        hasher.shutdown()
+    assert hasher.stats()["failed"] == 0
+
+
+def test_login_upgrades_an_outdated_hash(db, client):
+    outdated = CryptContext(schemes=["bcrypt"], bcrypt__rounds=5).hash("s3cret")
+    user = make_user(db, "rehash@example.com", hashed_password=outdated)
+    before = password_hasher.stats()["rehashed"]
+
+    response = client.post("/api/login", json={"email": user.email, "password": "s3cret"})
+
+    assert response.status_code == 200
+    db.refresh(user)
+    assert user.hashed_password != outdated
+    assert crud_user.check_password(user, "s3cret")
+    assert password_hasher.stats()["rehashed"] == before + 1
+
+
+def test_change_password_checks_the_old_one(db, client):
+    user = make_user(db, "change@example.com", password="old-password")
+    headers = auth_headers(user)
+
+    wrong = client.post("/api/change-password", headers=headers,
+                        json={"old_password": "nope", "new_password": "new-password"})
+    assert wrong.status_code == 400
+
+    ok = client.post("/api/change-password", headers=headers,
+                     json={"old_password": "old-password", "new_password": "new-password"})
+    assert ok.status_code == 200
+    db.refresh(user)
+    assert crud_user.check_password(user, "new-password")
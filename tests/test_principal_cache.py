@@ -0,0 +1,52 @@
+from unittest import mock
+
+from app.core.cache import TTLCache
+from app.crud import user as crud_user
+from app.schemas.user import UserUpdate
+from conftest import make_user
+
+
+def test_ttl_cache_expires_entries():
+    cache = TTLCache(maxsize=10, ttl=30)
+    with mock.patch("app.core.cache.time.monotonic", return_value=100.0):
+        cache.set("a", 1)
+        assert cache.get("a") == 1
+    with mock.patch("app.core.cache.time.monotonic", return_value=131.0):
+        assert cache.get("a") is None
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=30)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.evictions == 1
+
+
+def test_cached_user_is_served_without_a_query(db, statements):
+    make_user(db, "cached@example.com")
+    db.expunge_all()
+
+    assert crud_user.get_cached_by_email(db, "cached@example.com").email == "cached@example.com"
+    queries = len(statements)
+    db.expunge_all()
+    user = crud_user.get_cached_by_email(db, "cached@example.com")
+    assert len(statements) == queries
+    assert user.id is not None and user.is_active
+
+
+def test_update_user_invalidates_cached_principal(db):
+    make_user(db, "rename@example.com", first_name="Old")
+    user = crud_user.get_cached_by_email(db, "rename@example.com")
+    crud_user.update_user(db, user, UserUpdate(first_name="New"))
+    db.expunge_all()
+    assert crud_user.get_cached_by_email(db, "rename@example.com").first_name == "New"
+
+
+def test_unknown_user_is_not_cached(db):
+    assert crud_user.get_cached_by_email(db, "missing@example.com") is None
+    make_user(db, "missing@example.com")
+    assert crud_user.get_cached_by_email(db, "missing@example.com") is not None
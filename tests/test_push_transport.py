@@ -0,0 +1,54 @@
+import pytest
+from firebase_admin import messaging
+
+from app.services import push_notification
+from app.services.push_notification import FirebaseTransport
+
+
+@pytest.fixture
+def broken_firebase(monkeypatch):
+    """Firebase with no apps and credentials that fail to load; counts the attempts"""
+    attempts = []
+    clock = [1000.0]
+
+    def credentials_json():
+        attempts.append(clock[0])
+        return None
+
+    monkeypatch.setattr(push_notification.firebase_admin, "_apps", {})
+    monkeypatch.setattr(push_notification, "create_firebase_credentials_json", credentials_json)
+    monkeypatch.setattr(push_notification.time, "monotonic", lambda: clock[0])
+    return attempts, clock
+
+
+def test_failed_init_is_not_retried_on_every_send(broken_firebase):
+    attempts, clock = broken_firebase
+    transport = FirebaseTransport(retry_seconds=30, max_retry_seconds=60)
+    message = messaging.Message(token="t")
+
+    for _ in range(3):
+        with pytest.raises(RuntimeError):
+            transport.send(message)
+    assert len(attempts) == 1
+
+    clock[0] += 30
+    assert transport.start() is False
+    clock[0] += 59
+    assert transport.start() is False
+    clock[0] += 1
+    assert transport.start() is False
+    # 30s, then 60s, then capped at 60s
+    assert attempts == [1000.0, 1030.0, 1090.0]
+    assert transport.failures == 3
+
+
+def test_init_succeeds_after_the_backoff(broken_firebase, monkeypatch):
+    attempts, clock = broken_firebase
+    transport = FirebaseTransport(retry_seconds=30)
+    assert transport.start() is False
+
+    monkeypatch.setattr(push_notification.firebase_admin, "_apps", {"[DEFAULT]": object()})
+    assert transport.start() is False
+    clock[0] += 30
+    assert transport.start() is True
+    assert transport.failures == 0
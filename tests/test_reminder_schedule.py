@@ -0,0 +1,78 @@
+from datetime import datetime
+
+import pytest
+from pydantic import ValidationError
+
+from app.crud import reminder as crud_reminder
+from app.models.reminder import Reminder, ReminderFrequency
+from app.schemas.reminder import ReminderCreate, ReminderUpdate
+from app.services.reminder_schedule import compute_day_mask, compute_next_fire_at
+from conftest import auth_headers, make_user
+
+DAILY, WEEKLY, MONTHLY = ReminderFrequency.DAILY, ReminderFrequency.WEEKLY, ReminderFrequency.MONTHLY
+
+
+def test_daily_local_time_follows_dst_changes():
+    # Berlin switches to CEST on 2026-03-29 and back to CET on 2026-10-25
+    assert compute_next_fire_at(DAILY, "22:00", None, "Europe/Berlin", datetime(2026, 3, 28, 21, 0)) \
+        == datetime(2026, 3, 29, 20, 0)
+    assert compute_next_fire_at(DAILY, "22:00", None, "Europe/Berlin", datetime(2026, 10, 24, 20, 0)) \
+        == datetime(2026, 10, 25, 21, 0)
+
+
+def test_next_fire_at_is_strictly_after():
+    assert compute_next_fire_at(DAILY, "07:30", None, "UTC", datetime(2026, 1, 1, 7, 30)) == datetime(2026, 1, 2, 7, 30)
+    assert compute_next_fire_at(DAILY, "07:30", None, None, datetime(2026, 1, 1, 7, 29)) == datetime(2026, 1, 1, 7, 30)
+
+
+def test_weekly_and_monthly_days():
+    # 2026-10-19 is a Monday; Wednesday and Friday are selected
+    mask = compute_day_mask(WEEKLY, "3,5")
+    assert compute_next_fire_at(WEEKLY, "09:00", mask, "Asia/Karachi", datetime(2026, 10, 19, 12, 0)) \
+        == datetime(2026, 10, 21, 4, 0)
+    # The 31st is skipped by months that don't have one
+    mask = compute_day_mask(MONTHLY, "31")
+    assert compute_next_fire_at(MONTHLY, "09:00", mask, "UTC", datetime(2026, 10, 31, 10, 0)) \
+        == datetime(2026, 12, 31, 9, 0)
+
+
+def test_reminder_without_days_never_fires():
+    assert compute_day_mask(WEEKLY, "") == 0
+    assert compute_next_fire_at(WEEKLY, "09:00", 0, "UTC", datetime(2026, 1, 1)) is None
+    assert compute_day_mask(WEEKLY, "0,8,x") == 0
+
+
+@pytest.mark.parametrize("value", ["7pm", "25:99", "7:30", "24:00", "12:60", ""])
+def test_invalid_times_are_rejected(value):
+    with pytest.raises(ValidationError):
+        ReminderCreate(name="n", time=value, frequency=DAILY)
+    with pytest.raises(ValidationError):
+        ReminderUpdate(time=value)
+
+
+def test_api_rejects_invalid_time_with_422(db, client):
+    user = make_user(db, "api@example.com")
+    response = client.post("/api/reminders", headers=auth_headers(user),
+                           json={"name": "n", "time": "25:99", "frequency": "daily"})
+    assert response.status_code == 422
+
+    response = client.post("/api/reminders", headers=auth_headers(user),
+                           json={"name": "n", "time": "22:00", "frequency": "daily"})
+    assert response.status_code == 200
+    reminder_id = response.json()["data"]["id"]
+    response = client.put(f"/api/reminders/{reminder_id}", headers=auth_headers(user), json={"time": "7pm"})
+    assert response.status_code == 422
+
+
+def test_backfill_skips_rows_with_invalid_times(db):
+    user = make_user(db, "legacy@example.com")
+    bad = Reminder(user_id=user.id, name="bad", time="7pm", frequency=DAILY, is_active=True)
+    good = Reminder(user_id=user.id, name="good", time="07:30", frequency=WEEKLY, selected_days="1,3", is_active=True)
+    db.add_all([bad, good])
+    db.commit()
+
+    assert crud_reminder.backfill_schedule(db) == 2
+    db.refresh(bad)
+    db.refresh(good)
+    assert bad.next_fire_at is None
+    assert good.next_fire_at is not None and good.day_mask == compute_day_mask(WEEKLY, "1,3")
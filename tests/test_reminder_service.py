@@ -0,0 +1,106 @@
+import asyncio
+import logging
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app.models.reminder import Reminder, ReminderFrequency
+from app.models.user_device import UserDevice
+from app.services import reminder_service as reminder_module
+from app.services.push_notification import push_service
+from app.services.reminder_service import ReminderService
+from conftest import make_user
+
+MINUTE = datetime(2026, 10, 19, 22, 0)
+
+
+@pytest.fixture
+def sent_pushes():
+    push_service.transport.sent.clear()
+    yield push_service.transport.sent
+    push_service.transport.sent.clear()
+
+
+def _add_reminder(db, user, fire_at, **fields):
+    reminder = Reminder(user_id=user.id, name="Night routine", time="22:00", frequency=ReminderFrequency.DAILY,
+                        is_active=True, next_fire_at=fire_at, **fields)
+    db.add(reminder)
+    return reminder
+
+
+def test_due_reminders_are_processed_in_pages(db, statements, sent_pushes, monkeypatch):
+    monkeypatch.setattr(reminder_module, "REMINDER_PAGE_SIZE", 3)
+    users = [make_user(db, f"r{i}@example.com") for i in range(7)]
+    for user in users:
+        db.add(UserDevice(user_id=user.id, token=f"token-{user.id}"))
+        _add_reminder(db, user, MINUTE)
+    # Not due yet
+    _add_reminder(db, users[0], MINUTE + timedelta(hours=1))
+    db.commit()
+    statements.clear()
+
+    service = ReminderService()
+    asyncio.run(service.check_reminders(db, MINUTE))
+
+    pages = [s for s in statements if s.lstrip().startswith("SELECT reminders.")]
+    assert len(pages) == 3
+    assert all("LIMIT" in s for s in pages)
+    assert sorted(m.token for m in sent_pushes) == sorted(f"token-{user.id}" for user in users)
+    assert service.last_dispatch["due"] == 7 and service.last_dispatch["success"] == 7
+
+    db.expire_all()
+    advanced = db.query(Reminder).filter(Reminder.next_fire_at == MINUTE + timedelta(days=1)).all()
+    assert len(advanced) == 7 and all(reminder.last_sent_at == MINUTE for reminder in advanced)
+    assert db.query(Reminder).filter(Reminder.next_fire_at <= MINUTE).count() == 0
+
+
+def test_tick_summary_goes_to_the_log_not_stdout(db, sent_pushes, caplog, capsys):
+    user = make_user(db, "log@example.com")
+    db.add(UserDevice(user_id=user.id, token="token-log"))
+    _add_reminder(db, user, MINUTE)
+    db.commit()
+
+    with caplog.at_level(logging.INFO):
+        asyncio.run(ReminderService().check_reminders(db, MINUTE))
+
+    assert capsys.readouterr().out == ""
+    assert "Processed 1 due reminders: 1 sent" in caplog.text
+
+
+def test_stale_duplicate_and_tokenless_reminders_are_not_sent(db, sent_pushes):
+    with_device, without_device = make_user(db, "a@example.com"), make_user(db, "b@example.com")
+    db.add(UserDevice(user_id=with_device.id, token="token-a"))
+    _add_reminder(db, with_device, MINUTE - timedelta(hours=3))  # older than the catch-up window
+    _add_reminder(db, with_device, MINUTE, last_sent_at=MINUTE)  # already dispatched
+    _add_reminder(db, without_device, MINUTE)
+    db.commit()
+
+    service = ReminderService()
+    asyncio.run(service.check_reminders(db, MINUTE))
+
+    assert sent_pushes == []
+    stats = service.last_dispatch
+    assert (stats["due"], stats["skipped"], stats["duplicates"], stats["no_token"]) == (3, 1, 1, 1)
+    assert db.query(Reminder).filter(Reminder.next_fire_at <= MINUTE).count() == 0
+
+
+def test_tick_db_work_runs_off_the_event_loop(db, engine, sent_pushes):
+    user = make_user(db, "thread@example.com")
+    db.add(UserDevice(user_id=user.id, token="token-thread"))
+    _add_reminder(db, user, MINUTE)
+    db.commit()
+    threads = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        threads.append(threading.get_ident())
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        asyncio.run(ReminderService().run_tick(db, MINUTE))
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert [m.token for m in sent_pushes] == ["token-thread"]
+    assert threads and threading.get_ident() not in threads
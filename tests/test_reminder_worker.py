@@ -0,0 +1,38 @@
+import asyncio
+import os
+import signal
+
+import pytest
+
+from app.workers import reminders as worker
+
+
+@pytest.fixture
+def loops(monkeypatch):
+    """Replace the worker's loops and external services with controllable stand-ins"""
+    async def idle():
+        await asyncio.sleep(3600)
+
+    monkeypatch.setattr(worker.push_service, "start", lambda: None)
+    monkeypatch.setattr(worker.push_service, "shutdown", lambda: None)
+    monkeypatch.setattr(worker.reminder_service, "release_leases", lambda: None)
+    monkeypatch.setattr(worker.reminder_service, "start_reminder_checker", idle)
+    monkeypatch.setattr(worker.device_registry, "start_sweep_loop", idle)
+    return monkeypatch
+
+
+def test_exits_non_zero_when_the_checker_crashes(loops):
+    async def crash():
+        raise RuntimeError("database is gone")
+
+    loops.setattr(worker.reminder_service, "start_reminder_checker", crash)
+
+    assert asyncio.run(asyncio.wait_for(worker.main(), timeout=10)) == 1
+
+
+def test_exits_cleanly_on_sigterm(loops):
+    async def run():
+        asyncio.get_running_loop().call_later(0.05, os.kill, os.getpid(), signal.SIGTERM)
+        return await asyncio.wait_for(worker.main(), timeout=10)
+
+    assert asyncio.run(run()) == 0
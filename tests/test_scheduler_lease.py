@@ -0,0 +1,34 @@
+import threading
+import time
+
+from app.services import scheduler_lease as lease_module
+from app.services.scheduler_lease import LeaseManager
+
+
+def test_managers_split_shards_up_to_their_limit(db):
+    names = [f"reminders-shard-{i}" for i in range(4)]
+    first, second = LeaseManager(names, max_held=3), LeaseManager(names, max_held=3)
+
+    assert first.refresh(db) == set(names[:3])
+    assert second.refresh(db) == {names[3]}
+    # Renewing keeps what each already holds
+    assert first.refresh(db) == set(names[:3])
+    assert (first.acquired, first.lost) == (3, 0)
+
+
+def test_concurrent_refreshes_respect_max_held(monkeypatch):
+    def slow_try_acquire(db, name, holder, ttl_seconds):
+        time.sleep(0.01)
+        return True
+
+    monkeypatch.setattr(lease_module.crud_scheduler_lease, "try_acquire", slow_try_acquire)
+    manager = LeaseManager([f"reminders-shard-{i}" for i in range(4)], max_held=1)
+    # The heartbeat thread and the tick refresh at the same time
+    threads = [threading.Thread(target=manager.refresh, args=(None,)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(manager.held) == 1
+    assert (manager.acquired, manager.lost) == (1, 0)
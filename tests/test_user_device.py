@@ -0,0 +1,48 @@
+from app.crud import user_device as crud_user_device
+from app.models.user import User
+from app.models.user_device import UserDevice
+from conftest import make_user
+
+
+def test_backfill_moves_legacy_tokens(db):
+    make_user(db, "a@example.com", device_token="token-a")
+    make_user(db, "b@example.com", device_token="token-b")
+    make_user(db, "c@example.com")
+
+    assert crud_user_device.backfill_from_users(db) == 2
+    assert sorted(token for (token,) in db.query(UserDevice.token)) == ["token-a", "token-b"]
+    assert db.query(User).filter(User.device_token.isnot(None)).count() == 0
+
+
+def test_backfill_handles_a_token_shared_by_two_users(db):
+    older = make_user(db, "old@example.com", device_token="shared")
+    newer = make_user(db, "new@example.com", device_token="shared")
+
+    assert crud_user_device.backfill_from_users(db) == 2
+    devices = db.query(UserDevice).all()
+    assert [(d.user_id, d.token) for d in devices] == [(newer.id, "shared")]
+    db.refresh(older)
+    assert older.device_token is None
+    # Nothing left to move, so the next startup is a no-op instead of failing again
+    assert crud_user_device.backfill_from_users(db) == 0
+
+
+def test_backfill_skips_tokens_already_registered(db):
+    user = make_user(db, "a@example.com", device_token="token-a")
+    other = make_user(db, "b@example.com")
+    crud_user_device.register_device(db, other.id, "token-a")
+
+    assert crud_user_device.backfill_from_users(db) == 1
+    assert [(d.user_id, d.token) for d in db.query(UserDevice)] == [(other.id, "token-a")]
+    db.refresh(user)
+    assert user.device_token is None
+
+
+def test_register_device_moves_token_to_new_owner(db):
+    first, second = make_user(db, "a@example.com"), make_user(db, "b@example.com")
+    crud_user_device.register_device(db, first.id, "token", platform="ios")
+    crud_user_device.register_device(db, second.id, "token")
+
+    assert crud_user_device.get_user_tokens(db, first.id) == []
+    assert crud_user_device.get_tokens_for_users(db, [first.id, second.id]) == {second.id: ["token"]}
+    assert db.query(UserDevice).one().platform == "ios"
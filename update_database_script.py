@@ -5,7 +5,7 @@ Use only in development/testing environments!
 """
 from app.db.base import Base
 from app.db.session import engine
-import app.models.user, app.models.otp, app.models.user_profile, app.models.skin_analysis, app.models.daily_skin_log, app.models.reminder
+import app.models.user, app.models.otp, app.models.user_profile, app.models.skin_analysis, app.models.daily_skin_log, app.models.reminder, app.models.refresh_token, app.models.email_outbox, app.models.user_device, app.models.scheduler_state, app.models.scheduler_lease
 
 if __name__ == "__main__":
     print("Dropping all tables...")